@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Compares per-request latency of urllib.request.urlopen against the pooled ytlink session.
+
+Run from the repository root:
+
+    python -m benchmarks.connection [requests] [certfile keyfile]
+
+Providing a certificate and key serves the stand-in API over HTTPS so the
+TLS handshake saved by keep-alive is included in the timings.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import sys
+import ssl
+import gzip
+import json
+import time
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+#--- Custom imports ---#
+from ytlink.connection import Session
+#======================== Fields ========================#
+# A playlistItems-like page with full descriptions
+_PAGE = json.dumps({
+    'items': [
+        {
+            'snippet': {
+                'title': f'Video {i}',
+                'description': 'A long video description. ' * 80,
+                'publishedAt': '2022-11-13T20:27:36Z',
+                'channelId': 'UCbenchmark',
+                'resourceId': { 'kind': 'youtube#video', 'videoId': f'vid{i}' }
+            }
+        }
+        for i in range(50)
+    ]
+}).encode()
+_GZIP_PAGE = gzip.compress(_PAGE)
+#======================== Helper ========================#
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """ Stand-in API endpoint that serves the same page with keep-alive. """
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, avoid delayed ACK stalls
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        gzipped = 'gzip' in self.headers.get('Accept-Encoding', '')
+        body = _GZIP_PAGE if gzipped else _PAGE
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        if gzipped: self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.bytes_sent += len(body)
+
+    def log_message(self, *args): pass
+
+
+def serve(certfile=None, keyfile=None):
+    """ Starts the stand-in server in a background thread and returns it with its base url. """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    server.bytes_sent = 0
+    scheme = 'http'
+    if certfile is not None:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certfile, keyfile)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = 'https'
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'{scheme}://127.0.0.1:{server.server_port}/youtube/v3'
+
+
+def bench(label, server, request, n):
+    server.bytes_sent = 0
+    start = time.perf_counter()
+    for _ in range(n): request()
+    elapsed = time.perf_counter() - start
+
+    print(
+        f'{label:>10}: {elapsed / n * 1000:7.3f} ms/request, '
+        f'{server.bytes_sent / n / 1024:7.1f} KiB/request'
+    )
+
+
+#======================== Entry ========================#
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    certfile, keyfile = (sys.argv[2], sys.argv[3]) if len(sys.argv) > 3 else (None, None)
+
+    server, url = serve(certfile, keyfile)
+    # Trust the self-signed certificate of the stand-in server
+    context = ssl._create_unverified_context() if certfile else None
+    session = Session(context=context)
+    params = { 'key': 'benchmark', 'part': 'snippet', 'q': 'some search phrase' }
+
+    def with_urlopen():
+        query = '&'.join(f'{key}={value}' for key, value in params.items())
+        with urllib.request.urlopen(
+            f'{url}/playlistItems?{query.replace(" ", "%20")}', context=context
+        ) as response:
+            json.load(response)
+
+    def with_session():
+        session.get(f'{url}/playlistItems', params=params).json()
+
+    print(f'{n} requests against {url}')
+    bench('urlopen', server, with_urlopen, n)
+    bench('session', server, with_session, n)
+
+    session.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
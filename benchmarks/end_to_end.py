@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Runs subscriptions.py and pull_channel.py end to end against the fake YouTube API.
+
+Each run copies the scripts to a fresh folder with its own settings, last
+run, catalog and config, so nothing in the repository is touched. Run from
+the repository root:
+
+    python -m benchmarks.end_to_end [subscriptions ...] [--latency seconds]
+
+Reports the wall time, HTTP requests and quota units of each script at 10,
+100 and 1,000 subscriptions by default. Subscriptions is run again once
+nothing new was uploaded, with and without polling the channels' feeds.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+import commentjson
+from pathlib import Path
+from datetime import datetime, timedelta
+#--- Custom imports ---#
+from ytlink.tools.fake_api import FakeYouTube, FakeServer
+#======================== Fields ========================#
+_REPO = Path(__file__).resolve().parent.parent
+_SCRIPTS = [ 'subscriptions.py', 'pull_channel.py' ]
+_SIZES = [ 10, 100, 1000 ]
+# Uploads of each synthetic channel, one a day
+_NUM_VIDEOS = 100
+# Days since the last run of subscriptions.py
+_DAYS_SINCE_RUN = 3
+# Seconds each request to the fake API takes
+_LATENCY = 0.02
+#======================== Helper ========================#
+
+
+def _settings():
+    """ Gets the settings.json for a run, keeping the repository's tuning. """
+    with open(_REPO / 'settings.json', 'r') as f:
+        settings = commentjson.load(f)
+
+    settings.update({
+        'watch_laterID': 'PLbenchmarkwatchlater',
+        'daily_quota': 10 ** 9,
+        'filters': { 'Channel 0': [ 'video 99' ], 'Channel 3': [ { 'word': 'video' } ] },
+        'playlists': { 'Channel 1': 'PLbenchmarkcustom' },
+    })
+    return settings
+
+
+def prepare(folder):
+    """ Copies the scripts into the folder and writes their state and config. Returns the config folder. """
+    for script in _SCRIPTS: shutil.copy(_REPO / script, folder / script)
+
+    with open(folder / 'settings.json', 'w') as f:
+        json.dump(_settings(), f, indent=4)
+
+    with open(folder / 'last_run.txt', 'w') as f:
+        last_run = datetime.now() - timedelta(days=_DAYS_SINCE_RUN)
+        f.write(last_run.strftime('%Y-%m-%d %H:%M:%S.%f'))
+
+    config = folder / 'config'
+    config.mkdir()
+    with open(config / 'api_key.txt', 'w') as f: f.write('benchmark')
+
+    return config
+
+
+def run(server, folder, config, args):
+    """ Runs a script against the server. Returns the (seconds, HTTP requests, quota units) it took. """
+    env = {
+        **os.environ,
+        'YTLINK_API_URL': server.url,
+        'YTLINK_FEED_URL': f'{server.root_url}feeds/videos.xml?channel_id={{channelID}}',
+        'YTLINK_CONFIG_DIR': str(config),
+        'PYTHONPATH': os.pathsep.join(
+            filter(None, [ str(_REPO), os.environ.get('PYTHONPATH') ])
+        ),
+    }
+
+    server.api.reset_stats()
+    start = time.perf_counter()
+    process = subprocess.run(
+        [ sys.executable, *args ], cwd=folder, env=env,
+        stdin=subprocess.DEVNULL, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start
+
+    if process.returncode != 0:
+        print(process.stdout[-2000:], process.stderr[-2000:], sep='\n')
+        raise RuntimeError(f'{" ".join(args)} exited with {process.returncode}.')
+
+    stats = server.api.stats()
+    return elapsed, stats['requests'], stats['units']
+
+
+#======================== Entry ========================#
+
+
+def main():
+    args = sys.argv[1:]
+    latency = _LATENCY
+    if '--latency' in args:
+        i = args.index('--latency')
+        latency = float(args[i + 1])
+        del args[i:i + 2]
+    sizes = [ int(arg) for arg in args ] or _SIZES
+
+    print(f'{_NUM_VIDEOS} uploads per channel, {latency * 1000:.0f} ms per request')
+    print(f'{"script":>16} {"subs":>6} {"wall (s)":>9} {"requests":>9} {"units":>8}')
+    for size in sizes:
+        server = FakeServer(
+            FakeYouTube(num_channels=size, num_videos=_NUM_VIDEOS, latency=latency)
+        ).start()
+
+        with tempfile.TemporaryDirectory() as folder:
+            folder = Path(folder)
+            config = prepare(folder)
+
+            # Subscriptions saves the channels pull_channel picks from
+            for label, script_args in [
+                ('subscriptions', [ 'subscriptions.py' ]),
+                ('pull_channel', [ 'pull_channel.py', 'Channel 0', '--yes' ]),
+                ('rerun', [ 'subscriptions.py' ]),
+                ('rerun --feeds', [ 'subscriptions.py', '--feeds' ]),
+            ]:
+                elapsed, requests, units = run(server, folder, config, script_args)
+                print(f'{label:>16} {size:>6} {elapsed:>9.2f} {requests:>9} {units:>8}')
+
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
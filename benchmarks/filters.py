@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Compares the compiled ytlink.filters.FilterSet against the per-phrase filtering loop.
+
+Run from the repository root:
+
+    python -m benchmarks.filters [videos]
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import sys
+import time
+import random
+#--- Custom imports ---#
+import ytlink
+import ytlink.filters
+#======================== Fields ========================#
+_PHRASES = [
+    'Leak', 'Camera Test', 'Galaxy', 'Live', 'Round Up', 'Roundup', 'Teaser',
+    'Unboxing', 'Review', 'Giveaway', 'Sponsor', 'Shorts'
+]
+_WORDS = (
+    'the new phone laptop review after months battery life test best worst '
+    'budget premium comparison vs update guide tutorial how to setup tips'
+).split()
+#======================== Helper ========================#
+
+
+def _loop_filter(filters, video):
+    """ Filtering as it was done before compiling: a substring check per phrase. """
+    channel = video.channel
+    if channel.name not in filters: return None
+
+    lower_name = video.name.lower()
+    lower_desc = video.description.lower() if video.description is not None else ''
+
+    for filt in filters[channel.name]:
+        lower_filt = filt.lower()
+        if lower_filt in lower_name or lower_filt in lower_desc: return filt
+
+    return None
+
+
+def synthetic(n, num_channels=200):
+    rng = random.Random(0)
+    channels = [ ytlink.Channel(f'Channel {i}', f'UC{i:022d}') for i in range(num_channels) ]
+    # Half the channels have filters
+    filters = {
+        channel.name: rng.sample(_PHRASES, rng.randint(1, 6))
+        for channel in channels[::2]
+    }
+
+    videos = []
+    for i in range(n):
+        channel = rng.choice(channels)
+        words = rng.choices(_WORDS + _PHRASES[:2], k=8)
+        video = ytlink.Video(
+            ' '.join(words).title(), f'video{i}', '2022-11-13T20:27:36Z',
+            channel.ID, ' '.join(rng.choices(_WORDS, k=60))
+        )
+        video._channel = channel
+        videos.append(video)
+
+    return channels, filters, videos
+
+
+#======================== Entry ========================#
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    channels, filters, videos = synthetic(n)
+    print(f'{n} videos, {len(filters)} channels with filters')
+
+    start = time.perf_counter()
+    loop_skipped = sum(_loop_filter(filters, video) is not None for video in videos)
+    loop_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    filter_set = ytlink.filters.FilterSet(filters, channels)
+    compile_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled_skipped = sum(filter_set.match(video) is not None for video in videos)
+    compiled_elapsed = time.perf_counter() - start
+
+    print(f'    loop: {loop_elapsed * 1000:7.1f} ms, {loop_skipped} skipped')
+    print(
+        f'compiled: {compiled_elapsed * 1000:7.1f} ms, {compiled_skipped} skipped '
+        f'(compiling took {compile_elapsed * 1000:.1f} ms)'
+    )
+
+
+if __name__ == '__main__':
+    main()
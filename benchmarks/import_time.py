@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Measures the time to import ytlink with python -X importtime and guards against slow imports creeping back in.
+
+Run from the repository root:
+
+    python -m benchmarks.import_time [runs] [--budget ms]
+
+Fails if importing ytlink loads the Google client or rich, or if the median
+import takes longer than the budget.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import os
+import sys
+import statistics
+import subprocess
+from pathlib import Path
+#======================== Fields ========================#
+_REPO = Path(__file__).resolve().parent.parent
+# Modules that must only be loaded once they are used
+_LAZY_MODULES = [ 'googleapiclient', 'google_auth_oauthlib', 'rich' ]
+_RUNS = 10
+# Slowest modules listed in the report
+_TOP = 10
+#======================== Helper ========================#
+
+
+def import_times(statement='import ytlink'):
+    """ Runs the statement in a fresh interpreter under -X importtime.
+
+        Kwargs:
+            statement (str): the code to time.
+
+        Returns:
+            (dict): the cumulative microseconds of every module imported, keyed by module.
+
+    """
+    env = {
+        **os.environ,
+        'PYTHONPATH': os.pathsep.join(
+            filter(None, [ str(_REPO), os.environ.get('PYTHONPATH') ])
+        ),
+    }
+    process = subprocess.run(
+        [ sys.executable, '-X', 'importtime', '-c', statement ],
+        env=env, capture_output=True, text=True, check=True
+    )
+
+    times = {}
+    for line in process.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'cumulative' in line: continue
+
+        _, cumulative, module = line.split('|')
+        times[module.strip()] = int(cumulative)
+
+    return times
+
+
+def loaded_lazy_modules(times):
+    """ Gets the lazily loaded top level modules that were imported anyway. """
+    return sorted({
+        module for module in times
+        if module.split('.')[0] in _LAZY_MODULES
+    })
+
+
+#======================== Entry ========================#
+
+
+def main():
+    args = sys.argv[1:]
+    budget = None
+    if '--budget' in args:
+        i = args.index('--budget')
+        budget = float(args[i + 1])
+        del args[i:i + 2]
+    runs = int(args[0]) if args else _RUNS
+
+    samples = [ import_times() for _ in range(runs) ]
+    totals = [ times['ytlink'] / 1000 for times in samples ]
+    median = statistics.median(totals)
+    print(
+        f'import ytlink: median {median:.1f} ms, '
+        f'min {min(totals):.1f} ms over {runs} runs'
+    )
+
+    # Slowest modules of the median run
+    times = samples[totals.index(sorted(totals)[len(totals) // 2])]
+    print(f'Slowest of {len(times)} modules imported (cumulative):')
+    for module, microseconds in sorted(
+        times.items(), key=lambda item: item[1], reverse=True
+    )[:_TOP]:
+        print(f'{microseconds / 1000:8.1f} ms  {module}')
+
+    failed = False
+    loaded = loaded_lazy_modules(times)
+    if loaded:
+        print(f'FAIL: import ytlink loaded {", ".join(loaded)}.')
+        failed = True
+    if budget is not None and median > budget:
+        print(f'FAIL: median import took longer than the {budget:.1f} ms budget.')
+        failed = True
+
+    if failed: sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
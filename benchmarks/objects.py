@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Measures construction time and memory of ytlink.Video's built from API snippets.
+
+Run from the repository root:
+
+    python -m benchmarks.objects [videos]
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+#--- Custom imports ---#
+import ytlink
+#======================== Helper ========================#
+
+
+class _EagerVideo:
+    """ Video as it was built before slots: instance dict, eager date parsing and link markup. """
+    def __init__(self, name, ID, date, channelID, description=None):
+        self.name = name
+        self.ID = ID
+        self.link = f'[link=https://www.youtube.com/watch?v={ID}]{name}[/]'
+        self.date = datetime.strptime(date, '%Y-%m-%dT%H:%M:%SZ')
+        self._channelID = channelID
+        self.description = description
+
+
+def snippets(n):
+    return [
+        {
+            'title': f'Video number {i}',
+            'publishedAt': f'2022-{i % 12 + 1:02d}-{i % 28 + 1:02d}T{i % 24:02d}:{i % 60:02d}:{i % 60:02d}Z',
+            'channelId': 'UCbenchmark',
+            'description': f'Description of video {i}',
+            'resourceId': { 'kind': 'youtube#video', 'videoId': f'video{i:07d}' },
+        }
+        for i in range(n)
+    ]
+
+
+def bench(label, build, items):
+    start = time.perf_counter()
+    videos = build(items)
+    elapsed = time.perf_counter() - start
+
+    # Sorting by date is what forces the lazy dates to be parsed
+    start = time.perf_counter()
+    sorted(videos, key=lambda video: video.date)
+    sort_elapsed = time.perf_counter() - start
+    del videos
+
+    # Memory is traced in a separate pass, tracing slows construction down
+    tracemalloc.start()
+    videos = build(items)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f'{label:>12}: build {elapsed * 1000:7.1f} ms, '
+        f'{memory / len(items):5.0f} B/video, '
+        f'sort by date {sort_elapsed * 1000:7.1f} ms'
+    )
+
+
+#======================== Entry ========================#
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    items = snippets(n)
+    print(f'{n} videos')
+
+    bench('eager', lambda items: [
+        _EagerVideo(
+            name=item['title'], ID=item['resourceId']['videoId'],
+            date=item['publishedAt'], channelID=item['channelId'],
+            description=item['description']
+        )
+        for item in items
+    ], items)
+    bench('Video', lambda items: [
+        ytlink.Video(
+            name=item['title'], ID=item['resourceId']['videoId'],
+            date=item['publishedAt'], channelID=item['channelId'],
+            description=item['description']
+        )
+        for item in items
+    ], items)
+    bench('from_snippet', lambda items: [
+        ytlink.Video.from_snippet(item, item['resourceId']['videoId'])
+        for item in items
+    ], items)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Compares playlistItems pages requested whole against pages trimmed to the fields ytlink reads.
+
+Pages of a channel's uploads are requested from the fake YouTube API with
+and without the fields parameter, as in a Channel.uploads(max_vids=None)
+backfill, and each page is decoded with json and, when installed, orjson.
+Run from the repository root:
+
+    python -m benchmarks.projection [pages]
+
+Reports the bytes received and decoded per page and the milliseconds spent
+decoding each page.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import sys
+import json
+import time
+#--- Custom imports ---#
+import ytlink.connection
+from ytlink.ytlink import _MAX_RESULTS, _PLAYLIST_ITEMS_FIELDS
+from ytlink.tools.fake_api import FakeYouTube, FakeServer
+#======================== Fields ========================#
+_PAGES = 40
+# Times each page is decoded for the timings
+_REPEATS = 20
+#======================== Helper ========================#
+
+
+def decoders():
+    """ Gets the (name, loads) of each JSON decoder available. """
+    found = [ ('json', json.loads) ]
+    try:
+        import orjson
+        found.append(('orjson', orjson.loads))
+    except ImportError:
+        pass
+    return found
+
+
+def pages(session, url, playlistID, fields=None):
+    """ Requests every page of the playlist. Returns the list of ytlink.connection.Response's. """
+    params = {
+        'key': 'benchmark', 'part': 'snippet', 'playlistId': playlistID,
+        'maxResults': _MAX_RESULTS,
+    }
+    if fields is not None: params['fields'] = fields
+
+    responses = []
+    while True:
+        response = session.get(f'{url}/playlistItems', params=params)
+        responses.append(response)
+        token = response.json().get('nextPageToken')
+        if token is None: return responses
+        params['pageToken'] = token
+
+
+def decode_ms(responses, loads):
+    """ Gets the milliseconds taken to decode a page on average. """
+    start = time.perf_counter()
+    for _ in range(_REPEATS):
+        for response in responses: loads(response.body)
+    return (time.perf_counter() - start) / _REPEATS / len(responses) * 1000
+
+
+#======================== Entry ========================#
+
+
+def main():
+    num_pages = int(sys.argv[1]) if len(sys.argv) > 1 else _PAGES
+    api = FakeYouTube(num_channels=1, num_videos=num_pages * _MAX_RESULTS)
+    server = FakeServer(api).start()
+    session = ytlink.connection.Session()
+    playlistID = f'UU{api.channel_ID(0)[2:]}'
+
+    print(f'{num_pages} pages of {_MAX_RESULTS} playlist items')
+    header = f'{"request":>10} {"gzip KiB":>9} {"JSON KiB":>9}'
+    for name, _ in decoders(): header += f' {f"{name} ms":>10}'
+    print(header)
+
+    for label, fields in [
+        ('whole', None), ('projected', _PLAYLIST_ITEMS_FIELDS)
+    ]:
+        responses = pages(session, server.url, playlistID, fields=fields)
+        row = (
+            f'{label:>10} '
+            f'{sum(r.size for r in responses) / len(responses) / 1024:>9.1f} '
+            f'{sum(len(r.body) for r in responses) / len(responses) / 1024:>9.1f}'
+        )
+        for _, loads in decoders(): row += f' {decode_ms(responses, loads):>10.3f}'
+        print(row)
+
+    session.close()
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
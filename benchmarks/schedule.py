@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Simulates the daemon's per-channel schedules against full sweeps of every channel.
+
+Synthetic channels upload at their own pace and hour of the day: a few
+several times a day, many daily or weekly, and a long tail that went
+dormant. Each strategy is replayed over the same uploads and scored by its
+checks, each a playlistItems.list call, and by the hours between an upload
+and the check that found it. Run from the repository root:
+
+    python -m benchmarks.schedule [channels] [--days days]
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import sys
+import random
+import statistics
+from datetime import datetime, timedelta
+#--- Custom imports ---#
+import ytlink.schedule
+#======================== Fields ========================#
+_CHANNELS = 500
+_DAYS = 30
+# Days of uploads the schedules learn from before the simulation starts
+_HISTORY_DAYS = 120
+# Hours between full sweeps compared against
+_SWEEPS = [ 1, 6, 24 ]
+# Expected uploads that make a channel due, trading checks for delay
+_THRESHOLDS = [ 0.5, ytlink.schedule.THRESHOLD, 0.1 ]
+# (share of channels, mean hours between uploads), None for dormant channels
+_PROFILES = [ (0.05, 8), (0.25, 24), (0.35, 24 * 7), (0.35, None) ]
+_START = datetime(2024, 1, 1)
+#======================== Helper ========================#
+
+
+def uploads(num_channels, days, seed=0):
+    """ Generates the upload dates of each channel, from the start of its history to the end of the simulation. """
+    rng = random.Random(seed)
+    start = _START - timedelta(days=_HISTORY_DAYS)
+    end = _START + timedelta(days=days)
+
+    channels = []
+    for i in range(num_channels):
+        share = i / num_channels
+        for fraction, mean_hours in _PROFILES:
+            if share < fraction: break
+            share -= fraction
+
+        dates = []
+        hour = rng.randrange(24)
+        # Dormant channels stopped uploading halfway through their history
+        stop = start + timedelta(days=_HISTORY_DAYS / 2) if mean_hours is None else end
+        mean_hours = mean_hours or 24 * 3
+        date = start + timedelta(hours=rng.expovariate(1 / mean_hours))
+        while date < stop:
+            # Most uploads land around the channel's usual hour
+            upload = date.replace(hour=hour, minute=0) + timedelta(minutes=rng.gauss(0, 60))
+            if mean_hours < 24: upload = date
+            dates.append(upload)
+            date += timedelta(hours=rng.expovariate(1 / mean_hours))
+
+        channels.append(sorted(dates))
+
+    return channels
+
+
+def _score(checks, delays, days):
+    return (
+        checks / days,
+        statistics.mean(delays) if delays else 0,
+        max(delays) if delays else 0,
+    )
+
+
+def sweep(channels, days, hours):
+    """ Checks every channel every few hours. Returns the (checks a day, mean delay, worst delay) in hours. """
+    delays = []
+    checks = 0
+    end = _START + timedelta(days=days)
+    for dates in channels:
+        new = [ date for date in dates if date >= _START ]
+        check = _START
+        i = 0
+        while check < end:
+            check += timedelta(hours=hours)
+            checks += 1
+            while i < len(new) and new[i] <= check:
+                delays.append((check - new[i]).total_seconds() / 3600)
+                i += 1
+
+    return _score(checks, delays, days)
+
+
+def adaptive(channels, days, threshold=ytlink.schedule.THRESHOLD):
+    """ Checks each channel on the schedule of ytlink.schedule.Scheduler. Returns the (checks a day, mean delay, worst delay) in hours. """
+    scheduler = ytlink.schedule.Scheduler(threshold=threshold)
+    history = {}
+    pending = {}
+    for i, dates in enumerate(channels):
+        history[i] = [ date for date in dates if date < _START ]
+        pending[i] = [ date for date in dates if date >= _START ]
+        # Every channel was checked when the simulation starts
+        scheduler.checked([i], now=_START)
+        scheduler.schedule(i, history[i][-ytlink.schedule.HISTORY:], now=_START)
+
+    delays = []
+    checks = 0
+    end = _START + timedelta(days=days)
+    while (now := scheduler.next_due()) is not None and now < end:
+        for i in scheduler.due(now=now):
+            checks += 1
+            while pending[i] and pending[i][0] <= now:
+                date = pending[i].pop(0)
+                delays.append((now - date).total_seconds() / 3600)
+                history[i].append(date)
+
+            scheduler.checked([i], now=now)
+            scheduler.schedule(i, history[i][-ytlink.schedule.HISTORY:], now=now)
+
+    # Uploads still unseen at the end count with their current delay
+    for dates in pending.values():
+        delays += [ (end - date).total_seconds() / 3600 for date in dates if date < end ]
+
+    return _score(checks, delays, days)
+
+
+#======================== Entry ========================#
+
+
+def main():
+    args = sys.argv[1:]
+    days = _DAYS
+    if '--days' in args:
+        i = args.index('--days')
+        days = int(args[i + 1])
+        del args[i:i + 2]
+    num_channels = int(args[0]) if args else _CHANNELS
+
+    channels = uploads(num_channels, days)
+    print(f'{num_channels} channels over {days} days')
+    print(f'{"strategy":>20} {"checks/day":>11} {"mean delay (h)":>15} {"worst (h)":>10}')
+    for hours in _SWEEPS:
+        checks, mean, worst = sweep(channels, days, hours)
+        print(f'{f"sweep every {hours}h":>20} {checks:>11.0f} {mean:>15.1f} {worst:>10.1f}')
+
+    for threshold in _THRESHOLDS:
+        checks, mean, worst = adaptive(channels, days, threshold)
+        print(f'{f"adaptive at {threshold}":>20} {checks:>11.0f} {mean:>15.1f} {worst:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
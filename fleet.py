@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""Updates the Watch Later playlists of many accounts, pulling each channel only once.
+
+Each account is a folder holding its own settings.json, last_run.txt and a
+config folder with its token.json and client_secrets.json:
+
+    python fleet.py accounts/alice accounts/bob ...
+
+Subscriptions of every account are gathered concurrently and the uploads of
+each distinct channel are pulled once, so reading costs the same quota as a
+single account subscribed to every channel. The new videos are then routed
+through each account's own filters and playlists, queued in the shared
+catalog and added through a pool running one account per worker.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import sys
+import commentjson as json
+from pathlib import Path
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+#--- Custom imports ---#
+from ytlink.tools.console import *
+import ytlink
+import ytlink.quota
+import ytlink.marks
+import ytlink.catalog
+import ytlink.metrics
+import ytlink.filters
+import ytlink.workqueue
+import subscriptions
+#======================== Fields ========================#
+# Location of the fleet's catalog, shared by every account
+_CATALOG_FNAME = Path(__file__).parent / 'fleet.db'
+# Location of the newest video pulled from each channel for the whole fleet
+_MARKS_FNAME = Path(__file__).parent / 'fleet_marks.json'
+# Days pulled for accounts that were never run
+_FIRST_RUN_DAYS = 1
+#======================== Objects ========================#
+
+
+class Account:
+    """ A YouTube account of the fleet with its own settings, credentials and last run.
+
+        Attributes:
+            folder: the folder holding the account's files
+            name: the name of the folder
+            settings: the account's settings.json
+            last_run: the time the account was last updated
+            youtube: the account's YouTube client once initialized
+            subscriptions: the account's ytlink.Channel's once gathered
+            subscription_cache: the account's ytlink.SubscriptionCache once gathered
+    """
+    def __init__(self, folder):
+        self.folder = Path(folder)
+        self.name = self.folder.name
+
+        with open(self.folder / 'settings.json', 'r') as f:
+            self.settings = json.load(f)
+
+        self.last_run = datetime.now() - timedelta(days=_FIRST_RUN_DAYS)
+        if (self.folder / 'last_run.txt').exists():
+            with open(self.folder / 'last_run.txt', 'r') as f:
+                self.last_run = datetime.strptime(f.read(), '%Y-%m-%d %H:%M:%S.%f')
+
+        self.youtube = None
+        self.subscriptions = []
+        self.subscription_cache = None
+
+    @property
+    def config_dir(self):
+        return self.folder / 'config'
+
+    @property
+    def watch_later_playlist(self):
+        return ytlink.Playlist(
+            f'Auto Watch Later ({self.name})', self.settings['watch_laterID']
+        )
+
+    @property
+    def playlists(self):
+        """ Gets every playlist the account adds to keyed by ID. """
+        playlists = {
+            ID: ytlink.Playlist(f'Custom for playlist for: {name}', ID)
+            for name, ID in self.settings['playlists'].items()
+        }
+        playlists[self.settings['watch_laterID']] = self.watch_later_playlist
+        return playlists
+
+    def connect(self, refresh=False):
+        """ Initializes the account's client and gathers its subscriptions, revalidating the cached list. """
+        self.youtube = ytlink.init_youtube(self.config_dir)
+        self.subscription_cache = ytlink.SubscriptionCache(self.folder / 'subscriptions.json')
+        self.subscriptions = ytlink.get_subscriptions(
+            self.youtube, cache=self.subscription_cache, refresh=refresh
+        )
+
+    def save_last_run(self, date):
+        with open(self.folder / 'last_run.txt', 'w') as f:
+            f.write(date.strftime('%Y-%m-%d %H:%M:%S.%f'))
+
+
+#======================== Helper ========================#
+
+
+def distinct_channels(accounts):
+    """ Gets every channel subscribed to by an account once, along with the accounts subscribed to each channel keyed by channel ID. """
+    channels = {}
+    subscribers = {}
+    for account in accounts:
+        for channel in account.subscriptions:
+            channels.setdefault(channel.ID, channel)
+            subscribers.setdefault(channel.ID, []).append(account)
+
+    return list(channels.values()), subscribers
+
+
+def pull_distinct(channels, subscribers, marks, max_workers):
+    """ Pulls the new uploads of each distinct channel once. Channels without a mark are pulled from the earliest last run of their subscribers.
+
+        Returns:
+            (list): list of ytlink.Video's sorted by date.
+
+    """
+    # Group channels without marks by the date to pull them from
+    by_date = {}
+    for channel in channels:
+        after_date = None if channel.ID in marks else min(
+            account.last_run for account in subscribers[channel.ID]
+        )
+        by_date.setdefault(after_date, []).append(channel)
+
+    videos = []
+    for after_date, group in by_date.items():
+        videos += subscriptions.pull_uploads(
+            group, after_date=after_date, max_workers=max_workers, marks=marks
+        )
+
+    return sorted(videos, key=lambda video: video.date)
+
+
+def queue_account(account, catalog, videos, marked):
+    """ Routes the videos of the account's subscriptions through its filters and queues them in the catalog. Returns the number of videos queued.
+
+        Args:
+            account (Account): the account.
+
+            catalog (ytlink.catalog.Catalog): the fleet's catalog.
+
+            videos (list): the new ytlink.Video's of every channel, in date order.
+
+            marked (set): IDs of the channels that had a mark when pulled. Videos of the other channels are only new to the account after its last run.
+
+    """
+    subscribed = { channel.ID for channel in account.subscriptions }
+    videos = [
+        video for video in videos
+        if video._channelID in subscribed
+        and (video._channelID in marked or video.date > account.last_run)
+    ]
+
+    filters = ytlink.filters.FilterSet(account.settings['filters'], account.subscriptions)
+    queued = subscriptions.drop_added(catalog, subscriptions.route_videos(
+        videos, filters, account.settings['playlists'], account.watch_later_playlist
+    ))
+
+    by_playlist = {}
+    for playlist, video in queued:
+        by_playlist.setdefault(playlist.ID, (playlist, []))[1].append(video)
+    for playlist, playlist_videos in by_playlist.values():
+        catalog.queue_videos(playlist, playlist_videos)
+
+    return len(queued)
+
+
+def add_account(account, catalog, channels):
+    """ Adds everything queued for the account's playlists. Returns whether the whole queue was added. """
+    def acknowledge(playlist, batch, results):
+        for video, error in zip(batch, results):
+            if error is not None: continue
+            print(
+                f'{account.name}: Added [emph]{video.link}[/] to '
+                f'{playlist.link}; published on {video.date}...'
+            )
+
+    return ytlink.workqueue.add_queued(
+        account.youtube, catalog, channels=channels, callback=acknowledge,
+        playlists=account.playlists, playlistIDs=set(account.playlists),
+        ordered=account.settings.get('ordered_inserts', True)
+    )
+
+
+#======================== Entry ========================#
+
+
+def main():
+    folders = [ arg for arg in sys.argv[1:] if not arg.startswith('--') ]
+    if not folders:
+        print('Usage: python fleet.py ACCOUNT_FOLDER [ACCOUNT_FOLDER ...]')
+        sys.exit(-1)
+
+    accounts = [ Account(folder) for folder in folders ]
+    # Fleet wide settings are taken from the first account
+    settings = accounts[0].settings
+    subscriptions.use_client_settings(settings)
+    max_workers = settings.get('max_workers', 1)
+    ytlink.quota.ledger.limit = settings.get('daily_quota', ytlink.quota.DAILY_LIMIT)
+    start = datetime.now()
+
+    # Logging in may prompt, so clients are made one account at a time
+    for account in accounts: ytlink.init_youtube(account.config_dir)
+    refresh = subscriptions._REFRESH_ARG in sys.argv
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        list(executor.map(lambda account: account.connect(refresh), accounts))
+
+    channels, subscribers = distinct_channels(accounts)
+    print(
+        f'{len(accounts)} accounts subscribe to [emph]{len(channels)}[/] distinct channels '
+        f'({sum(len(account.subscriptions) for account in accounts)} subscriptions).'
+    )
+
+    catalog = ytlink.catalog.Catalog(_CATALOG_FNAME)
+    subscriptions.restore_uploads_playlists(catalog, channels)
+    marks = ytlink.marks.Marks(_MARKS_FNAME)
+    # Channels no account subscribes to anymore
+    marks.remove({
+        channelID for account in accounts
+        for channelID in account.subscription_cache.removed
+    } - set(subscribers))
+
+    pull_cost = subscriptions.estimate_pull_cost(channels)
+    if pull_cost > ytlink.quota.ledger.remaining:
+        print('[warning]Not enough quota to pull from subscriptions, exiting...')
+        sys.exit(-1)
+
+    marked = { channel.ID for channel in channels if channel.ID in marks }
+    videos = pull_distinct(channels, subscribers, marks, max_workers)
+    catalog.add_channels(channels)
+    catalog.add_videos(videos)
+
+    for account in accounts:
+        count = queue_account(account, catalog, videos, marked)
+        print(f'{account.name}: Queued [emph]{count}[/] videos.')
+    # Queued videos are kept by the catalog, the marks can pass them
+    marks.advance(videos)
+    for account in accounts: account.save_last_run(start)
+
+    # Each account inserts on its own worker with its own client
+    by_ID = { channel.ID: channel for channel in channels }
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(accounts)))) as executor:
+        done = list(executor.map(
+            lambda account: add_account(account, catalog, by_ID), accounts
+        ))
+
+    for account, account_done in zip(accounts, done):
+        if not account_done:
+            print(f'{account.name}: [warning]Videos left queued[/] for the next run.')
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt as e:
+        print('\nKeyboard interrupt.')
+    finally:
+        ytlink.metrics.dump_from_args(sys.argv)
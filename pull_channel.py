@@ -7,7 +7,6 @@
 #------------- Imports -------------#
 import sys
 from pathlib import Path
-import rich.prompt
 #--- Google necessary imports ---#
 import os
 import json
@@ -16,47 +15,45 @@ from ytlink.tools.console import *
 import ytlink.tools.typing_filter
 import ytlink
 import ytlink.error
+import ytlink.catalog
+import ytlink.metrics
+import ytlink.resolve
+import ytlink.workqueue
 #======================== Fields ========================#
 _CHANNELS_DATA_FOLDER = Path(__file__).parent / 'channels_data'
 _CHANNELS_FILE = _CHANNELS_DATA_FOLDER / 'channels.json'
+_CATALOG_FNAME = Path(__file__).parent / 'catalog.db'
+# Number of pulled videos saved to the catalog per transaction
+_CATALOG_BATCH = 500
+# Catalog meta key recording that the legacy files were imported
+_IMPORTED_KEY = 'legacy_imported'
+# Flag answering yes to every confirmation
+_YES_ARG = '--yes'
+# Flag adding the videos in batches of 50 inserts, far faster but in any order
+_BATCH_ARG = '--batch'
 
 
 #======================== Helper ========================#
 
 
 def user_confirm(question):
-    """ Asks the user to confirm a question through input. """
-    return rich.prompt.Confirm.ask(question, default=True)
+    """ Asks the user to confirm a question through input. Always confirmed when run with --yes. """
+    if _YES_ARG in sys.argv: return True
 
+    import rich.prompt
+    return rich.prompt.Confirm.ask(question, default=True)
 
-def _parse_channels_from_results(results):
-    """ Parses channels from a search of channels. """
-    channels = {}
 
-    for item in results:
-        item = item['snippet']
+def _channel_search_request(search, channels):
+    """ Resolves the user's @handle, channel or video URL or channel name, proposing channels from the cheapest lookups first until the user confirms one. The search for the name is only made once everything else is turned down.
 
-        channels[name] = ytlink.Channel(
-            name=item['title'], ID=item['channelId']
-        )
-    return channels
+        Args:
+            search (str): the user's input.
 
+            channels (dict): the saved ytlink.Channel's keyed by name, matched by name without any request.
 
-def _channel_search_request(search):
-    """ Takes the user's search keyphrase, searches for channels, parses results, proposes new channels, and takes user confirmation to save to file. """
-    # Keyphrase search has been shown to be more accurate than Channels list
-        # for this purpose
-    results = ytlink.keyphrase_search(search, kind='channel')
-    
-    search_channels = _parse_channels_from_results(results)
-    lower_search = search.lower()
-    for channel_name in search_channels:
-        if lower_search != channel_name.lower():
-            # Names don't match
-            continue
-
-        # Names match (case insensitive)
-        channel = search_channels[channel_name]
+    """
+    for channel in ytlink.resolve.candidates(search, known=channels.values()):
         print(f'Found channel: {channel.link}.')
 
         if user_confirm('Is this the correct channel?'):
@@ -67,12 +64,13 @@ def _channel_search_request(search):
     # Reattempt search by requesting a video ULR
     print('No matching results, taking an alternative approach...')
     video_url = input('Provide a link to a video from the channel: ')
-    channel = ytlink.Channel.from_video_url(video_url)
-    print(f'Found channel: {channel.link}.')
+    channel = ytlink.resolve.resolve(video_url, known=channels.values(), search=False)
+    if channel is not None:
+        print(f'Found channel: {channel.link}.')
 
-    if user_confirm('Is this the correct channel?'):
-        # Found the correct channel
-        return channel
+        if user_confirm('Is this the correct channel?'):
+            # Found the correct channel
+            return channel
 
     print('Could not find channel.')
     sys.exit(-1)
@@ -80,7 +78,12 @@ def _channel_search_request(search):
 
 def videos_fname(channel):
     """ Gets the filename to the videos file corresponding to a given channel. """
-    return Path(__file__).parent / f'channels_data/{channel.name}.txt'
+    return _CHANNELS_DATA_FOLDER / f'{channel.name}.txt'
+
+
+def journal_fname(channel):
+    """ Gets the filename to the journal of videos added from a channel's videos file. """
+    return _CHANNELS_DATA_FOLDER / f'{channel.name}.journal'
 
 
 def file_is_empty(path):
@@ -88,12 +91,19 @@ def file_is_empty(path):
     return path.stat().st_size == 0
 
 
-#======================== Reading ========================#
+#======================== Legacy files ========================#
+
 
+def _legacy_role(name):
+    """ Gets the ytlink.Channel.playlists key of a playlist saved in channels.json under its name. """
+    if name.lower() == 'uploads': return 'uploads'
+    if name == 'watch_later' or name.startswith('Watch: '): return 'watch_later'
+    return name
 
-def load_channels():
+
+def load_legacy_channels():
     """ Loads the channels.json file with saved channels objects. Including their playlist information and IDs. """
-    if file_is_empty(_CHANNELS_FILE):
+    if not _CHANNELS_FILE.exists() or file_is_empty(_CHANNELS_FILE):
         return {}
 
     with open(_CHANNELS_FILE, 'r') as f: channels_dict = json.load(f)
@@ -101,93 +111,132 @@ def load_channels():
     channels = {}
     for name, channel_dict in channels_dict.items():
         # Convert the channel into a ytlink.Channel object
-        channel = ytlink.Channel(
-            name=name,
-            ID=channel_dict['ID'],
-            playlists=channel_dict['playlists']
-        )
+        channel = ytlink.Channel(name=name, ID=channel_dict['ID'])
+        for playlist_name, playlistID in channel_dict['playlists'].items():
+            channel.playlists[_legacy_role(playlist_name)] = ytlink.Playlist(
+                playlist_name, playlistID
+            )
         channels[name] = channel
 
     return channels
 
 
-def load_videos_from_channel(channel):
-    """ Loads a file containing the list of all videos published by a particular channel if it exists. Generates one if it doesn't. Updates legacy video IDs files to up to date video files.
+def load_journal(channel):
+    """ Loads the IDs of videos journaled as added from the channel's videos file by runs from before the catalog. Only read by the import, the catalog records added videos since. """
+    fname = journal_fname(channel)
+    if not fname.exists(): return set()
+
+    with open(fname, 'r') as f: return set(f.read().split())
+
+
+def load_legacy_videos(channel):
+    """ Loads the remaining videos from a channel's videos file, converting legacy video IDs files.
         
         Args:
             channel (ytlink.Channel): the channel's video files to be loaded.    
     
         Returns:
-            (list): list of ytlink.Video's
+            (list/None): list of ytlink.Video's or None if the channel has no videos file.
     
     """
     fname = videos_fname(channel)
+    if not fname.exists(): return None
+    if file_is_empty(fname): return []
 
-    if fname.exists():
-        if file_is_empty(fname): return []
+    with open(fname, 'r') as f: lines = f.read().splitlines()
 
-        # Video files already exist, read it
-        with open(fname, 'r') as f: lines = f.read().splitlines()
+    # Test whether the first line is a video JSON line or is a legacy line
+        # as simply a video ID
+    is_JSON = True
+    try:
+        json.loads(lines[0])
+    except json.JSONDecodeError as e:
+        # The lines are not JSON, must load them simply as video IDs
+        is_JSON = False
+
+    if is_JSON:
+        # Skip the videos journaled as added since the last compaction
+        added = load_journal(channel)
+        return [
+            video for video in (
+                ytlink.Video(**json.loads(videojson)) for videojson in lines
+            )
+            if video.ID not in added
+        ]
+
+    # Convert the video IDs to videos, 50 per request
+    with rstatus('Converting legacy video IDs file...'):
+        return ytlink.Video.from_IDs(
+            videoID.strip() for videoID in lines if videoID.strip()
+        )
 
-        # Test whether the first line is a video JSON line or is a legacy line
-            # as simply a video ID
-        is_JSON = True
-        try:
-            json.loads(lines[0])
-        except json.JSONDecodeError as e:
-            # The lines are not JSON, must load them simply as video IDs
-            is_JSON = False
-
-        if is_JSON:
-            return [
-                ytlink.Video(**json.loads(videojson))
-                for videojson in lines
-            ]
 
-        #--- Update legacy file ---#
-        # Convert the video IDs to videos
-        with rstatus('Updating legacy video IDs file...'):
-            videos = [ ytlink.Video.from_ID(videoID) for videoID in lines ]
+def import_legacy(catalog):
+    """ One-shot import of channels.json and the channel videos files into the catalog. The files are left in place. """
+    channels = load_legacy_channels()
+    catalog.add_channels(channels.values())
 
+    for channel in channels.values():
+        videos = load_legacy_videos(channel)
+        # Channels without a videos file have not been pulled yet
+        if videos is not None: catalog.add_videos(videos, backfilled=channel)
 
-        update_videos_file(channel, videos)
-        return videos
-        
-    #--- File doesn't exist ---#
-    print(f'Videos file for {channel.link} does not exist.')
+    # Only recorded once everything is saved, so an interrupted import reruns
+    catalog.set_meta(_IMPORTED_KEY, 1)
+    print(f'Imported {len(channels)} channels into the catalog.')
 
-    with rstatus('Generating videos file...'):
-        videos = channel.uploads(max_vids=None, chronological=True)
 
-        # Save the videos to a file
-        update_videos_file(channel, videos)
+#======================== Reading ========================#
 
-    # rstatus line is lost so replace the entire line
-    print('Generating videos file... done.')
-    return videos
 
+def load_channels(catalog):
+    """ Loads the saved channels with their playlist information and IDs. Imports the legacy channels_data files on first use, even if subscriptions.py already saved its channels to the catalog. """
+    if catalog.meta(_IMPORTED_KEY) is None and _CHANNELS_FILE.exists():
+        import_legacy(catalog)
 
-#======================== Writing ========================#
+    return catalog.channels()
 
 
-def update_channels(channels):
-    # Convert to a dictionary of channels
-    channelsdict = {
-        channel.name: channel.dict()
-        for channel in channels.values()
-    }
+def load_videos_from_channel(catalog, channel):
+    """ Loads the videos published by a particular channel that have not been added to its playlist yet. Pulls every upload of the channel into the catalog first if they never were.
+        
+        Args:
+            catalog (ytlink.catalog.Catalog): the catalog holding the videos.
 
-    with open(_CHANNELS_FILE, 'w') as f:
-        json.dump(channelsdict, f, indent=4)
-    # print(f'{_CHANNELS_FILE.name} file updated.')
-    print('Channels updated.')
+            channel (ytlink.Channel): the channel's videos to be loaded.    
+    
+        Returns:
+            (list): list of ytlink.Video's in chronological order.
+    
+    """
+    if not catalog.is_backfilled(channel):
+        print(f'Videos for {channel.link} have not been pulled.')
+
+        with rstatus('Pulling videos...'):
+            # Stream each page straight to the catalog, it keeps them ordered
+            batch = []
+            for video in channel.iter_uploads(max_vids=None):
+                batch.append(video)
+                if len(batch) >= _CATALOG_BATCH:
+                    catalog.add_videos(batch)
+                    batch = []
+
+            # Only mark the channel once every upload is saved
+            catalog.add_videos(batch, backfilled=channel)
 
+        # rstatus line is lost so replace the entire line
+        print('Pulling videos... done.')
 
-def update_videos_file(channel, videos):
-    """ Update the videos file for a given channel. """
-    with open(videos_fname(channel), 'w') as f:
-        # Convert the video objects to their JSON formatting
-        f.write('\n'.join( [video.json() for video in videos] ))
+    return catalog.pending_videos(channel, channel.playlists.get('watch_later'))
+
+
+#======================== Writing ========================#
+
+
+def update_channel(catalog, channel):
+    """ Saves the channel and its playlists to the catalog. """
+    catalog.add_channels([channel])
+    print('Channels updated.')
 
 
 #======================== Entry ========================#
@@ -198,17 +247,26 @@ def main():
 
     # Initialize YouTube object variable for usage later
     youtube = None
-    channels = load_channels()
+    catalog = ytlink.catalog.Catalog(_CATALOG_FNAME)
+    channels = load_channels(catalog)
 
     #------------- Channel information -------------#
-    # channel_name = input('Channel name: ')
-    channel_name = ytlink.tools.typing_filter.launch(
-        options=list(channels),
-        header='Press Escape to perform a search. Press Ctrl + C to quit...'
-    )
+    # A channel name given on the command line skips the channel picker
+    args = [ arg for arg in sys.argv[1:] if not arg.startswith('--') ]
+    if args:
+        # Search online for channels that aren't saved
+        channel_name = args[0] if args[0] in channels else None
+        search = args[0]
+    else:
+        channel_name = ytlink.tools.typing_filter.launch(
+            options=list(channels),
+            header='Press Escape to perform a search. Press Ctrl + C to quit...'
+        )
+        search = None
 
     if channel_name is None:
-        channel_name = input('Search online for channel: ').strip()
+        if search is None: search = input('Search online for channel: ').strip()
+        channel_name = search
 
         if channel_name == '':
             print('[fail]Search canceled.')
@@ -216,10 +274,10 @@ def main():
             sys.exit()
 
         # Found the channel
-        channel = _channel_search_request(channel_name)
+        channel = _channel_search_request(channel_name, channels)
         channels[channel.name] = channel
-        # Save the results to file
-        update_channels(channels)
+        # Save the results to the catalog
+        update_channel(catalog, channel)
     else:    
         channel = channels[channel_name]
 
@@ -227,7 +285,7 @@ def main():
     #------------- Get videos -------------#
 
     # Get the videos associated to the channel
-    videos = load_videos_from_channel(channel)
+    videos = load_videos_from_channel(catalog, channel)
 
     if not videos:
         # The videos file exists but is empty, this channel must be complete.
@@ -257,7 +315,7 @@ def main():
 
         # Update the channels
         channel.playlists['watch_later'] = playlist
-        update_channels(channels)
+        update_channel(catalog, channel)
     else:
         # Playlist already exists
         playlist = channel.playlists['watch_later']
@@ -269,26 +327,46 @@ def main():
         # YouTube object has not been initialized
         youtube = ytlink.init_youtube()
 
-    # Go through each video with rich progress bar
+    # Go through the videos in batches with rich progress bar
     counter = 0
     with Progress() as progress:
-        for _ in progress.track(range(len(videos))):
-            video = videos.pop(0)
-            progress.print(f'Adding video: [emph]{video.link}[/].')
-
-            try:
-                ytlink.add_video_to_playlist(youtube, playlist, video)
-                counter += 1
-                # Update the videos file since it was successful
-                update_videos_file(channel, videos)
-                
-            except Exception as e:
-                progress.stop()
-                ytlink.error.parse(e, quit=False)
-                print() # Padding
-                break
-
-    # Update the videos file
+        task = progress.add_task('Adding', total=len(videos))
+
+        def acknowledge(batch, results):
+            """ Saves progress once a batch has been acknowledged. """
+            nonlocal counter
+            batch_added, batch_failed = [], []
+            for video, error in zip(batch, results):
+                if error is None:
+                    progress.print(f'Added video: [emph]{video.link}[/].')
+                    batch_added.append(video)
+                elif ytlink.workqueue.is_rejected(error):
+                    progress.print(f'[fail]Could not add[/] {video.link}, dropping it.')
+                    batch_failed.append(video)
+
+            counter += len(batch_added)
+            catalog.mark_added(playlist, batch_added)
+            # Deleted and private videos are never sent again
+            if batch_failed: catalog.mark_failed(playlist, batch_failed)
+            progress.advance(task, len(batch))
+
+        try:
+            # Keep the playlist in chronological order unless asked otherwise
+            results = ytlink.add_videos_to_playlist(
+                youtube, playlist, videos, ordered=_BATCH_ARG not in sys.argv,
+                callback=acknowledge
+            )
+            # Only failures that may clear up on a later run are reported
+            errors = [
+                error for error in results
+                if error is not None and not ytlink.workqueue.is_rejected(error)
+            ]
+            if errors: raise errors[0]
+        except Exception as e:
+            progress.stop()
+            ytlink.error.parse(e, quit=False)
+            print() # Padding
+
     print(f'{counter} videos added to playlist.')
 
 
@@ -297,4 +375,7 @@ if __name__ == '__main__':
     try:
         main()
     except KeyboardInterrupt as e:
-        print('\nKeyboard interrupt.')
\ No newline at end of file
+        print('\nKeyboard interrupt.')
+    finally:
+        # Runs on quota exits too, where knowing what was spent matters most
+        ytlink.metrics.dump_from_args(sys.argv)
\ No newline at end of file
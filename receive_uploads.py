@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Adds new videos from subscriptions to the Watch Later playlist as soon as YouTube pushes them.
+
+Subscribes to every channel's uploads through YouTube's WebSub hub and
+serves the callback the hub notifies. Subscriptions are renewed from the
+lease the hub grants, and the subscription list is checked every few hours
+for channels to subscribe to or drop. Needs a callback url reachable from
+the internet, set in settings.json under "websub".
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import sys
+import time
+import threading
+import commentjson as json
+from pathlib import Path
+from datetime import timedelta
+#--- Custom imports ---#
+from ytlink.tools.console import *
+import ytlink
+import ytlink.catalog
+import ytlink.metrics
+import ytlink.filters
+import ytlink.websub
+#======================== Fields ========================#
+# Location of the local catalog holding the queue of videos to add
+_CATALOG_FNAME = Path(__file__).parent / 'catalog.db'
+# Default port served on, behind whatever proxy the callback url points to
+_PORT = 8080
+# Seconds between checks of the subscription list for new and removed channels
+_REFRESH_SECONDS = 6 * 60 * 60
+#======================== Helper ========================#
+
+
+def load_settings():
+    """ Loads user settings with information such as the filters and callback url. """
+    with open(Path(__file__).parent / 'settings.json', 'r') as f:
+        return json.load(f)
+
+
+def make_route(settings, subscriptions):
+    """ Gets the function giving the playlist a video should be added to, None for filtered videos. """
+    watch_later_playlist = ytlink.Playlist(
+        'Auto Watch Later', settings['watch_laterID']
+    )
+    filters = ytlink.filters.FilterSet(settings['filters'], subscriptions)
+    for name in filters.unknown:
+        print(f'[warning]Filters for {name} ignored[/], not subscribed.')
+    # Playlist IDs for custom channel specific watch later playlists
+    playlists = {
+        name: ytlink.Playlist(f'Custom for playlist for: {name}', ID)
+        for name, ID in settings['playlists'].items()
+    }
+
+    def route(video):
+        if ( filt := filters.match(video) ) is not None:
+            print(
+                f'Skipping [warning]{video.link}[/] from {video.channel.link} '
+                f'to Watch Later playlist; filter: [warning]{filt}[/] '
+                f'published on {video.date}...'
+            )
+            return None
+
+        return playlists.get(video.channel.name, watch_later_playlist)
+
+    return route
+
+
+#======================== Entry ========================#
+
+
+def main():
+    settings = load_settings()
+    websub = settings.get('websub', {})
+    if not websub.get('callback'):
+        print('[warning]Set the websub callback url in settings.json[/], exiting...')
+        sys.exit(-1)
+
+    youtube = ytlink.init_youtube()
+    subscriptions = ytlink.get_subscriptions(youtube)
+
+    catalog = ytlink.catalog.Catalog(_CATALOG_FNAME)
+    receiver = ytlink.websub.Receiver(
+        catalog, make_route(settings, subscriptions), subscriptions,
+        secret=websub.get('secret'),
+        max_age=timedelta(hours=websub.get('max_age_hours', 24)),
+        ordered=settings.get('ordered_inserts', True)
+    )
+
+    server = receiver.server(websub.get('host', ''), websub.get('port', _PORT))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    stop = threading.Event()
+    worker = threading.Thread(
+        target=receiver.run_inserts, args=(youtube, stop), daemon=True
+    )
+    worker.start()
+
+    def request(channels, mode='subscribe'):
+        """ Asks the hub to (un)subscribe to the channels, returning those that failed. """
+        with rstatus(f'Requesting to {mode} to {len(channels)} channels...'):
+            return ytlink.websub.subscribe_all(
+                channels, websub['callback'], secret=websub.get('secret'),
+                max_workers=settings.get('max_workers', 1), mode=mode
+            )
+
+    next_refresh = time.monotonic() + _REFRESH_SECONDS
+    try:
+        while True:
+            # New subscriptions, unverified ones and those whose granted
+                # lease is running out
+            if renewals := receiver.renewals():
+                receiver.requested(renewals)
+                failed = request(renewals)
+                print(
+                    f'Subscribed to [emph]{len(renewals) - len(failed)}[/] channels, '
+                    f'listening for uploads from {len(receiver.channels)} '
+                    f'channels at {websub["callback"]}...'
+                )
+
+            if time.monotonic() >= next_refresh:
+                subscriptions = ytlink.get_subscriptions(youtube)
+                added, removed = receiver.update_channels(
+                    subscriptions, route=make_route(settings, subscriptions)
+                )
+                if removed: request(removed, mode='unsubscribe')
+                if added or removed:
+                    print(
+                        f'Subscribed to [emph]{len(added)}[/] and unsubscribed '
+                        f'from [emph]{len(removed)}[/] channels.'
+                    )
+                next_refresh = time.monotonic() + _REFRESH_SECONDS
+                # The new channels are subscribed to right away
+                continue
+
+            wait = next_refresh - time.monotonic()
+            renewal = receiver.next_renewal()
+            if renewal is not None: wait = min(wait, renewal)
+            if stop.wait(max(1, wait)): break
+    finally:
+        stop.set()
+        server.shutdown()
+        worker.join()
+        catalog.close()
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt as e:
+        print('\nKeyboard interrupt.')
+    finally:
+        ytlink.metrics.dump_from_args(sys.argv)
@@ -13,14 +13,55 @@ import commentjson as json
 from datetime import datetime, timedelta
 from pathlib import Path
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 #--- Custom imports ---#
 from ytlink.tools.console import *
 import ytlink
+import ytlink.quota
+import ytlink.retry
+import ytlink.marks
+import ytlink.catalog
+import ytlink.metrics
+import ytlink.filters
+import ytlink.feeds
+import ytlink.schedule
+import ytlink.workqueue
+import ytlink.connection
 #======================== Fields ========================#
 # Flag for testing run
 _TESTING_ARG = '--testing'
 # Location of last run file
 _LAST_RUN_FNAME = Path(__file__).parent / 'last_run.txt'
+# Location of the newest video seen for each channel
+_MARKS_FNAME = Path(__file__).parent / 'channel_marks.json'
+# Location of the local catalog of channels and videos
+_CATALOG_FNAME = Path(__file__).parent / 'catalog.db'
+# Location of the cached subscription list
+_SUBSCRIPTIONS_FNAME = Path(__file__).parent / 'subscriptions.json'
+# Flag for requesting the whole subscription list instead of revalidating it
+_REFRESH_ARG = '--refresh'
+# Flag for only pulling channels whose Atom feeds show new uploads
+_FEEDS_ARG = '--feeds'
+# Location of the validators and newest upload of each channel's feed
+_FEEDS_FNAME = Path(__file__).parent / 'feeds.json'
+# Flag for running until interrupted, checking each channel on its own schedule
+_DAEMON_ARG = '--daemon'
+# Location of the last time each channel was checked by the daemon
+_SCHEDULE_FNAME = Path(__file__).parent / 'schedule.json'
+# Share of the daily quota the daemon plans checks with, the rest is left
+    # for adding videos
+_DAEMON_CHECK_SHARE = 0.5
+# Seconds the daemon waits for quota to free up
+_QUOTA_WAIT = 60 * 60
+# Seconds the daemon waits with no channel scheduled, and after its first
+    # failed round, doubling with each failure up to _QUOTA_WAIT
+_DAEMON_IDLE_WAIT = 5 * 60
+# Time a channel that failed to be checked waits, doubling with each failure
+    # in a row up to ytlink.schedule.MAX_INTERVAL
+_DAEMON_CHANNEL_WAIT = timedelta(hours=1)
+# Rounds of checks between revalidations of the subscription list
+_DAEMON_REFRESH_ROUNDS = 24
 #======================== Helper ========================#
 
 
@@ -30,9 +71,22 @@ def load_settings():
         return json.load(f)
 
 
-def update_last_run():
+def use_client_settings(settings):
+    """ Paces Data API requests and switches to orjson for decoding responses as the settings ask. """
+    ytlink.retry.pace(
+        settings.get('requests_per_second', ytlink.retry.REQUESTS_PER_SECOND)
+    )
+    if not settings.get('fast_json', False): return
+    if not ytlink.connection.use_fast_json():
+        print('[warning]orjson is not installed[/], decoding responses with json.')
+
+
+def update_last_run(date=None):
+    """ Saves the time of this run, or the date the next run should resume from. """
+    if date is None: date = datetime.now()
+
     with open(_LAST_RUN_FNAME, 'w') as f:
-        f.write(str(datetime.now()))
+        f.write(date.strftime('%Y-%m-%d %H:%M:%S.%f'))
 
 
 def load_last_run():
@@ -43,20 +97,444 @@ def load_last_run():
     return datetime.strptime(last_run, '%Y-%m-%d %H:%M:%S.%f')
 
 
-def filter_video(filters, video):
-    """ Compares the video's information based off of filters provided for the given channel and returns the filter if that was triggered or None if the video should not be filtered. """
-    channel = video.channel
-    if channel.name not in filters: return None
+def restore_uploads_playlists(catalog, subscriptions):
+    """ Gives each subscription the uploads playlist saved in the catalog to skip looking it up again. """
+    saved = { channel.ID: channel for channel in catalog.channels().values() }
+    for channel in subscriptions:
+        if channel.ID not in saved: continue
+
+        uploads = saved[channel.ID].playlists.get('uploads')
+        if uploads is None: continue
+
+        uploads._channel = channel
+        channel.playlists['uploads'] = uploads
+
+
+def drop_added(catalog, queued):
+    """ Drops the (playlist, video) pairs the catalog has already added. """
+    by_playlist = {}
+    for playlist, video in queued:
+        by_playlist.setdefault(playlist.ID, (playlist, []))[1].append(video)
+
+    added = set()
+    for playlist, videos in by_playlist.values():
+        added.update(
+            (playlist.ID, ID) for ID in catalog.added_IDs(playlist, videos)
+        )
+
+    return [
+        (playlist, video) for playlist, video in queued
+        if (playlist.ID, video.ID) not in added
+    ]
+
+
+def route_videos(videos, filters, playlists, watch_later_playlist):
+    """ Pairs each video that passes the filters with the playlist it goes to.
+
+        Args:
+            videos (list): list of ytlink.Video's in date order.
+
+            filters (ytlink.filters.FilterSet): the user's filters.
+
+            playlists (dict): playlist IDs of channel specific playlists keyed by channel name.
+
+            watch_later_playlist (ytlink.Playlist): the playlist for every other channel.
+
+        Returns:
+            (list): (ytlink.Playlist, ytlink.Video) pairs in date order.
+
+    """
+    queued = []
+    for video in videos:
+
+        # Check whether the video should be skipped according to user filters
+        if ( filt := filters.match(video) ) is not None:
+            print(
+                f'Skipping [warning]{video.link}[/] from {video.channel.link} '
+                f'to Watch Later playlist; filter: [warning]{filt}[/] '
+                f'published on {video.date}...'
+            )
+            continue
+
+        # Check whether this video should be added to a special playlist
+        channel_name = video.channel.name
+        playlist = watch_later_playlist if channel_name not in playlists else ytlink.Playlist(f'Custom for playlist for: {channel_name}', playlists[channel_name])
+
+        queued.append((playlist, video))
+
+    return queued
+
+
+def estimate_pull_cost(subscriptions):
+    """ Estimates the quota units needed to pull new uploads: an uploads playlist lookup if not stored and a page of uploads for each channel. """
+    cost = ytlink.quota.cost
+    return sum(
+        cost('playlistItems.list')
+        + (0 if 'uploads' in channel.playlists else cost('channels.list'))
+        for channel in subscriptions
+    )
+
+
+def add_queue(youtube, catalog, channels, playlists, ordered=True):
+    """ Adds the videos queued in the catalog the remaining quota allows, printing each video as its batch is acknowledged.
+
+        Args:
+            youtube: the YouTube object from init_youtube.
+
+            catalog (ytlink.catalog.Catalog): the catalog holding the queue.
+
+            channels (dict): ytlink.Channel's keyed by ID.
+
+            playlists (dict): ytlink.Playlist's keyed by ID.
+
+        Kwargs:
+            ordered (bool): whether to keep each playlist in date order, sending one insert at a time. False sends batches of 50 inserts.
+
+        Returns:
+            (tuple): whether the whole queue was added and the number of videos added.
+
+    """
+    # Unacknowledged inserts of an interrupted run may go back in the queue
+    total = sum(
+        len(videos) for queue in (catalog.queued_videos(), catalog.sending_videos())
+        for videos in queue.values()
+    )
+    video_counter = 0
+    with Progress('Adding videos') as progress:
+        task = progress.add_task('Adding', total=total)
+
+        def acknowledge(playlist, batch, results):
+            nonlocal video_counter
+            for video, error in zip(batch, results):
+                if error is not None: continue
+                channel = channels.get(video._channelID)
+                source = f' from {channel.link}' if channel is not None else ''
+                progress.print(
+                    f'Added [emph]{video.link}[/]{source} to '
+                    f'{playlist.link}; published on {video.date}...'
+                )
+                video_counter += 1
+
+            progress.advance(task, len(batch))
+
+        done = ytlink.workqueue.add_queued(
+            youtube, catalog, playlists=playlists, channels=channels,
+            callback=acknowledge, ordered=ordered
+        )
+
+    return done, video_counter
+
+
+def pull_uploads(
+        subscriptions, after_date, max_workers=1, marks=None, after_dates=None,
+        failed=None
+    ):
+    """ Pulls the uploads of every subscription through a bounded pool of workers. A channel that can't be pulled, i.e. a deleted channel, is reported and skipped, only an exhausted quota stops the others.
+        
+        Args:
+            subscriptions (list): list of ytlink.Channel's to pull from.
+
+            after_date (datetime.datetime): only get the videos after the given date for channels without a mark.
+    
+        Kwargs:
+            max_workers (int): the maximum number of channels to pull concurrently.
+
+            marks (ytlink.marks.Marks): the newest video seen for each channel. Pulling a channel with a mark stops at that video.
+
+            after_dates (dict): the date to get the videos after for channels without a mark keyed by channel ID, in place of after_date.
+
+            failed (dict): filled with the error of each channel that was skipped keyed by channel ID.
+    
+        Returns:
+            (list): list of ytlink.Video's sorted by date.
+    
+    """
+    # Set on the first failure so queued workers return without any requests
+    stop = threading.Event()
+    if failed is None: failed = {}
+
+    def pull_channel(channel):
+        mark = marks.get(channel.ID) if marks is not None else None
+        if mark is None:
+            videos = channel.iter_uploads(after_date=(after_dates or {}).get(channel.ID, after_date))
+        else:
+            # Stop paging at the newest video already seen from this channel
+            videos = channel.iter_uploads(after_date=mark.date, until_ID=mark.videoID)
+
+        pulled = []
+        try:
+            for video in videos:
+                # Workers in flight stop paging as well
+                if stop.is_set(): break
+                pulled.append(video)
+        finally:
+            # Drops the prefetched page
+            videos.close()
+        return pulled
+
+    def pull(channel):
+        if stop.is_set(): return []
+
+        try:
+            return pull_channel(channel)
+        except (Exception, SystemExit) as e:
+            # Failed requests exit through ytlink.error.parse, nothing more can
+                # be pulled once they exhausted the quota
+            if ytlink.quota.ledger.remaining == 0:
+                stop.set()
+                raise
+            failed[channel.ID] = e
+            return None
+
+    # Keep each channel's results in subscription order so ties in the date
+        # sort are broken the same way as a serial run
+    results = [[] for _ in subscriptions]
+    with Progress('Pulling from subscriptions') as progress:
+        task = progress.add_task('Pulling', total=len(subscriptions))
+        executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+        futures = {
+            executor.submit(pull, channel): i
+            for i, channel in enumerate(subscriptions)
+        }
+
+        try:
+            for future in as_completed(futures):
+                i = futures[future]
+                results[i] = future.result()
+                if results[i] is None:
+                    results[i] = []
+                    channel = subscriptions[i]
+                    error = failed[channel.ID]
+                    # Errors parsed on exit have already been printed
+                    detail = '' if isinstance(error, SystemExit) else f': {type(error).__name__}: {error}'
+                    progress.print(f'[fail]Could not pull[/] {channel.link}{detail}, skipping it.')
+                progress.advance(task)
+        except urllib.error.HTTPError as e:
+            stop.set()
+            # Remove the progress bar
+            progress.stop()
+            
+            if e.code == 403:
+                print('[warning]Quota exceeded, exiting...')
+            else:
+                print(f'[warning]Unhandled HTTPError: {e.code}, exiting...')
+                print(e.msg)
+            
+            sys.exit(-1)
+        except BaseException:
+            # Quota exits and keyboard interrupts from any worker
+            stop.set()
+            progress.stop()
+            raise
+        finally:
+            # Drop the queued channels and wait on the ones in flight
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    videos = [video for channel_videos in results for video in channel_videos]
+    # Sort videos by date
+    return sorted(videos, key=lambda video: video.date)
+
+
+def run_daemon(
+        settings, youtube, subscriptions, catalog, marks, after_date,
+        subscription_cache=None
+    ):
+    """ Checks each subscription whenever its schedule says new uploads are likely, until interrupted. Channels that upload often are checked often and dormant ones rarely, all within the daily quota. A channel that fails to be checked, i.e. a deleted channel, waits longer with each failure while the others keep their schedule, and a round that fails is reported and retried after a growing wait.
+
+        Args:
+            settings (dict): the user settings.
+
+            youtube: the YouTube object from init_youtube.
+
+            subscriptions (list): list of ytlink.Channel's to check.
+
+            catalog (ytlink.catalog.Catalog): the catalog with the upload history and the queue of videos to add.
+
+            marks (ytlink.marks.Marks): the newest video seen for each channel.
+
+            after_date (datetime.datetime): only get the videos after the given date for channels without a mark that haven't been checked yet.
+
+        Kwargs:
+            subscription_cache (ytlink.SubscriptionCache): the cache subscriptions were read through. The list is revalidated through it every _DAEMON_REFRESH_ROUNDS rounds, None to keep checking the same subscriptions.
 
-    # Lower case for case insensitive comparison
-    lower_name = video.name.lower()
-    lower_desc = video.description.lower() if video.description is not None else ''
+    """
+    watch_later_playlist = ytlink.Playlist(
+        'Auto Watch Later', settings['watch_laterID']
+    )
+    playlists = settings['playlists']
+    max_workers = settings.get('max_workers', 1)
+
+    ledger = ytlink.quota.ledger
+    ledger.limit = settings.get('daily_quota', ytlink.quota.DAILY_LIMIT)
+    scheduler = ytlink.schedule.Scheduler(
+        _SCHEDULE_FNAME,
+        checks_per_day=int(
+            ledger.limit * _DAEMON_CHECK_SHARE
+            // ytlink.quota.cost('playlistItems.list')
+        )
+    )
+    # Channels without a mark get the videos after their last check
+    after_dates = {}
+    # Number of failed checks in a row of each failing channel
+    channel_failures = {}
+    # Channels and filters of the current subscriptions
+    channels, filters = {}, None
+
+    def track(subscriptions, added=(), removed=(), since=after_date):
+        """ Schedules the added channels and forgets the removed ones. """
+        nonlocal channels, filters
+        # Channels already tracked keep their uploads playlists
+        channels = {
+            channel.ID: channels.get(channel.ID, channel) for channel in subscriptions
+        }
+        filters = ytlink.filters.FilterSet(settings['filters'], list(channels.values()))
+
+        for channelID in removed:
+            scheduler.remove(channelID)
+            after_dates.pop(channelID, None)
+            channel_failures.pop(channelID, None)
+        if marks is not None: marks.remove(removed)
+        restore_uploads_playlists(catalog, added)
+        for channel in added:
+            after_dates[channel.ID] = since
+            scheduler.schedule(channel.ID, catalog.upload_dates(channel.ID, ytlink.schedule.HISTORY))
+
+    track(subscriptions, added=subscriptions)
+    print(
+        f'Checking [emph]{len(subscriptions)}[/] channels on their own schedules, '
+        f'about [emph]{scheduler.planned / scheduler.stretch:.0f}[/] checks a day...'
+    )
 
-    for filt in filters[channel.name]:
-        lower_filt = filt.lower()
-        if lower_filt in lower_name or lower_filt in lower_desc: return filt
+    def acknowledge(playlist, batch, results):
+        for video, error in zip(batch, results):
+            if error is not None: continue
+            print(
+                f'Added [emph]{video.link}[/] from {video.channel.link} to '
+                f'{playlist.link}; published on {video.date}...'
+            )
+
+    def refresh(since):
+        """ Revalidates the subscription list, new subscriptions get the videos after since. """
+        subscriptions = ytlink.get_subscriptions(youtube, cache=subscription_cache)
+        added, removed = subscription_cache.added, subscription_cache.removed
+        if not added and not removed: return
+
+        track(subscriptions, added=added, removed=removed, since=since)
+        print(
+            f'Subscribed to [emph]{len(added)}[/] and unsubscribed from '
+            f'[emph]{len(removed)}[/] channels, checking '
+            f'[emph]{len(subscriptions)}[/] channels.'
+        )
+
+    def check():
+        """ Adds the queued videos and checks the channels that are due. Returns the seconds to wait before the next round, None if channels were checked. """
+        # Channels taken off the schedule by a failed round are put back
+        for channelID in channels:
+            if channelID not in scheduler:
+                scheduler.schedule(channelID, catalog.upload_dates(channelID, ytlink.schedule.HISTORY))
+
+        # Videos left over by a quota shortfall or an earlier run go first
+        ytlink.workqueue.add_queued(
+            youtube, catalog, channels=channels, callback=acknowledge,
+            ordered=settings.get('ordered_inserts', True)
+        )
+
+        next_due = scheduler.next_due()
+        if next_due is None: return _DAEMON_IDLE_WAIT
+        wait = (next_due - ytlink.schedule.utcnow()).total_seconds()
+        if wait > 0: return wait
+
+        # Only take the channels the remaining quota can check
+        due = [ channelID for channelID in scheduler.due() if channelID in channels ]
+        if not due: return 0
+        checked = []
+        cost = 0
+        for channelID in due:
+            cost += estimate_pull_cost([ channels[channelID] ])
+            if cost > ledger.remaining: break
+            checked.append(channels[channelID])
+        # The rest wait for quota with their schedule unchanged
+        for channelID in due[len(checked):]:
+            scheduler.schedule(channelID, catalog.upload_dates(channelID, ytlink.schedule.HISTORY))
+        if not checked:
+            print('[warning]Not enough quota to check any channel[/], waiting...')
+            return _QUOTA_WAIT
+
+        start = datetime.now()
+        failed = {}
+        videos = pull_uploads(
+            checked, after_date=after_date, max_workers=max_workers,
+            marks=marks, after_dates=after_dates, failed=failed
+        )
+        catalog.add_channels(checked)
+        catalog.add_videos(videos)
+
+        now = ytlink.schedule.utcnow()
+        # Failed channels back off alone, their last check is unchanged
+        for channelID in failed:
+            channel_failures[channelID] = channel_failures.get(channelID, 0) + 1
+            scheduler.postpone(channelID, now + min(
+                ytlink.schedule.MAX_INTERVAL,
+                _DAEMON_CHANNEL_WAIT * 2 ** (channel_failures[channelID] - 1)
+            ))
+        checked = [ channel for channel in checked if channel.ID not in failed ]
+        scheduler.checked([ channel.ID for channel in checked ], now=now)
+        for channel in checked:
+            channel_failures.pop(channel.ID, None)
+            after_dates[channel.ID] = start
+            scheduler.schedule(
+                channel.ID, catalog.upload_dates(channel.ID, ytlink.schedule.HISTORY),
+                now=now
+            )
+        scheduler.save()
+
+        queued = drop_added(
+            catalog,
+            route_videos(videos, filters, playlists, watch_later_playlist)
+        )
+        by_playlist = {}
+        for playlist, video in queued:
+            by_playlist.setdefault(playlist.ID, (playlist, []))[1].append(video)
+        for playlist, playlist_videos in by_playlist.values():
+            catalog.queue_videos(playlist, playlist_videos)
+        # Queued videos are kept by the catalog, the marks can pass them
+        if marks is not None: marks.advance(videos)
+
+        print(
+            f'Checked {len(checked)} channels, queued [emph]{len(queued)}[/] '
+            f'new videos; next check at {scheduler.next_due()} UTC.'
+        )
+
+    # Number of rounds that checked channels and of failed rounds in a row
+    rounds = failures = 0
+    # Round and time of the last revalidation of the subscription list
+    refresh_round, last_refresh = 0, datetime.now()
+    while True:
+        try:
+            if (
+                subscription_cache is not None
+                and rounds - refresh_round >= _DAEMON_REFRESH_ROUNDS
+            ):
+                now = datetime.now()
+                refresh(since=last_refresh)
+                refresh_round, last_refresh = rounds, now
+
+            wait = check()
+            failures = 0
+        except (Exception, SystemExit) as e:
+            # Failed requests exit through ytlink.error.parse, i.e. when the
+                # quota runs out
+            failures += 1
+            wait = min(_QUOTA_WAIT, _DAEMON_IDLE_WAIT * 2 ** (failures - 1))
+            print(
+                f'[fail]Round failed:[/] {type(e).__name__}: {e}; '
+                f'trying again in {wait:.0f} seconds...'
+            )
 
-    return None
+        if wait is None:
+            rounds += 1
+        elif wait > 0:
+            time.sleep(wait)
 
 
 #======================== Entry ========================#
@@ -64,6 +542,7 @@ def filter_video(filters, video):
 
 def main():
     settings = load_settings()
+    use_client_settings(settings)
     # Playlist ID for watch later playlist
     watch_later_playlist = ytlink.Playlist(
         'Auto Watch Later', settings['watch_laterID']
@@ -84,11 +563,84 @@ def main():
     print( f'Last run: {last_run}\n' )
 
     youtube = ytlink.init_youtube()
-    subscriptions = ytlink.get_subscriptions(youtube)
+    subscription_cache = ytlink.SubscriptionCache(_SUBSCRIPTIONS_FNAME)
+    subscriptions = ytlink.get_subscriptions(
+        youtube, cache=subscription_cache, refresh=_REFRESH_ARG in sys.argv
+    )
+    if subscription_cache.added or subscription_cache.removed:
+        print(
+            f'Subscribed to [emph]{len(subscription_cache.added)}[/] and '
+            f'unsubscribed from [emph]{len(subscription_cache.removed)}[/] '
+            'channels since the last run.'
+        )
 
     # If testing, only check 5 subscriptions to limit hits
     if _TESTING_FLAG: subscriptions = subscriptions[:8]
 
+    catalog = ytlink.catalog.Catalog(_CATALOG_FNAME)
+    restore_uploads_playlists(catalog, subscriptions)
+
+    # Testing runs neither use nor move the channel marks
+    marks = None if _TESTING_FLAG else ytlink.marks.Marks(_MARKS_FNAME)
+    if marks is not None: marks.remove(subscription_cache.removed)
+    max_workers = settings.get('max_workers', 1)
+
+    if _DAEMON_ARG in sys.argv:
+        return run_daemon(
+            settings, youtube, subscriptions, catalog, marks, after_date=last_run,
+            # Testing runs keep to their few subscriptions
+            subscription_cache=None if _TESTING_FLAG else subscription_cache
+        )
+
+    ledger = ytlink.quota.ledger
+    ledger.limit = settings.get('daily_quota', ytlink.quota.DAILY_LIMIT)
+    channels = { channel.ID: channel for channel in subscriptions }
+    playlists = {
+        ID: ytlink.Playlist(f'Custom for playlist for: {name}', ID)
+        for name, ID in settings['playlists'].items()
+    }
+    playlists[watch_later_playlist.ID] = watch_later_playlist
+    # Batched inserts are far faster but land in any order
+    ordered = settings.get('ordered_inserts', True)
+
+    #--- Resume the queue left by an interrupted run ---#
+    if not _TESTING_FLAG and (catalog.queued_videos() or catalog.sending_videos()):
+        print('Resuming the videos queued by the last run...')
+        done, video_counter = add_queue(
+            youtube, catalog, channels, playlists, ordered=ordered
+        )
+        print(f'Updated playlist with {video_counter} queued videos.')
+        if not done:
+            # Pulling more only grows a queue the quota can't add
+            print('[warning]Videos left queued[/] for the next run, exiting...')
+            return
+
+    #--- Only pull channels with new uploads in their feeds ---#
+    pulled = subscriptions
+    if settings.get('feeds', False) or _FEEDS_ARG in sys.argv:
+        cache = ytlink.feeds.FeedCache(_FEEDS_FNAME)
+        cache.remove(subscription_cache.removed)
+        with rstatus('Checking feeds for new uploads...'):
+            pulled = ytlink.feeds.changed_channels(
+                subscriptions, marks=marks, after_date=last_run,
+                cache=cache, max_workers=max_workers
+            )
+        cache.save()
+        print(
+            f'Feeds show new uploads from [emph]{len(pulled)}[/] of '
+            f'{len(subscriptions)} subscriptions.'
+        )
+
+    #--- Preflight quota check ---#
+    pull_cost = estimate_pull_cost(pulled)
+    print(
+        f'Quota: [emph]{ledger.remaining}[/] units remaining, '
+        f'pulling from subscriptions needs about [emph]{pull_cost}[/].'
+    )
+    if pull_cost > ledger.remaining:
+        print('[warning]Not enough quota to pull from subscriptions, exiting...')
+        sys.exit(-1)
+
     #------------- Get newest videos -------------#
     # Multiply the number of days passed by the multiplier to 
         # mitigate number of videos requested
@@ -97,79 +649,69 @@ def main():
     # Add one to handle running the script in the same day
     max_vids = (last_run_days + 1) * multiplier
 
-    videos = []
-    with Progress('Pulling from subscriptions') as progress:
-        for channel in progress.track(subscriptions):
-
-            #--- Attempt to pull videos, handle quota error ---#
-            try:
-                videos += channel.uploads(after_date=last_run)
-            except urllib.error.HTTPError as e:
-                # Remove the progress bar
-                progress.stop()
-                
-                if e.code == 403:
-                    print('[warning]Quota exceeded, exiting...')
-                else:
-                    print(f'[warning]Unhandled HTTPError: {e.code}, exiting...')
-                    print(e.msg)
-                
-                sys.exit(-1)
-
-    # Sort videos by date
-    videos = sorted(videos, key=lambda video: video.date)
+    # Uploads from here on are left to the next run
+    start = datetime.now()
+    videos = pull_uploads(
+        pulled, after_date=last_run, max_workers=max_workers, marks=marks
+    )
+    # Save the subscriptions with their uploads playlists and the new videos
+    catalog.add_channels(subscriptions)
+    catalog.add_videos(videos)
 
     #------------- Add videos to playlist -------------#
-    video_counter = 0
     print('Loading filters...')
-    filters = settings['filters']
-    # Playlist IDs for custom channel specific watch later playlists
-    playlists = settings['playlists']
-
-    with Progress('Adding videos') as progress:
-        for video in progress.track(videos):
-
-            # Check whether the video should be skipped according to user filters
-            if ( filt := filter_video(filters, video) ) is not None:
-                progress.print(
-                    f'Skipping [warning]{video.link}[/] from {video.channel.link} '
-                    f'to Watch Later playlist; filter: [warning]{filt}[/] '
-                    f'published on {video.date}...'
-                )
-                continue
-
-            # Check whether this video should be added to a special playlist
-            channel_name = video.channel.name
-            playlist = watch_later_playlist if channel_name not in playlists else ytlink.Playlist(f'Custom for playlist for: {channel_name}', playlists[channel_name])
-
-            progress.print(
-                f'Adding [emph]{video.link}[/] from {video.channel.link} to '
-                f'{playlist.link}; published on {video.date}...'
-            )
-        
-            # Skip on testing
-            if not _TESTING_FLAG:
-                ytlink.add_video_to_playlist(youtube, playlist, video)
-            else:
-                # Simulate adding to playlist delay by sleeping
-                time.sleep(0.8)
+    # Compiled once and keyed by channel ID, no channel lookups while filtering
+    filters = ytlink.filters.FilterSet(settings['filters'], subscriptions)
+    for name in filters.unknown:
+        print(f'[warning]Filters for {name} ignored[/], not subscribed.')
+
+    # (playlist, video) pairs to add in date order
+    queued = route_videos(
+        videos, filters, settings['playlists'], watch_later_playlist
+    )
 
-            video_counter += 1
+    # Never add a video twice, even if an earlier run died before saving
+    queued = drop_added(catalog, queued)
 
+    # Videos to add grouped by target playlist, kept in date order
+    by_playlist = {}
+    for playlist, video in queued:
+        by_playlist.setdefault(playlist.ID, (playlist, []))[1].append(video)
 
+    if _TESTING_FLAG:
+        # Skip on testing, simulate adding to playlist delay by sleeping
+        for playlist, playlist_videos in by_playlist.values():
+            time.sleep(0.8)
+            for video in playlist_videos:
+                print(
+                    f'Added [emph]{video.link}[/] from {video.channel.link} to '
+                    f'{playlist.link}; published on {video.date}...'
+                )
+        print(f'Updated playlist with {len(queued)} videos successfully.')
+        return
+
+    # Save the videos to add with their playlists before adding any, an
+        # interrupted run is resumed from the queue instead of pulling again
+    for playlist, playlist_videos in by_playlist.values():
+        catalog.queue_videos(playlist, playlist_videos)
+    marks.advance(videos)
+    update_last_run(start)
+
+    done, video_counter = add_queue(
+        youtube, catalog, channels, playlists, ordered=ordered
+    )
     if video_counter > 0:
         print(f'Updated playlist with {video_counter} videos successfully.')
     else:
         print('No new videos.')
+    if not done: print('[warning]Videos left queued[/] for the next run.')
 
-        
-    # On success, save the last run
-    if not _TESTING_FLAG: update_last_run()
-
-    
 
 if __name__ == '__main__':
     try:
         main()
     except KeyboardInterrupt as e:
-        print('\nKeyboard interrupt.')
\ No newline at end of file
+        print('\nKeyboard interrupt.')
+    finally:
+        # Runs on quota exits too, where knowing what was spent matters most
+        ytlink.metrics.dump_from_args(sys.argv)
\ No newline at end of file
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Fixtures running ytlink against ytlink.tools.fake_api.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import pytest
+#--- Custom imports ---#
+import ytlink
+import ytlink.quota
+import ytlink.retry
+import ytlink.metrics
+from ytlink.tools.fake_api import FakeYouTube, FakeServer
+#======================== Fixtures ========================#
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """ Serves a small FakeYouTube and points ytlink at it with a fresh quota ledger, metrics and a fast retry policy. """
+    server = FakeServer(
+        FakeYouTube(num_channels=5, num_videos=120, page_size=50)
+    ).start()
+
+    (tmp_path / 'api_key.txt').write_text('fake-key')
+    monkeypatch.setattr(ytlink, '_urls', {})
+    monkeypatch.setattr(ytlink, 'CONFIG_DIR', tmp_path)
+    server.configure()
+
+    monkeypatch.setattr(
+        ytlink.quota, 'ledger', ytlink.quota.Ledger(tmp_path / 'quota.json')
+    )
+    # Retries only wait milliseconds
+    monkeypatch.setattr(
+        ytlink.retry, 'api_policy',
+        ytlink.retry.RetryPolicy(max_retries=3, base=0.001, cap=0.01)
+    )
+    ytlink.metrics.recorder.reset()
+
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def api(server):
+    """ The FakeYouTube behind the server. """
+    return server.api
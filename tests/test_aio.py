@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Tests that ytlink.aio reads the same videos as the blocking API.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import asyncio
+import threading
+import urllib.error
+from datetime import datetime, timedelta
+import pytest
+#--- Custom imports ---#
+import ytlink
+import ytlink.aio
+import ytlink.quota
+#======================== Helper ========================#
+
+
+def _channels(api):
+    return [
+        ytlink.Channel(api.channel_name(i), api.channel_ID(i))
+        for i in range(api.num_channels)
+    ]
+
+
+def _dump(videos):
+    """ Gets the saved form of the videos to compare them by. """
+    return [ video.json() for video in videos ]
+
+
+#======================== Tests ========================#
+
+
+@pytest.mark.parametrize('kwargs', [
+    { 'max_vids': 10 },
+    { 'max_vids': 75 },
+    { 'max_vids': None },
+    { 'max_vids': None, 'chronological': True },
+    { 'after_date': datetime.now() - timedelta(days=60) },
+    { 'until_ID': 'v00000x00090', 'chronological': True },
+])
+def test_uploads(api, kwargs):
+    # Separate channels so the aio call finds the uploads playlist itself
+    sync = _channels(api)[0].uploads(**kwargs)
+    aio = asyncio.run(ytlink.aio.uploads(_channels(api)[0], **kwargs))
+
+    assert sync
+    assert _dump(aio) == _dump(sync)
+
+
+@pytest.mark.parametrize('num_IDs', [ 1, 50, 120 ])
+def test_from_IDs(api, num_IDs):
+    IDs = [ api.video_ID(i % api.num_channels, i) for i in range(num_IDs) ]
+    # Missing videos are skipped by both
+    IDs.insert(1, 'v99999x99999')
+
+    sync = ytlink.Video.from_IDs(IDs)
+    aio = asyncio.run(ytlink.aio.from_IDs(IDs))
+
+    assert len(sync) == num_IDs
+    assert _dump(aio) == _dump(sync)
+
+
+@pytest.mark.parametrize('kwargs', [
+    { 'max_vids': 5 },
+    { 'after_date': datetime.now() - timedelta(days=10), 'chronological': True },
+])
+def test_gather_uploads(api, kwargs):
+    sync = [ channel.uploads(**kwargs) for channel in _channels(api) ]
+    aio = asyncio.run(ytlink.aio.gather_uploads(_channels(api), **kwargs))
+
+    assert [ _dump(videos) for videos in aio ] == [ _dump(videos) for videos in sync ]
+
+
+def test_same_quota(api):
+    """ Both APIs make the same calls for the same videos. """
+    channels = _channels(api)
+    [ channel.uploads(max_vids=60) for channel in channels ]
+    sync_stats, sync_used = api.stats()['calls'], ytlink.quota.ledger.used
+
+    api.reset_stats()
+    asyncio.run(ytlink.aio.gather_uploads(_channels(api), max_vids=60))
+
+    assert api.stats()['calls'] == sync_stats
+    assert ytlink.quota.ledger.used == 2 * sync_used
+
+
+def test_errors_are_raised_to_gather(api):
+    """ Failed requests are raised out of gather_uploads instead of exiting. """
+    api.quota_limit = 0
+
+    with pytest.raises(urllib.error.HTTPError):
+        asyncio.run(ytlink.aio.gather_uploads(_channels(api), max_vids=5))
+
+    assert ytlink.quota.ledger.remaining == 0
+
+
+def test_quota_errors_exhaust_the_ledger_off_the_loop(api, monkeypatch):
+    api.quota_limit = 0
+    ledger = ytlink.quota.ledger
+    threads = []
+    exhaust = ledger.exhaust
+    monkeypatch.setattr(
+        ledger, 'exhaust', lambda: threads.append(threading.get_ident()) or exhaust()
+    )
+
+    async def request():
+        loop_thread = threading.get_ident()
+        with pytest.raises(urllib.error.HTTPError):
+            await ytlink.aio.search(api='channels', part='id', id=api.channel_ID(0))
+        return loop_thread
+
+    loop_thread = asyncio.run(request())
+
+    assert threads and loop_thread not in threads
+    assert ledger.remaining == 0
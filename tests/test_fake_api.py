@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Smoke tests of the stand-in YouTube Data API in ytlink.tools.fake_api.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import urllib.error
+import pytest
+#--- Custom imports ---#
+import ytlink
+import ytlink.quota
+import ytlink.retry
+import ytlink.connection
+from ytlink.tools.fake_api import FakeYouTube, _INJECTED_ERRORS
+#======================== Helper ========================#
+
+
+def _get(api, **params):
+    """ Requests the fake server directly, without retries or the ledger. """
+    return ytlink.connection.session.get(
+        f'{ytlink.service_url("api")}/{api}', params={ 'key': 'fake-key', **params }
+    ).json()
+
+
+def _uploads_page(api, **params):
+    return _get(
+        'playlistItems', part='snippet', maxResults=50,
+        playlistId=f'UU{api.channel_ID(0)[2:]}', **params
+    )
+
+
+#======================== Tests ========================#
+
+
+def test_paging(api):
+    IDs = []
+    page = _uploads_page(api)
+    pages = 1
+    while 'nextPageToken' in page:
+        IDs += [ item['snippet']['resourceId']['videoId'] for item in page['items'] ]
+        page = _uploads_page(api, pageToken=page['nextPageToken'])
+        pages += 1
+    IDs += [ item['snippet']['resourceId']['videoId'] for item in page['items'] ]
+
+    assert pages == 3
+    assert IDs == [ api.video_ID(0, i) for i in range(api.num_videos) ]
+
+
+def test_page_size_caps_max_results(api):
+    api.page_size = 20
+    assert len(_uploads_page(api)['items']) == 20
+
+
+def test_fields_projection(api):
+    page = _uploads_page(api, fields='nextPageToken,items/snippet/title')
+    assert set(page) == { 'nextPageToken', 'items' }
+    assert set(page['items'][0]) == { 'snippet' }
+    assert set(page['items'][0]['snippet']) == { 'title' }
+
+
+def test_errors_are_injected(server):
+    api = server.api = FakeYouTube(num_channels=1, num_videos=5, error_rate=1)
+
+    statuses = set()
+    for _ in range(30):
+        with pytest.raises(urllib.error.HTTPError) as error:
+            _get('channels', part='id', id=api.channel_ID(0))
+        statuses.add((
+            ytlink.retry.status(error.value), ytlink.retry.reason(error.value)
+        ))
+
+    assert statuses == set(_INJECTED_ERRORS)
+    # Failed calls still count against the quota
+    assert api.stats()['units'] == 30
+
+
+def test_quota_accounting(api):
+    _get('channels', part='id', id=api.channel_ID(0))
+    _uploads_page(api)
+    _get('search', part='snippet', q='Channel')
+
+    stats = api.stats()
+    assert stats['calls'] == {
+        'channels.list': 1, 'playlistItems.list': 1, 'search.list': 1
+    }
+    assert stats['units'] == sum(
+        ytlink.quota.cost(endpoint, calls)
+        for endpoint, calls in stats['calls'].items()
+    ) == 102
+
+
+def test_quota_limit(api):
+    api.quota_limit = 100
+    _get('search', part='snippet', q='Channel')
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        _get('channels', part='id', id=api.channel_ID(0))
+
+    assert ytlink.retry.status(error.value) == 403
+    assert ytlink.retry.is_quota_error(error.value)
+    assert api.stats()['units'] == 100
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Tests polling channel feeds served by the fake API.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import pytest
+from datetime import timedelta
+#--- Custom imports ---#
+import ytlink
+import ytlink.marks
+import ytlink.feeds
+#======================== Fixtures ========================#
+
+
+@pytest.fixture
+def channels(api):
+    return [
+        ytlink.Channel(name=api.channel_name(i), ID=api.channel_ID(i))
+        for i in range(3)
+    ]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ytlink.feeds.FeedCache(tmp_path / 'feeds.json')
+
+
+#======================== Helper ========================#
+
+
+def _IDs(videos):
+    return [ video.ID for video in videos ]
+
+
+#======================== Tests ========================#
+
+
+def test_parses_entries_newest_first(api, channels):
+    body = api.feed(channels[0].ID)[1]
+
+    videos = ytlink.feeds.parse_feed(body)
+
+    assert _IDs(videos) == [ api.video_ID(0, i) for i in range(len(videos)) ]
+    assert videos[0].name == f'{api.channel_name(0)} video {api.num_videos}'
+    assert videos[0]._channelID == channels[0].ID
+    assert videos == sorted(videos, key=lambda video: video.date, reverse=True)
+
+
+def test_parsing_stops_at_the_last_video_needed(api, channels):
+    body = api.feed(channels[0].ID)[1]
+    videos = ytlink.feeds.parse_feed(body)
+
+    assert len(ytlink.feeds.parse_feed(body, max_vids=2)) == 2
+    assert _IDs(ytlink.feeds.parse_feed(body, until_ID=videos[3].ID)) == _IDs(videos[:3])
+    assert _IDs(ytlink.feeds.parse_feed(
+        body, after_date=videos[2].date - timedelta(seconds=1)
+    )) == _IDs(videos[:3])
+
+
+def test_is_newer():
+    mark = ytlink.marks.Mark('old', '2024-01-01 00:00:00')
+    newer = ytlink.marks.Mark('new', '2024-01-02 00:00:00')
+
+    assert ytlink.feeds.is_newer(newer, mark)
+    assert not ytlink.feeds.is_newer(mark, mark)
+    # The marked video was deleted, the feed now lists an older one
+    assert not ytlink.feeds.is_newer(mark, newer)
+    assert not ytlink.feeds.is_newer(None, mark)
+    # Channels without a mark are compared with the last run
+    assert ytlink.feeds.is_newer(newer, after_date=mark.date)
+    assert not ytlink.feeds.is_newer(mark, after_date=newer.date)
+    assert ytlink.feeds.is_newer(mark)
+
+
+def test_unchanged_feeds_are_revalidated(api, channels, cache, monkeypatch):
+    parsed = []
+    parse_feed = ytlink.feeds.parse_feed
+    monkeypatch.setattr(
+        ytlink.feeds, 'parse_feed',
+        lambda *args, **kwargs: parsed.append(args) or parse_feed(*args, **kwargs)
+    )
+
+    newest = ytlink.feeds.newest_upload(channels[0], cache)
+    # The second poll is answered 304 Not Modified
+    assert ytlink.feeds.newest_upload(channels[0], cache).dict() == newest.dict()
+
+    assert newest.videoID == api.video_ID(0, 0)
+    assert len(parsed) == 1
+    etag, _, cached = cache.get(channels[0].ID)
+    assert etag is not None and cached.dict() == newest.dict()
+
+
+def test_cache_is_saved(channels, cache, tmp_path):
+    newest = ytlink.feeds.newest_upload(channels[0], cache)
+    cache.save()
+
+    assert ytlink.feeds.FeedCache(tmp_path / 'feeds.json').get(channels[0].ID)[2].dict() == newest.dict()
+
+
+def test_changed_channels(api, channels, cache, tmp_path):
+    marks = ytlink.marks.Marks(tmp_path / 'marks.json')
+    # The first channel's newest upload was already seen
+    marks.advance(ytlink.feeds.parse_feed(api.feed(channels[0].ID)[1], max_vids=1))
+    # The feed of a deleted channel fails with 404
+    deleted = ytlink.Channel(name='Deleted', ID='UCdeleted')
+
+    changed = ytlink.feeds.changed_channels(
+        [ *channels, deleted ], marks=marks, cache=cache, max_workers=2
+    )
+
+    assert changed == [ *channels[1:], deleted ]
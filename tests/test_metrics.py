@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Tests the per-endpoint counters and span hooks of ytlink.metrics.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import pytest
+#--- Custom imports ---#
+import ytlink
+import ytlink.metrics
+#======================== Fixtures ========================#
+
+
+@pytest.fixture
+def spans():
+    """ Collects the spans recorded while the test runs. """
+    spans = []
+    ytlink.metrics.recorder.add_hook(spans.append)
+    yield spans
+    ytlink.metrics.recorder.remove_hook(spans.append)
+
+
+#======================== Tests ========================#
+
+
+def test_counters_per_endpoint(api, spans):
+    channel = ytlink.Channel(api.channel_name(0), api.channel_ID(0))
+    channel.uploads(max_vids=120)
+    ytlink.Video.from_IDs([ api.video_ID(0, 0) ])
+
+    summary = ytlink.metrics.recorder.summary()
+    assert set(summary) == { 'channels.list', 'playlistItems.list', 'videos.list' }
+    assert summary['playlistItems.list']['requests'] == 3
+    assert summary['playlistItems.list']['units'] == 3
+    assert summary['playlistItems.list']['bytes'] > 0
+    assert sum(summary['playlistItems.list']['latency_buckets'].values()) == 3
+
+    # One span per request, matching the calls the server answered
+    calls = {}
+    for span in spans: calls[span.endpoint] = calls.get(span.endpoint, 0) + span.calls
+    assert calls == api.stats()['calls']
+
+
+def test_retries_and_errors(api, spans):
+    api.fail_next(503, 'backendError')
+    ytlink.search(api='channels', part='id', id=api.channel_ID(0))
+
+    assert [ (span.attempt, span.error is not None) for span in spans ] == [
+        (0, True), (1, False)
+    ]
+    stats = ytlink.metrics.recorder.summary()['channels.list']
+    assert (stats['requests'], stats['errors'], stats['retries']) == (2, 1, 1)
+
+
+def test_batched_inserts_count_each_call(api, spans):
+    youtube = ytlink.init_youtube()
+    playlist = ytlink.create_playlist(youtube, 'Metrics')
+    videos = ytlink.Video.from_IDs([ api.video_ID(0, i) for i in range(3) ])
+    ytlink.add_videos_to_playlist(youtube, playlist, videos)
+
+    inserts = [ span for span in spans if span.endpoint == 'playlistItems.insert' ]
+    assert [ span.calls for span in inserts ] == [ 3 ]
+    stats = ytlink.metrics.recorder.summary()['playlistItems.insert']
+    assert (stats['requests'], stats['calls'], stats['units']) == (1, 3, 150)
+
+
+def test_failing_hook_does_not_fail_the_request(api):
+    def hook(span): raise RuntimeError('hook failed')
+
+    ytlink.metrics.recorder.add_hook(hook)
+    try:
+        ytlink.search(api='channels', part='id', id=api.channel_ID(0))
+    finally:
+        ytlink.metrics.recorder.remove_hook(hook)
+
+    assert ytlink.metrics.recorder.summary()['channels.list']['requests'] == 1
+
+
+def test_prometheus(api):
+    ytlink.search(api='channels', part='id', id=api.channel_ID(0))
+    text = ytlink.metrics.recorder.prometheus()
+
+    assert 'ytlink_requests_total{endpoint="channels.list"} 1' in text
+    assert 'ytlink_quota_units_total{endpoint="channels.list"} 1' in text
+    assert 'ytlink_request_duration_seconds_count{endpoint="channels.list"} 1' in text
+
+
+def test_dump_from_args(api, tmp_path):
+    ytlink.search(api='channels', part='id', id=api.channel_ID(0))
+    ytlink.metrics.dump_from_args([ 'script.py', f'--metrics={tmp_path / "run.prom"}' ])
+
+    assert 'ytlink_calls_total{endpoint="channels.list"} 1' in (tmp_path / 'run.prom').read_text()
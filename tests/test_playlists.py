@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Tests adding videos to playlists in batches and in order.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import pytest
+#--- Custom imports ---#
+import ytlink
+import ytlink.retry
+#======================== Fixtures ========================#
+
+
+@pytest.fixture
+def youtube(server):
+    return ytlink.init_youtube()
+
+
+#======================== Helper ========================#
+
+
+def _video(ID):
+    return ytlink.Video(ID, ID, '2024-01-01T00:00:00Z', 'UC0')
+
+
+def _videos(api, num_videos):
+    return [ _video(api.video_ID(0, i)) for i in range(num_videos) ]
+
+
+def _items(api, playlist):
+    return api._playlists[playlist.ID][1]
+
+
+#======================== Tests ========================#
+
+
+@pytest.mark.parametrize('ordered', [ False, True ])
+def test_adds_every_video(api, youtube, ordered):
+    playlist = ytlink.create_playlist(youtube, 'Playlist')
+    videos = _videos(api, 60)
+
+    results = ytlink.add_videos_to_playlist(youtube, playlist, videos, ordered=ordered)
+
+    assert results == [ None ] * 60
+    assert sorted(_items(api, playlist)) == [ video.ID for video in videos ]
+    if ordered: assert _items(api, playlist) == [ video.ID for video in videos ]
+
+
+def test_ordered_skips_rejected_videos(api, youtube):
+    playlist = ytlink.create_playlist(youtube, 'Playlist')
+    videos = _videos(api, 3)
+    videos.insert(1, _video('v99999x99999'))
+    acknowledged = []
+
+    results = ytlink.add_videos_to_playlist(
+        youtube, playlist, videos, ordered=True,
+        callback=lambda batch, results: acknowledged.extend(batch)
+    )
+
+    assert [ result is None for result in results ] == [ True, False, True, True ]
+    assert _items(api, playlist) == [ video.ID for video in _videos(api, 3) ]
+    assert acknowledged == videos
+
+
+def test_ordered_stops_at_a_failure_to_retry(api, youtube):
+    playlist = ytlink.create_playlist(youtube, 'Playlist')
+    videos = _videos(api, 5)
+    ytlink.add_videos_to_playlist(youtube, playlist, videos[:2], ordered=True)
+    # The third insert fails through every retry
+    api.fail_next(503, 'backendError', times=ytlink.retry.api_policy.max_retries + 1)
+
+    results = ytlink.add_videos_to_playlist(youtube, playlist, videos[2:], ordered=True)
+
+    assert len(results) == 1 and ytlink.retry.status(results[0]) == 503
+    assert _items(api, playlist) == [ video.ID for video in videos[:2] ]
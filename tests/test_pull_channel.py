@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Tests importing the legacy channels_data files into the catalog and the videos left to add.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import json
+import pytest
+#--- Custom imports ---#
+import ytlink
+import ytlink.catalog
+import pull_channel
+#======================== Fixtures ========================#
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = ytlink.catalog.Catalog(tmp_path / 'catalog.db')
+    yield catalog
+    catalog.close()
+
+
+@pytest.fixture
+def channels_data(tmp_path, monkeypatch):
+    """ A legacy channels_data folder with one channel and its remaining queue. """
+    folder = tmp_path / 'channels_data'
+    folder.mkdir()
+    monkeypatch.setattr(pull_channel, '_CHANNELS_DATA_FOLDER', folder)
+    monkeypatch.setattr(pull_channel, '_CHANNELS_FILE', folder / 'channels.json')
+
+    (folder / 'channels.json').write_text(json.dumps({
+        'Legacy': {'ID': 'UClegacy', 'playlists': {'Watch: Legacy': 'PLlegacy'}}
+    }))
+    videos = [
+        ytlink.Video(
+            name=f'Video {i}', ID=f'legacy{i}', date=f'2020-01-0{i + 1} 00:00:00',
+            channelID='UClegacy'
+        )
+        for i in range(3)
+    ]
+    (folder / 'Legacy.txt').write_text('\n'.join(video.json() for video in videos))
+    # The first video was added by a run from before the catalog
+    (folder / 'Legacy.journal').write_text('legacy0\n')
+    return folder
+
+
+#======================== Tests ========================#
+
+
+def test_imports_next_to_subscription_channels(catalog, channels_data):
+    # subscriptions.py saved its channels before pull_channel.py ever ran
+    catalog.add_channels([ ytlink.Channel(name='Subscribed', ID='UCsub') ])
+
+    channels = pull_channel.load_channels(catalog)
+
+    assert set(channels) == {'Subscribed', 'Legacy'}
+    legacy = channels['Legacy']
+    assert legacy.playlists['watch_later'].ID == 'PLlegacy'
+    assert catalog.is_backfilled(legacy)
+    assert [
+        video.ID for video in catalog.pending_videos(legacy, legacy.playlists['watch_later'])
+    ] == ['legacy1', 'legacy2']
+
+
+def test_imports_only_once(catalog, channels_data):
+    pull_channel.load_channels(catalog)
+    # Later edits to the legacy files are not imported again
+    (channels_data / 'channels.json').write_text(json.dumps({
+        'Other': {'ID': 'UCother', 'playlists': {}}
+    }))
+
+    channels = pull_channel.load_channels(catalog)
+
+    assert set(channels) == {'Legacy'}
+
+
+def test_failed_videos_are_not_pending(catalog, channels_data):
+    legacy = pull_channel.load_channels(catalog)['Legacy']
+    playlist = legacy.playlists['watch_later']
+    videos = catalog.pending_videos(legacy, playlist)
+
+    catalog.mark_added(playlist, videos[:1])
+    # The second video was deleted and the API rejected its insert
+    catalog.mark_failed(playlist, videos[1:])
+
+    assert catalog.pending_videos(legacy, playlist) == []
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Tests pulling the uploads of many subscriptions through the worker pool and the daemon.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import json
+import pytest
+from datetime import datetime, timedelta
+#--- Custom imports ---#
+import ytlink
+import ytlink.catalog
+import subscriptions
+#======================== Fields ========================#
+_EVERY_UPLOAD = datetime(2000, 1, 1)
+#======================== Helper ========================#
+
+
+def _channels(api, num_channels):
+    return [
+        ytlink.Channel(name=api.channel_name(i), ID=api.channel_ID(i))
+        for i in range(num_channels)
+    ]
+
+
+#======================== Tests ========================#
+
+
+def test_pulls_every_channel(api):
+    channels = _channels(api, 5)
+
+    videos = subscriptions.pull_uploads(channels, _EVERY_UPLOAD, max_workers=3)
+
+    assert len(videos) == 5 * api.num_videos
+    assert videos == sorted(videos, key=lambda video: video.date)
+
+
+def test_skips_channels_that_fail(api):
+    deleted = ytlink.Channel(name='Deleted', ID='UCdeleted')
+    # The uploads playlist saved for this channel is gone
+    emptied = ytlink.Channel(name='Emptied', ID='UCemptied')
+    emptied.playlists['uploads'] = ytlink.Playlist('Uploads', 'PLgone')
+    channels = [ deleted, *_channels(api, 2), emptied ]
+    failed = {}
+
+    videos = subscriptions.pull_uploads(
+        channels, _EVERY_UPLOAD, max_workers=2, failed=failed
+    )
+
+    assert len(videos) == 2 * api.num_videos
+    assert set(failed) == { deleted.ID, emptied.ID }
+    assert isinstance(failed[deleted.ID], IndexError)
+
+
+def test_exhausted_quota_stops_every_channel(api):
+    channels = _channels(api, 5)
+    # The lookups of two uploads playlists and a few pages go through
+    api.quota_limit = 6
+
+    with pytest.raises(SystemExit):
+        subscriptions.pull_uploads(channels, _EVERY_UPLOAD, max_workers=2)
+
+    assert ytlink.quota.ledger.remaining == 0
+    calls = api.stats()['calls']
+    # No channel starts once the quota ran out and the workers in flight stop
+        # paging, a full pull makes 5 lookups and 15 pages
+    assert calls['channels.list'] == 2
+    assert calls['playlistItems.list'] <= 8
+
+
+class _Stop(Exception):
+    pass
+
+
+def test_daemon_backs_off_failing_channels_alone(api, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(subscriptions, '_SCHEDULE_FNAME', tmp_path / 'schedule.json')
+    youtube = ytlink.init_youtube()
+    catalog = ytlink.catalog.Catalog(tmp_path / 'catalog.db')
+    settings = {
+        'watch_laterID': ytlink.create_playlist(youtube, 'Watch Later').ID,
+        'playlists': {}, 'filters': {}, 'daily_quota': 10**6
+    }
+    deleted = ytlink.Channel(name='Deleted', ID='UCdeleted')
+    channels = [ *_channels(api, 2), deleted ]
+    waits = []
+
+    def sleep(seconds):
+        # Retries only wait milliseconds, the daemon waits for its next round
+        if seconds < 0.5: return
+        waits.append(seconds)
+        raise _Stop
+
+    monkeypatch.setattr(subscriptions.time, 'sleep', sleep)
+    with pytest.raises(_Stop):
+        subscriptions.run_daemon(
+            settings, youtube, channels, catalog, marks=None,
+            after_date=datetime.now() - timedelta(days=2)
+        )
+    catalog.close()
+
+    # The round went through and the healthy channels were checked
+    assert 'Round failed' not in capsys.readouterr().out
+    with open(tmp_path / 'schedule.json') as f:
+        assert set(json.load(f)) == { channel.ID for channel in channels[:2] }
+    # The next round comes at the latest when the deleted channel is tried again
+    assert 0 < waits[0] <= subscriptions._DAEMON_CHANNEL_WAIT.total_seconds()
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""Tests the quota ledger's budget.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import math
+import pytest
+#--- Custom imports ---#
+import ytlink.quota
+#======================== Fixtures ========================#
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return ytlink.quota.Ledger(tmp_path / 'quota.json', limit=1000)
+
+
+#======================== Tests ========================#
+
+
+def test_affordable_calls(ledger):
+    ledger.charge('search.list', 3)
+
+    assert ledger.affordable('search.list') == 7
+    assert ledger.affordable('playlistItems.insert', reserve=200) == 10
+    # Feeds and the hub cost nothing
+    assert ledger.affordable('feeds') == math.inf
+    assert ledger.affordable('websub') == math.inf
+
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Tests retrying throttled requests and giving up on quota errors.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import urllib.error
+import pytest
+#--- Custom imports ---#
+import ytlink
+import ytlink.quota
+import ytlink.retry
+import ytlink.metrics
+import ytlink.connection
+from ytlink.tools.fake_api import _INJECTED_ERRORS
+#======================== Helper ========================#
+
+
+def _channels_list(api):
+    """ Requests the first channel through ytlink.retry.call. """
+    return ytlink.retry.call(
+        'channels.list',
+        lambda: ytlink.connection.session.get(
+            f'{ytlink.service_url("api")}/channels',
+            params={ 'key': 'fake-key', 'part': 'id', 'id': api.channel_ID(0) }
+        )
+    )
+
+
+#======================== Tests ========================#
+
+
+@pytest.mark.parametrize('status, reason', [
+    (429, 'rateLimitExceeded'), (503, 'backendError'),
+])
+def test_retries_until_success(api, status, reason):
+    api.fail_next(status, reason, times=2)
+
+    response = _channels_list(api)
+
+    assert response.json()['items'][0]['id'] == api.channel_ID(0)
+    assert api.stats()['calls'] == { 'channels.list': 3 }
+    # Failed attempts are charged too
+    assert ytlink.quota.ledger.used == 3
+    stats = ytlink.metrics.recorder.summary()['channels.list']
+    assert (stats['requests'], stats['errors'], stats['retries']) == (3, 2, 2)
+
+
+def test_gives_up_after_max_retries(api):
+    max_retries = ytlink.retry.api_policy.max_retries
+    api.fail_next(503, 'backendError', times=max_retries + 2)
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        _channels_list(api)
+
+    assert ytlink.retry.status(error.value) == 503
+    assert api.stats()['calls'] == { 'channels.list': max_retries + 1 }
+
+
+def test_quota_exceeded_is_not_retried(api):
+    api.quota_limit = 1
+    ytlink.search(api='channels', part='id', id=api.channel_ID(0))
+    assert ytlink.quota.ledger.remaining > 0
+
+    # The search quits the way scripts do once the quota is gone
+    with pytest.raises(SystemExit):
+        ytlink.search(api='channels', part='id', id=api.channel_ID(1))
+
+    assert api.stats()['calls'] == { 'channels.list': 2 }
+    assert ytlink.quota.ledger.remaining == 0
+
+
+def test_forbidden_without_quota_reason_does_not_exhaust(api):
+    api.fail_next(403, 'forbidden')
+
+    with pytest.raises(SystemExit):
+        ytlink.search(api='channels', part='id', id=api.channel_ID(0))
+
+    assert api.stats()['calls'] == { 'channels.list': 1 }
+    assert ytlink.quota.ledger.remaining > 0
+
+
+@pytest.mark.parametrize('status, reason', _INJECTED_ERRORS)
+def test_injected_errors_are_retried(api, status, reason):
+    """ Every error the fake injects at random clears up on a retry. """
+    api.fail_next(status, reason)
+
+    _channels_list(api)
+
+    assert api.stats()['calls'] == { 'channels.list': 2 }
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Tests revalidating the cached subscription list.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import pytest
+#--- Custom imports ---#
+import ytlink
+#======================== Fixtures ========================#
+
+
+@pytest.fixture
+def youtube(server):
+    server.api.num_channels = 120
+    return ytlink.init_youtube()
+
+
+#======================== Tests ========================#
+
+
+def test_first_run_has_no_deltas(api, youtube, tmp_path):
+    cache = ytlink.SubscriptionCache(tmp_path / 'subscriptions.json')
+
+    subscriptions = ytlink.get_subscriptions(youtube, cache=cache)
+
+    assert len(subscriptions) == 120
+    assert (cache.added, cache.removed) == ([], [])
+
+
+@pytest.mark.parametrize('refresh', [ False, True ])
+def test_deltas(api, youtube, tmp_path, refresh):
+    ytlink.get_subscriptions(youtube, cache=ytlink.SubscriptionCache(tmp_path / 'subscriptions.json'))
+    api.num_channels = 110
+
+    cache = ytlink.SubscriptionCache(tmp_path / 'subscriptions.json')
+    subscriptions = ytlink.get_subscriptions(youtube, cache=cache, refresh=refresh)
+
+    assert len(subscriptions) == 110
+    assert cache.added == []
+    assert cache.removed == sorted( api.channel_ID(i) for i in range(110, 120) )
+
+
+def test_unchanged_list_is_revalidated(api, youtube, tmp_path):
+    ytlink.get_subscriptions(youtube, cache=ytlink.SubscriptionCache(tmp_path / 'subscriptions.json'))
+    api.reset_stats()
+
+    cache = ytlink.SubscriptionCache(tmp_path / 'subscriptions.json')
+    subscriptions = ytlink.get_subscriptions(youtube, cache=cache)
+
+    assert len(subscriptions) == 120
+    # Only the first page is asked for and answers 304 Not Modified
+    assert api.stats()['calls'] == { 'subscriptions.list': 1 }
+    assert (cache.added, cache.removed) == ([], [])
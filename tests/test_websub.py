@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Tests the WebSub receiver against the fake hub.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import threading
+import pytest
+#--- Custom imports ---#
+import ytlink
+import ytlink.catalog
+import ytlink.websub
+#======================== Fields ========================#
+_SECRET = 'hub-secret'
+#======================== Fixtures ========================#
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = ytlink.catalog.Catalog(tmp_path / 'catalog.db')
+    yield catalog
+    catalog.close()
+
+
+@pytest.fixture
+def channels(api):
+    return [
+        ytlink.Channel(name=api.channel_name(i), ID=api.channel_ID(i))
+        for i in range(2)
+    ]
+
+
+@pytest.fixture
+def playlist():
+    return ytlink.Playlist('Watch Later', 'PLwatchlater')
+
+
+@pytest.fixture
+def receiver(server, catalog, channels, playlist):
+    """ A receiver routing every video to one playlist. """
+    return ytlink.websub.Receiver(
+        catalog, lambda video: playlist, channels, secret=_SECRET
+    )
+
+
+@pytest.fixture
+def callback(receiver):
+    """ Serves the receiver locally, giving its callback url. """
+    http_server = receiver.server('127.0.0.1', 0)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+
+    yield f'http://127.0.0.1:{http_server.server_address[1]}/'
+    http_server.shutdown()
+
+
+@pytest.fixture
+def subscribe(receiver, callback):
+    """ Subscribes the receiver to channels through the hub, returning those that failed. """
+    def subscribe(channels):
+        receiver.requested(channels)
+        return ytlink.websub.subscribe_all(channels, callback, secret=_SECRET)
+
+    return subscribe
+
+
+#======================== Tests ========================#
+
+
+def test_hub_verifies_subscriptions(api, receiver, callback, subscribe, channels):
+    assert subscribe(channels) == []
+
+    assert api.hub.subscribers(channels[0].ID) == [ (callback, _SECRET) ]
+    assert receiver.renewals() == []
+
+
+def test_refuses_channels_not_subscribed_to(api, subscribe):
+    unknown = ytlink.Channel(name=api.channel_name(4), ID=api.channel_ID(4))
+
+    failed = subscribe([ unknown ])
+
+    assert failed == [ unknown ]
+    assert api.hub.subscribers(unknown.ID) == []
+
+
+def test_renews_from_the_granted_lease(api, receiver, subscribe, channels):
+    api.hub.max_lease_seconds = 1000
+
+    subscribe(channels)
+
+    renewal = receiver.next_renewal()
+    assert renewal == pytest.approx(1000 * ytlink.websub.RENEW_SHARE, abs=5)
+
+
+def test_new_channels_are_due_right_away(api, receiver, subscribe, channels):
+    subscribe(channels)
+    new = ytlink.Channel(name=api.channel_name(2), ID=api.channel_ID(2))
+
+    added, removed = receiver.update_channels([ channels[1], new ])
+
+    assert (added, removed) == ([ new ], [ channels[0] ])
+    assert receiver.renewals() == [ new ]
+    assert receiver.next_renewal() == 0
+
+
+def test_queues_each_notified_upload_once(api, subscribe, catalog, channels, playlist):
+    subscribe(channels)
+
+    assert api.hub.publish(channels[0].ID) == 1
+    # The hub pushes the same upload again, i.e. after an edit
+    assert api.hub.publish(channels[0].ID) == 1
+
+    queued = catalog.queued_videos()
+    assert [ video.ID for video in queued[playlist.ID] ] == [ api.video_ID(0, 0) ]
+
+
+def test_drops_bad_signatures(api, receiver, catalog, channels):
+    body = api.feed(channels[0].ID)[1]
+
+    assert receiver.notify(body, 'sha1=0000') == []
+    assert receiver.notify(body) == []
+    assert not catalog.queued_videos()
+
+    queued = receiver.notify(body, ytlink.websub.signature(_SECRET, body))
+    assert [ video.ID for video in queued ] == [ api.video_ID(0, 0) ]
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Tests adding the catalog's queue and resuming it after an interruption.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+#--- Custom imports ---#
+import ytlink
+import ytlink.quota
+import ytlink.catalog
+import ytlink.workqueue
+#======================== Fixtures ========================#
+
+
+@pytest.fixture
+def youtube(server):
+    return ytlink.init_youtube()
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = ytlink.catalog.Catalog(tmp_path / 'catalog.db')
+    yield catalog
+    catalog.close()
+
+
+#======================== Helper ========================#
+
+
+def _queue(api, catalog, playlist, num_videos):
+    videos = ytlink.Video.from_IDs([ api.video_ID(0, i) for i in range(num_videos) ])
+    catalog.add_videos(videos)
+    catalog.queue_videos(playlist, videos)
+    # The queue is added oldest first
+    return sorted(videos, key=lambda video: video.date)
+
+
+def _items(api, playlist):
+    return api._playlists[playlist.ID][1]
+
+
+#======================== Tests ========================#
+
+
+def test_adds_the_queue_in_order(api, youtube, catalog):
+    playlist = ytlink.create_playlist(youtube, 'Queue')
+    videos = _queue(api, catalog, playlist, 5)
+
+    assert ytlink.workqueue.add_queued(youtube, catalog)
+
+    assert _items(api, playlist) == [ video.ID for video in videos ]
+    assert not catalog.queued_videos() and not catalog.sending_videos()
+    assert catalog.added_IDs(playlist, videos) == { video.ID for video in videos }
+
+
+def test_interrupted_inserts_are_not_added_twice(api, youtube, catalog):
+    playlist = ytlink.create_playlist(youtube, 'Queue')
+    videos = _queue(api, catalog, playlist, 4)
+    # A run sent two inserts and was interrupted after the first went through
+    catalog.mark_sending(playlist, videos[:2])
+    ytlink.add_video_to_playlist(youtube, playlist, videos[0])
+    api.reset_stats()
+
+    assert ytlink.workqueue.add_queued(youtube, catalog)
+
+    assert _items(api, playlist) == [ video.ID for video in videos ]
+    assert api.stats()['calls'] == {
+        'playlistItems.list': 2, 'playlistItems.insert': 3
+    }
+    assert not catalog.sending_videos()
+
+
+def test_failed_inserts_go_back_in_the_queue(api, youtube, catalog):
+    playlist = ytlink.create_playlist(youtube, 'Queue')
+    videos = _queue(api, catalog, playlist, 3)
+    api.quota_limit = api.stats()['units'] + 50
+
+    assert not ytlink.workqueue.add_queued(youtube, catalog)
+
+    assert _items(api, playlist) == [ videos[0].ID ]
+    assert [ video.ID for video in catalog.queued_videos()[playlist.ID] ] == [
+        video.ID for video in videos[1:]
+    ]
+    assert not catalog.sending_videos()
+
+
+def test_unordered_queue_is_sent_in_batches(api, youtube, catalog):
+    playlist = ytlink.create_playlist(youtube, 'Queue')
+    videos = _queue(api, catalog, playlist, 60)
+    api.reset_stats()
+
+    assert ytlink.workqueue.add_queued(youtube, catalog, ordered=False)
+
+    assert sorted(_items(api, playlist)) == sorted(video.ID for video in videos)
+    # One batched request for every 50 inserts
+    assert api.stats()['requests'] == 2
+    assert not catalog.queued_videos() and not catalog.sending_videos()
+
+
+def test_batches_stop_at_the_quota(api, youtube, catalog):
+    playlist = ytlink.create_playlist(youtube, 'Queue')
+    videos = _queue(api, catalog, playlist, 120)
+    api.quota_limit = api.stats()['units'] + 30 * 50
+
+    assert not ytlink.workqueue.add_queued(youtube, catalog, ordered=False)
+
+    assert len(_items(api, playlist)) == 30
+    # The refused inserts and the batches never sent stay queued
+    assert len(catalog.queued_videos()[playlist.ID]) == 90
+    assert api.stats()['calls']['playlistItems.insert'] == 50
+
+
+def test_concurrent_queues_share_the_remaining_quota(api, youtube, catalog):
+    playlists = [ ytlink.create_playlist(youtube, f'Queue {i}') for i in range(2) ]
+    for playlist in playlists: _queue(api, catalog, playlist, 3)
+    ledger = ytlink.quota.ledger
+    ledger.limit = ledger.used + ytlink.quota.cost('playlistItems.insert', 4)
+
+    # Like the accounts of a fleet, each adds its own playlist
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        done = list(executor.map(
+            lambda playlist: ytlink.workqueue.add_queued(
+                youtube, catalog, playlistIDs={ playlist.ID }
+            ),
+            playlists
+        ))
+
+    assert done.count(True) <= 1
+    assert sum(len(_items(api, playlist)) for playlist in playlists) == 4
+    assert ledger.remaining == 0
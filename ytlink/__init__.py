@@ -1,2 +1,42 @@
+import os
+from pathlib import Path
+# Folder holding the API key, OAuth client secrets and quota ledger
+CONFIG_DIR = Path(
+    os.environ.get('YTLINK_CONFIG_DIR', Path(__file__).parent / 'config')
+)
+# (environment variable, YouTube's url) of each service ytlink requests
+_SERVICES = {
+    'api': ('YTLINK_API_URL', 'https://www.googleapis.com/youtube/v3'),
+    'feed': (
+        'YTLINK_FEED_URL',
+        'https://www.youtube.com/feeds/videos.xml?channel_id={channelID}'
+    ),
+    'hub': ('YTLINK_HUB_URL', 'https://pubsubhubbub.appspot.com/subscribe'),
+}
+# Urls of the services once read or configured
+_urls = {}
+
+
+def service_url(service):
+    """ Gets the url of the api, feed or hub service: the one given to configure, else its environment variable read on first use, else YouTube's own. """
+    if service not in _urls:
+        variable, default = _SERVICES[service]
+        _urls[service] = os.environ.get(variable, default)
+    return _urls[service]
+
+
+def is_stand_in(service):
+    """ Whether a service points somewhere other than YouTube, i.e. ytlink.tools.fake_api. """
+    return service_url(service) != _SERVICES[service][1]
+
+
+def configure(api_url=None, feed_url=None, hub_url=None, config_dir=None):
+    """ Points ytlink at other services or another config folder after import, i.e. a ytlink.tools.fake_api.FakeServer. Arguments left as None are unchanged. """
+    global CONFIG_DIR
+    for service, url in [ ('api', api_url), ('feed', feed_url), ('hub', hub_url) ]:
+        if url is not None: _urls[service] = url
+    if config_dir is not None: CONFIG_DIR = Path(config_dir)
+
+
 # Make use of ytlink.py script functionality on import of ytlink
-from ytlink.ytlink import *
\ No newline at end of file
+from ytlink.ytlink import *
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""Coroutine versions of the ytlink reading API for use inside an event loop.
+
+Requests go over a pool of keep-alive asyncio connections shared by every
+coroutine, and are paced and retried by the same policy as ytlink.ytlink.
+The objects returned are the usual ytlink.Video, ytlink.Playlist and
+ytlink.Channel's.
+
+    async def main():
+        channels = ytlink.get_subscriptions(youtube)
+        uploads = await ytlink.aio.gather_uploads(channels, after_date=date)
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import io
+import ssl
+import asyncio
+import tempfile
+import importlib
+import http.client
+import urllib.error
+import urllib.parse
+#--- Custom imports ---#
+import ytlink
+import ytlink.error
+import ytlink.retry
+import ytlink.connection
+#======================== Fields ========================#
+# The ytlink.ytlink module itself, the package attribute is shadowed by its
+    # star import
+_sync = importlib.import_module('ytlink.ytlink')
+# Number of idle connections kept alive for each host
+_POOL_SIZE = 50
+# Seconds to wait on a request before giving up
+_TIMEOUT = 30
+# Number of coroutines fan_out runs at once
+_FAN_OUT_LIMIT = 50
+# Errors raised when a kept-alive connection was closed by the server
+_STALE_ERRORS = (
+    asyncio.IncompleteReadError, ConnectionResetError, BrokenPipeError
+)
+#======================== Helper ========================#
+
+
+async def _read_headers(reader):
+    """ Reads the status line and headers of a response. Returns (version, status, reason, headers). """
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError('Connection closed by the server.')
+
+    version, status, *reason = status_line.decode('latin-1').rstrip().split(' ', 2)
+
+    lines = []
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''): break
+        lines.append(line)
+
+    headers = http.client.parse_headers(io.BytesIO(b''.join(lines) + b'\r\n'))
+    return version, int(status), reason[0] if reason else '', headers
+
+
+async def _read_chunked(reader):
+    chunks = []
+    while True:
+        size = int((await reader.readline()).split(b';')[0], 16)
+        if size == 0: break
+        chunks.append(await reader.readexactly(size))
+        # Line ending after each chunk
+        await reader.readline()
+
+    # Skip any trailers
+    while (await reader.readline()) not in (b'\r\n', b'\n', b''): pass
+    return b''.join(chunks)
+
+
+#======================== Objects ========================#
+
+
+class AsyncSession:
+    """ Pool of keep-alive asyncio connections shared by every coroutine. Connections belong to an event loop, the pool is emptied when used from a new one.
+
+        Attributes:
+            pool_size: the number of idle connections kept alive per host
+            timeout: the seconds to wait on each request
+            context: the ssl context used for HTTPS connections
+    """
+    def __init__(self, pool_size=_POOL_SIZE, timeout=_TIMEOUT, context=None):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.context = context
+
+        # Idle (reader, writer) pairs keyed by (scheme, host)
+        self._pools = {}
+        self._loop = None
+
+    def _pool(self, key):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Connections from another loop can't be used here
+            self._discard()
+            self._loop = loop
+
+        return self._pools.setdefault(key, [])
+
+    def _discard(self):
+        pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            for _, writer in pool:
+                try:
+                    writer.close()
+                except RuntimeError:
+                    # The loop the connection belonged to is closed
+                    pass
+
+    async def _connect(self, scheme, netloc):
+        parts = urllib.parse.urlsplit(f'//{netloc}')
+        if scheme == 'https':
+            return await asyncio.open_connection(
+                parts.hostname, parts.port or 443,
+                ssl=self.context or ssl.create_default_context()
+            )
+        return await asyncio.open_connection(parts.hostname, parts.port or 80)
+
+    async def _acquire(self, key):
+        """ Gets an idle connection for the host or opens a new one. Returns whether the connection was reused. """
+        pool = self._pool(key)
+        while pool:
+            reader, writer = pool.pop()
+            # Skip connections the server has since closed
+            if not reader.at_eof() and not writer.is_closing():
+                return (reader, writer), True
+            writer.close()
+
+        return await self._connect(*key), False
+
+    def _release(self, key, conn):
+        pool = self._pool(key)
+        if len(pool) < self.pool_size:
+            pool.append(conn)
+        else:
+            conn[1].close()
+
+    async def _exchange(self, conn, method, path, headers, body):
+        """ Sends the request and reads the full response. Returns (status, reason, headers, body, will_close). """
+        reader, writer = conn
+        lines = [ f'{method} {path} HTTP/1.1' ]
+        lines += [ f'{name}: {value}' for name, value in headers.items() ]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        if body: writer.write(body)
+        await writer.drain()
+
+        version, status, reason, response_headers = await _read_headers(reader)
+        will_close = (
+            response_headers.get('Connection', '').lower() == 'close'
+            or version == 'HTTP/1.0'
+        )
+
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            raw = b''
+        elif 'chunked' in response_headers.get('Transfer-Encoding', '').lower():
+            raw = await _read_chunked(reader)
+        elif response_headers.get('Content-Length') is not None:
+            raw = await reader.readexactly(int(response_headers['Content-Length']))
+        else:
+            # The body runs until the server closes the connection
+            raw = await reader.read()
+            will_close = True
+
+        return status, reason, response_headers, raw, will_close
+
+    async def request(self, method, url, params=None, headers=None, body=None):
+        """ Makes a request over a pooled connection. See ytlink.connection.Session.request.
+
+            Returns:
+                (ytlink.connection.Response): the decompressed response.
+
+            Raises:
+                urllib.error.HTTPError: the server returned an error status.
+
+                TimeoutError: the request took longer than the timeout.
+
+        """
+        url = ytlink.connection.build_url(url, params)
+        parts = urllib.parse.urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = urllib.parse.urlunsplit(('', '', parts.path or '/', parts.query, ''))
+
+        request_headers = {
+            'Host': parts.netloc, 'Accept-Encoding': 'gzip',
+            'Connection': 'keep-alive'
+        }
+        if body: request_headers['Content-Length'] = str(len(body))
+        if headers: request_headers.update(headers)
+
+        while True:
+            conn, reused = await self._acquire(key)
+            try:
+                status, reason, response_headers, raw, will_close = await asyncio.wait_for(
+                    self._exchange(conn, method, path, request_headers, body),
+                    self.timeout
+                )
+                break
+            except _STALE_ERRORS:
+                conn[1].close()
+                # A fresh connection failing is a real error
+                if not reused: raise
+            except asyncio.TimeoutError:
+                conn[1].close()
+                # Same error as the blocking session so it is retried alike
+                raise TimeoutError(f'Request timed out: {url}.') from None
+            except BaseException:
+                conn[1].close()
+                raise
+
+        if will_close:
+            conn[1].close()
+        else:
+            self._release(key, conn)
+
+        content = ytlink.connection.decode(raw, response_headers.get('Content-Encoding'))
+        if status >= 400:
+            raise urllib.error.HTTPError(
+                url, status, reason, response_headers, io.BytesIO(content)
+            )
+
+        return ytlink.connection.Response(
+            status, response_headers, content, size=len(raw)
+        )
+
+    async def get(self, url, params=None, headers=None):
+        return await self.request('GET', url, params=params, headers=headers)
+
+    def close(self):
+        """ Closes every idle connection. """
+        self._discard()
+
+
+# Shared session for coroutines
+session = AsyncSession()
+
+
+#======================== Reading ========================#
+
+
+async def search(api, **kwargs):
+    """ Coroutine version of ytlink.search.
+
+        Args:
+            api (str): the Google API to use.
+
+        Kwargs:
+            **kwargs: additional search parameters.
+
+        Returns:
+            (dict): the decoded JSON response.
+
+        Raises:
+            urllib.error.HTTPError: the request failed after any retries. The error is reported as ytlink.search does but, instead of exiting, raised for the caller to handle.
+
+    """
+    params = { 'key': _sync.api_key(), **kwargs }
+
+    try:
+        response = await ytlink.retry.acall(
+            f'{api}.list',
+            lambda: session.get(f'{ytlink.service_url("api")}/{api}', params=params)
+        )
+    except urllib.error.HTTPError as e:
+        # Exiting inside a coroutine would take the whole event loop down, and
+            # a quota error writes the exhausted ledger to disk
+        await asyncio.to_thread(ytlink.error.parse, e, url=e.url, quit=False)
+        raise
+
+    return response.json()
+
+
+async def from_IDs(IDs, limit=_FAN_OUT_LIMIT):
+    """ Coroutine version of ytlink.Video.from_IDs, requesting the chunks of 50 IDs concurrently. """
+    IDs = list(IDs)
+    responses = await fan_out(
+        lambda keys: search(**keys), _sync.Video._IDs_search_keys(IDs),
+        limit=limit
+    )
+    return _sync.Video._from_responses(IDs, responses)
+
+
+async def playlist_channel(playlist):
+    """ Coroutine version of ytlink.Playlist.channel. """
+    try:
+        return playlist._channel
+    except AttributeError:
+        # The channel hasn't been loaded yet
+        playlist._save_channel(await search(**playlist._channel_search_keys()))
+
+    return playlist._channel
+
+
+async def _pages(playlist, max_vids, after_date, until_ID):
+    """ Generates pages of the playlist's videos newest first, prefetching the next page while the current page is handled. """
+    # Parsing a page sets each video's channel
+    await playlist_channel(playlist)
+    max_vids, search_keys = playlist._page_requests(max_vids, after_date, until_ID)
+
+    # Number of videos found so far
+    num_videos = 0
+    # The response will get videos newest first
+    next_page = asyncio.ensure_future(search(**search_keys))
+    try:
+        while next_page is not None:
+            response = await next_page
+            next_page = None
+
+            page, cont_search_flag = playlist._parse_page(
+                response, max_vids, num_videos, after_date, until_ID
+            )
+            num_videos += len(page)
+
+            # Only spend a request on the next page if it will be used
+            if cont_search_flag:
+                search_keys = { **search_keys, 'pageToken': response['nextPageToken'] }
+                next_page = asyncio.ensure_future(search(**search_keys))
+
+            yield page
+    finally:
+        if next_page is not None: next_page.cancel()
+
+
+async def iter_videos(
+        playlist, max_vids=10, after_date=None, until_ID=None,
+        chronological=False
+    ):
+    """ Asynchronously generates the playlist's uploaded videos. See ytlink.Playlist.iter_videos. """
+    pages = _pages(playlist, max_vids, after_date, until_ID)
+    if not chronological:
+        async for page in pages:
+            for video in page: yield video
+        return
+
+    # The pages come newest first, spill them to disk and read them back
+        # from the last page. File I/O runs in a worker thread so the loop
+        # keeps serving other coroutines
+    f = await asyncio.to_thread(tempfile.TemporaryFile, 'w+')
+    try:
+        spans = [
+            await asyncio.to_thread(_sync._spill_page, f, page)
+            async for page in pages
+        ]
+        for span in reversed(spans):
+            page = await asyncio.to_thread(
+                lambda: list(_sync._read_spilled(f, [span], playlist._channel))
+            )
+            for video in page: yield video
+    finally:
+        await asyncio.to_thread(f.close)
+
+
+async def videos(
+        playlist, max_vids=10, after_date=None, until_ID=None,
+        chronological=False
+    ):
+    """ Coroutine version of ytlink.Playlist.videos.
+
+        Args:
+            playlist (ytlink.Playlist): the playlist to get the videos of.
+
+        Kwargs:
+            See ytlink.Playlist.videos.
+
+        Returns:
+            (list): list of ytlink.Video's.
+
+    """
+    return [
+        video async for video in iter_videos(
+            playlist, max_vids=max_vids, after_date=after_date,
+            until_ID=until_ID, chronological=chronological
+        )
+    ]
+
+
+async def uploads_playlist(channel):
+    """ Coroutine version of ytlink.Channel.uploads_playlist. """
+    if 'uploads' not in channel.playlists:
+        # Uploads has never been found before
+        channel._save_uploads(await search(**channel._uploads_search_keys()))
+
+    return channel.playlists['uploads']
+
+
+async def iter_uploads(
+        channel, max_vids=10, after_date=None, until_ID=None,
+        chronological=False
+    ):
+    """ Asynchronously generates the channel's uploaded videos. See ytlink.Playlist.iter_videos. """
+    async for video in iter_videos(
+        await uploads_playlist(channel), max_vids=max_vids,
+        after_date=after_date, until_ID=until_ID, chronological=chronological
+    ):
+        yield video
+
+
+async def uploads(
+        channel, max_vids=10, after_date=None, until_ID=None,
+        chronological=False
+    ):
+    """ Coroutine version of ytlink.Channel.uploads. """
+    return await videos(
+        await uploads_playlist(channel), max_vids=max_vids,
+        after_date=after_date, until_ID=until_ID, chronological=chronological
+    )
+
+
+async def get_subscriptions(youtube):
+    """ Coroutine version of ytlink.get_subscriptions. The OAuth client only blocks, so it runs in a worker thread. """
+    return await asyncio.to_thread(ytlink.get_subscriptions, youtube)
+
+
+#======================== Concurrency ========================#
+
+
+async def fan_out(function, items, limit=_FAN_OUT_LIMIT):
+    """ Awaits function(item) for every item with at most limit running at once. The first error cancels every call still running and is raised.
+
+        Args:
+            function (function): the coroutine function to call on each item.
+
+            items (iterable): the items to call it on.
+
+        Kwargs:
+            limit (int): the most calls awaited at the same time.
+
+        Returns:
+            (list): the results in the order of the items.
+
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(item):
+        async with semaphore: return await function(item)
+
+    tasks = [ asyncio.ensure_future(run(item)) for item in items ]
+    if not tasks: return []
+
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+    finally:
+        # Nothing outlives the call, whether it failed or was cancelled
+        for task in tasks: task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return [ task.result() for task in tasks ]
+
+
+async def gather_uploads(channels, limit=_FAN_OUT_LIMIT, **kwargs):
+    """ Gets the uploads of every channel concurrently.
+
+        Args:
+            channels (list): the ytlink.Channel's.
+
+        Kwargs:
+            limit (int): the most channels pulled at the same time.
+
+            **kwargs: passed to ytlink.aio.uploads, i.e. after_date.
+
+        Returns:
+            (list): a list of ytlink.Video's for each channel, in the order of the channels.
+
+    """
+    return await fan_out(
+        lambda channel: uploads(channel, **kwargs), channels, limit=limit
+    )
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""Local SQLite catalog of channels, playlists, videos and playlist membership.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+#--- Custom imports ---#
+import ytlink
+#======================== Fields ========================#
+_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS channels (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    -- Whether every upload of the channel has been pulled
+    backfilled INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS channels_name ON channels (name);
+
+CREATE TABLE IF NOT EXISTS playlists (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    channel_id TEXT,
+    -- Key of the playlist in ytlink.Channel.playlists, i.e. uploads
+    role TEXT
+);
+CREATE INDEX IF NOT EXISTS playlists_channel ON playlists (channel_id);
+
+CREATE TABLE IF NOT EXISTS videos (
+    id TEXT PRIMARY KEY,
+    channel_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT,
+    published_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS videos_channel_date ON videos (channel_id, published_at);
+CREATE INDEX IF NOT EXISTS videos_date ON videos (published_at);
+
+CREATE TABLE IF NOT EXISTS playlist_items (
+    playlist_id TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    -- queued, sending, added or failed
+    status TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (playlist_id, video_id)
+);
+CREATE INDEX IF NOT EXISTS playlist_items_video ON playlist_items (video_id);
+CREATE INDEX IF NOT EXISTS playlist_items_status ON playlist_items (status);
+
+-- One-off facts about the catalog itself, i.e. whether legacy files were imported
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+#======================== Helper ========================#
+
+
+def _now():
+    return datetime.now().strftime(_DATE_FORMAT)
+
+
+def _video_row(video):
+    return (
+        video.ID, video._channelID, video.name, video.description,
+        video.date.strftime(_DATE_FORMAT)
+    )
+
+
+def _video_from_row(row):
+    ID, channelID, name, description, date = row
+    return ytlink.Video(
+        name=name, ID=ID, date=date,
+        channelID=channelID, description=description
+    )
+
+
+#======================== Objects ========================#
+
+
+class Catalog:
+    """ Thread-safe catalog stored in a single SQLite file. Every write goes through Catalog.transaction.
+
+        Attributes:
+            fname: the path to the database
+    """
+    def __init__(self, fname):
+        self.fname = fname
+        self._lock = threading.RLock()
+        # Transactions are managed explicitly by Catalog.transaction
+        self._db = sqlite3.connect(
+            fname, isolation_level=None, check_same_thread=False
+        )
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock: self._db.close()
+
+    @contextmanager
+    def transaction(self):
+        """ Runs the enclosed writes as a single transaction, rolling back on any error. """
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+
+    def _query(self, sql, params=()):
+        with self._lock: return self._db.execute(sql, params).fetchall()
+
+    #------------- Meta -------------#
+
+    def meta(self, key, default=None):
+        """ Gets a value saved with Catalog.set_meta or the default. """
+        rows = self._query('SELECT value FROM meta WHERE key = ?', (key,))
+        return rows[0][0] if rows else default
+
+    def set_meta(self, key, value):
+        """ Saves a value about the catalog itself. """
+        with self.transaction() as db:
+            db.execute(
+                'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                (key, str(value))
+            )
+
+    #------------- Channels -------------#
+
+    def add_channels(self, channels):
+        """ Saves channels and their playlists, keeping whether they were backfilled. """
+        with self.transaction() as db:
+            for channel in channels:
+                db.execute(
+                    'INSERT INTO channels (id, name) VALUES (?, ?) '
+                    'ON CONFLICT (id) DO UPDATE SET name = excluded.name',
+                    (channel.ID, channel.name)
+                )
+                db.executemany(
+                    'INSERT OR REPLACE INTO playlists (id, name, channel_id, role) '
+                    'VALUES (?, ?, ?, ?)',
+                    [
+                        (playlist.ID, playlist.name, channel.ID, role)
+                        for role, playlist in channel.playlists.items()
+                    ]
+                )
+
+    def channels(self):
+        """ Gets the saved channels keyed by name. """
+        playlists = {}
+        for ID, name, channelID, role in self._query(
+            'SELECT id, name, channel_id, role FROM playlists '
+            'WHERE channel_id IS NOT NULL'
+        ):
+            playlists.setdefault(channelID, {})[role] = ytlink.Playlist(name, ID)
+
+        channels = {}
+        for ID, name in self._query('SELECT id, name FROM channels ORDER BY name'):
+            channel = ytlink.Channel(name=name, ID=ID)
+            channel.playlists = playlists.get(ID, {})
+            channels[name] = channel
+
+        return channels
+
+    def is_backfilled(self, channel):
+        rows = self._query('SELECT backfilled FROM channels WHERE id = ?', (channel.ID,))
+        return bool(rows and rows[0][0])
+
+    #------------- Videos -------------#
+
+    def add_videos(self, videos, backfilled=None):
+        """ Saves videos, optionally marking a channel's uploads as fully pulled in the same transaction. """
+        with self.transaction() as db:
+            db.executemany(
+                'INSERT OR REPLACE INTO videos '
+                '(id, channel_id, title, description, published_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                [ _video_row(video) for video in videos ]
+            )
+            if backfilled is not None:
+                db.execute(
+                    'UPDATE channels SET backfilled = 1 WHERE id = ?',
+                    (backfilled.ID,)
+                )
+
+    def newest_video(self, channelID):
+        """ Gets the newest saved video of a channel or None. """
+        rows = self._query(
+            'SELECT id, channel_id, title, description, published_at FROM videos '
+            'WHERE channel_id = ? ORDER BY published_at DESC LIMIT 1',
+            (channelID,)
+        )
+        return _video_from_row(rows[0]) if rows else None
+
+    def upload_dates(self, channelID, limit=50):
+        """ Gets the publication dates of a channel's newest saved videos, oldest first. """
+        rows = self._query(
+            'SELECT published_at FROM videos WHERE channel_id = ? '
+            'ORDER BY published_at DESC LIMIT ?',
+            (channelID, limit)
+        )
+        return [ datetime.strptime(date, _DATE_FORMAT) for date, in reversed(rows) ]
+
+    #------------- Playlist membership -------------#
+
+    def _set_status(self, playlist, videos, status, replace):
+        verb = 'INSERT OR REPLACE' if replace else 'INSERT OR IGNORE'
+        now = _now()
+        with self.transaction() as db:
+            db.executemany(
+                f'{verb} INTO playlist_items (playlist_id, video_id, status, updated_at) '
+                'VALUES (?, ?, ?, ?)',
+                [ (playlist.ID, video.ID, status, now) for video in videos ]
+            )
+
+    def queue_videos(self, playlist, videos):
+        """ Records videos as waiting to be added to a playlist. Videos already queued or added are untouched. """
+        self._set_status(playlist, videos, 'queued', replace=False)
+
+    def mark_sending(self, playlist, videos):
+        """ Records videos as having their inserts sent, so an interrupted run can check whether they were added. """
+        self._set_status(playlist, videos, 'sending', replace=True)
+
+    def requeue_videos(self, playlist, videos):
+        """ Puts videos whose inserts didn't go through back in the queue. """
+        self._set_status(playlist, videos, 'queued', replace=True)
+
+    def mark_added(self, playlist, videos):
+        """ Records videos as added to a playlist. """
+        self._set_status(playlist, videos, 'added', replace=True)
+
+    def mark_failed(self, playlist, videos):
+        """ Records videos that can never be added to a playlist, i.e. deleted videos, so they leave the queue. """
+        self._set_status(playlist, videos, 'failed', replace=True)
+
+    def _videos_by_status(self, status, playlistIDs):
+        """ Gets the saved videos with a status, as lists in date order keyed by playlist ID. Only those of the given playlists if any. """
+        sql = (
+            'SELECT p.playlist_id, v.id, v.channel_id, v.title, v.description, v.published_at '
+            'FROM playlist_items p JOIN videos v ON v.id = p.video_id '
+            'WHERE p.status = ?'
+        )
+        if playlistIDs is None:
+            rows = self._query(f'{sql} ORDER BY v.published_at', (status,))
+        else:
+            playlistIDs = list(playlistIDs)
+            rows = []
+            # Stay under SQLite's bound parameter limit
+            for i in range(0, len(playlistIDs), 500):
+                chunk = playlistIDs[i:i + 500]
+                rows += self._query(
+                    f'{sql} AND p.playlist_id IN ({",".join("?" * len(chunk))}) '
+                    'ORDER BY v.published_at',
+                    (status, *chunk)
+                )
+
+        videos = {}
+        for playlistID, *row in rows:
+            videos.setdefault(playlistID, []).append(_video_from_row(row))
+
+        return videos
+
+    def queued_videos(self, playlistIDs=None):
+        """ Gets the saved videos waiting to be added, as lists in date order keyed by playlist ID. Only the queues of the given playlists if any. """
+        return self._videos_by_status('queued', playlistIDs)
+
+    def sending_videos(self, playlistIDs=None):
+        """ Gets the videos whose inserts were sent but never acknowledged, i.e. by an interrupted run, like queued_videos. """
+        return self._videos_by_status('sending', playlistIDs)
+
+    def added_IDs(self, playlist, videos):
+        """ Gets the IDs of the videos already added to a playlist. """
+        IDs = [ video.ID for video in videos ]
+        known = set()
+        # Stay under SQLite's bound parameter limit
+        for i in range(0, len(IDs), 500):
+            chunk = IDs[i:i + 500]
+            known.update(ID for ID, in self._query(
+                "SELECT video_id FROM playlist_items WHERE playlist_id = ? AND status = 'added' "
+                f'AND video_id IN ({",".join("?" * len(chunk))})',
+                (playlist.ID, *chunk)
+            ))
+        return known
+
+    def pending_videos(self, channel, playlist=None):
+        """ Gets the channel's videos not yet added to the playlist, nor failed for good, in chronological order. """
+        return [
+            _video_from_row(row) for row in self._query(
+                'SELECT id, channel_id, title, description, published_at '
+                'FROM videos WHERE channel_id = ? AND id NOT IN ('
+                'SELECT video_id FROM playlist_items WHERE playlist_id = ? '
+                "AND status IN ('added', 'failed')"
+                ') ORDER BY published_at',
+                (channel.ID, playlist.ID if playlist is not None else None)
+            )
+        ]
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""Keeps persistent, compressed HTTP connections for requesting results from Google APIs.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import io
+import os
+import gzip
+import json
+import zlib
+import queue
+import threading
+import http.client
+import urllib.error
+import urllib.parse
+#======================== Fields ========================#
+# Number of idle connections kept alive for each host
+_POOL_SIZE = 10
+# Seconds to wait on a connection before giving up
+_TIMEOUT = 30
+# Errors raised when a kept-alive connection was closed by the server
+_STALE_ERRORS = (
+    http.client.RemoteDisconnected, http.client.BadStatusLine,
+    ConnectionResetError, BrokenPipeError
+)
+# Decoder of JSON responses, see use_fast_json
+_loads = json.loads
+#======================== Helper ========================#
+
+
+def build_url(url, params=None):
+    """ Appends the URL-encoded parameters to the url. """
+    if not params: return url
+    return f'{url}?{urllib.parse.urlencode(params, quote_via=urllib.parse.quote)}'
+
+
+def decode(body, encoding):
+    """ Decompresses a response body according to its Content-Encoding header. """
+    if encoding == 'gzip': return gzip.decompress(body)
+    if encoding == 'deflate': return zlib.decompress(body)
+    return body
+
+
+def use_fast_json(enabled=True):
+    """ Decodes responses with orjson when it is installed, otherwise with the standard library. Returns whether orjson is used. """
+    global _loads
+    _loads = json.loads
+    if not enabled: return False
+
+    try:
+        import orjson
+    except ImportError:
+        return False
+
+    _loads = orjson.loads
+    return True
+
+
+#======================== Objects ========================#
+
+
+class Response:
+    """ Fully read response from a Session request.
+
+        Attributes:
+            status: the HTTP status code
+            headers: the response headers
+            body: the decompressed response body as bytes
+            size: the number of bytes received for the body
+    """
+    def __init__(self, status, headers, body, size=None):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.size = len(body) if size is None else size
+
+    def json(self):
+        return _loads(self.body)
+
+
+class Session:
+    """ Thread-safe pool of keep-alive connections shared by every request.
+
+        Attributes:
+            pool_size: the number of idle connections kept alive per host
+            timeout: the socket timeout for each connection
+            context: the ssl context used for HTTPS connections
+    """
+    def __init__(self, pool_size=_POOL_SIZE, timeout=_TIMEOUT, context=None):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.context = context
+
+        # Idle connections keyed by (scheme, host)
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, key):
+        with self._lock:
+            if key not in self._pools:
+                self._pools[key] = queue.LifoQueue(maxsize=self.pool_size)
+            return self._pools[key]
+
+    def _connect(self, scheme, netloc):
+        if scheme == 'https':
+            return http.client.HTTPSConnection(
+                netloc, timeout=self.timeout, context=self.context
+            )
+        return http.client.HTTPConnection(netloc, timeout=self.timeout)
+
+    def _acquire(self, key):
+        """ Gets an idle connection for the host or opens a new one. Returns whether the connection was reused. """
+        try:
+            return self._pool(key).get_nowait(), True
+        except queue.Empty:
+            return self._connect(*key), False
+
+    def _release(self, key, conn):
+        try:
+            self._pool(key).put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def request(self, method, url, params=None, headers=None, body=None):
+        """ Makes a request over a pooled connection.
+
+            Args:
+                method (str): the HTTP method.
+
+                url (str): the url to request without its query.
+
+            Kwargs:
+                params (dict): query parameters to URL-encode.
+
+                headers (dict): additional request headers.
+
+                body (bytes): the request body.
+
+            Returns:
+                (ytlink.connection.Response): the decompressed response.
+
+            Raises:
+                urllib.error.HTTPError: the server returned an error status.
+
+        """
+        url = build_url(url, params)
+        parts = urllib.parse.urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = urllib.parse.urlunsplit(('', '', parts.path, parts.query, ''))
+
+        request_headers = { 'Accept-Encoding': 'gzip' }
+        if headers: request_headers.update(headers)
+
+        while True:
+            conn, reused = self._acquire(key)
+            try:
+                conn.request(method, path, body=body, headers=request_headers)
+                response = conn.getresponse()
+                raw = response.read()
+                break
+            except _STALE_ERRORS:
+                conn.close()
+                # A fresh connection failing is a real error
+                if not reused: raise
+            except BaseException:
+                conn.close()
+                raise
+
+        if response.will_close:
+            conn.close()
+        else:
+            self._release(key, conn)
+
+        content = decode(raw, response.getheader('Content-Encoding'))
+        if response.status >= 400:
+            raise urllib.error.HTTPError(
+                url, response.status, response.reason,
+                response.headers, io.BytesIO(content)
+            )
+
+        return Response(response.status, response.headers, content, size=len(raw))
+
+    def get(self, url, params=None, headers=None):
+        return self.request('GET', url, params=params, headers=headers)
+
+    def close(self):
+        """ Closes every idle connection. """
+        with self._lock:
+            pools, self._pools = self._pools, {}
+
+        for pool in pools.values():
+            while not pool.empty():
+                pool.get_nowait().close()
+
+
+# Shared session for the package
+session = Session()
+if os.environ.get('YTLINK_FAST_JSON'): use_fast_json()
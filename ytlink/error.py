@@ -7,19 +7,29 @@
 #------------- Imports -------------#
 import sys
 import urllib.error
-import googleapiclient.errors
 #--- Custom imports ---#
 from ytlink.tools.console import *
+import ytlink.quota
+import ytlink.retry
 #======================== Helper ========================#
 
 
 def _quota_exceeded(quit):
     """ Handles the "quota exceeded" message. """
+    # Nothing else can be spent until the quota resets
+    ytlink.quota.ledger.exhaust()
     message = '[fail]Quota exceeded[/]'
     message += ', exiting...' if quit else '.'
     print(message)
 
 
+def _is_google_error(error):
+    """ Whether the error is a googleapiclient.errors.HttpError, without importing the Google client. """
+    # The error can only come from the client if it has been loaded
+    errors = sys.modules.get('googleapiclient.errors')
+    return errors is not None and isinstance(error, errors.HttpError)
+
+
 def parse(error, url=None, quit=True):
     """ Parses the error to identify it as a quota error or some other issue.
         
@@ -35,13 +45,14 @@ def parse(error, url=None, quit=True):
             (None): none
     
     """
-    if isinstance(error, urllib.error.HTTPError):
-        if error.code == 403:
-            # Quota exceeded error.
-            _quota_exceeded(quit)
-    elif isinstance(error, googleapiclient.errors.HttpError):
-        if error.status_code == 403:
+    if isinstance(error, urllib.error.HTTPError) or _is_google_error(error):
+        status = ytlink.retry.status(error)
+        reason = ytlink.retry.reason(error)
+        if reason in ytlink.retry.QUOTA_REASONS:
             _quota_exceeded(quit)
+        else:
+            # Throttling and server errors that outlasted every retry
+            print(f'[fail]Request failed[/] with status {status}: {reason}.')
     else:
         # Unidentified error
         print(error)
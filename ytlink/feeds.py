@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""Detects new uploads from the channels' public Atom feeds, which cost no quota.
+
+Each feed lists a channel's latest uploads newest first. Feeds are requested
+with the validators of the previous poll so unchanged feeds answer 304 Not
+Modified, and only the first entry is parsed. The feed url can be pointed at
+locally served feed files through YTLINK_FEED_URL or ytlink.configure, i.e.
+
+    YTLINK_FEED_URL=http://127.0.0.1:8000/{channelID}.xml
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import io
+import os
+import json
+import threading
+import http.client
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+#--- Custom imports ---#
+import ytlink
+import ytlink.retry
+import ytlink.marks
+import ytlink.metrics
+import ytlink.connection
+#======================== Fields ========================#
+_NAMESPACES = {
+    'atom': 'http://www.w3.org/2005/Atom',
+    'yt': 'http://www.youtube.com/xml/schemas/2015',
+    'media': 'http://search.yahoo.com/mrss/',
+}
+_ENTRY = f'{{{_NAMESPACES["atom"]}}}entry'
+#======================== Helper ========================#
+
+
+def feed_url(channel):
+    return ytlink.service_url('feed').format(channelID=channel.ID)
+
+
+def parse_feed(source, max_vids=None, until_ID=None, after_date=None):
+    """ Parses a channel's Atom feed entry by entry, newest first, without reading past the last video needed.
+
+        Args:
+            source (bytes/file): the feed.
+
+        Kwargs:
+            max_vids (int): the maximum number of videos to parse, None for every entry.
+
+            until_ID (str): only get the videos newer than the video with this ID.
+
+            after_date (datetime.datetime): only get the videos after the given date.
+
+        Returns:
+            (list): list of ytlink.Video's, newest first.
+
+    """
+    if isinstance(source, bytes): source = io.BytesIO(source)
+
+    videos = []
+    for _, element in ET.iterparse(source, events=('end',)):
+        if element.tag != _ENTRY: continue
+
+        videoID = element.findtext('yt:videoId', namespaces=_NAMESPACES)
+        # This video and everything after it was already seen
+        if videoID == until_ID: break
+
+        video = ytlink.Video(
+            name=element.findtext('atom:title', namespaces=_NAMESPACES),
+            ID=videoID,
+            date=element.findtext('atom:published', namespaces=_NAMESPACES),
+            channelID=element.findtext('yt:channelId', namespaces=_NAMESPACES),
+            description=element.findtext(
+                'media:group/media:description', namespaces=_NAMESPACES
+            )
+        )
+        # This video is too old now, break out.
+        if after_date is not None and video.date < after_date: break
+
+        videos.append(video)
+        # Parsed entries are no longer needed
+        element.clear()
+        if max_vids is not None and len(videos) >= max_vids: break
+
+    return videos
+
+
+def is_newer(newest, mark=None, after_date=None):
+    """ Whether the newest upload of a feed is newer than the channel's mark, or than the date for channels without a mark.
+
+        Args:
+            newest (ytlink.marks.Mark): the newest upload of the feed, None if the feed is empty.
+
+        Kwargs:
+            mark (ytlink.marks.Mark): the newest video seen from the channel.
+
+            after_date (datetime.datetime): the date of the last run.
+
+        Returns:
+            (bool): whether the channel has uploads to pull.
+
+    """
+    if newest is None: return False
+    if mark is not None:
+        return newest.videoID != mark.videoID and newest.date >= mark.date
+    return after_date is None or newest.date > after_date
+
+
+#======================== Objects ========================#
+
+
+class FeedCache:
+    """ Thread-safe store of each feed's validators and newest upload, saved as JSON with FeedCache.save.
+
+        Attributes:
+            fname: the path to the JSON file holding the cache
+    """
+    def __init__(self, fname):
+        self.fname = Path(fname)
+        self._lock = threading.Lock()
+
+        self._feeds = {}
+        if self.fname.exists():
+            with open(self.fname, 'r') as f: self._feeds = json.load(f)
+
+    def get(self, channelID):
+        """ Gets the (etag, last_modified, newest) saved for a channel's feed. Each is None if unknown. """
+        with self._lock: feed = self._feeds.get(channelID, {})
+
+        newest = feed.get('newest')
+        return (
+            feed.get('etag'), feed.get('last_modified'),
+            ytlink.marks.Mark.from_dict(newest) if newest is not None else None
+        )
+
+    def set(self, channelID, etag, last_modified, newest):
+        with self._lock:
+            self._feeds[channelID] = {
+                'etag': etag, 'last_modified': last_modified,
+                'newest': newest.dict() if newest is not None else None,
+            }
+
+    def remove(self, channelIDs):
+        """ Forgets the feeds of channels, i.e. those unsubscribed from. """
+        with self._lock:
+            for channelID in channelIDs: self._feeds.pop(channelID, None)
+
+    def save(self):
+        """ Atomically writes the cache. """
+        with self._lock:
+            tmp_fname = self.fname.with_suffix('.tmp')
+            with open(tmp_fname, 'w') as f: json.dump(self._feeds, f)
+            os.replace(tmp_fname, self.fname)
+
+
+#======================== Reading ========================#
+
+
+def newest_upload(channel, cache=None):
+    """ Gets the newest upload listed in the channel's feed. With a cache, the feed is only downloaded if it changed since the last poll.
+
+        Args:
+            channel (ytlink.Channel): the channel to poll.
+
+        Kwargs:
+            cache (ytlink.feeds.FeedCache): the validators of earlier polls, updated with this poll.
+
+        Returns:
+            (ytlink.marks.Mark): the newest upload, None if the feed lists none.
+
+        Raises:
+            urllib.error.HTTPError: the feed could not be requested.
+
+    """
+    etag, last_modified, newest = (
+        cache.get(channel.ID) if cache is not None else (None, None, None)
+    )
+    headers = {}
+    if etag is not None: headers['If-None-Match'] = etag
+    if last_modified is not None: headers['If-Modified-Since'] = last_modified
+
+    # Feeds cost no quota, they are still timed with the API requests
+    with ytlink.metrics.recorder.span('feeds') as span:
+        response = ytlink.retry.policy.call(
+            ytlink.connection.session.get, feed_url(channel), headers=headers
+        )
+        span.bytes = response.size
+
+    # Nothing was uploaded since the last poll
+    if response.status == 304: return newest
+
+    videos = parse_feed(response.body, max_vids=1)
+    newest = ytlink.marks.Mark(videos[0].ID, videos[0].date) if videos else None
+    if cache is not None:
+        cache.set(
+            channel.ID, response.headers.get('ETag'),
+            response.headers.get('Last-Modified'), newest
+        )
+
+    return newest
+
+
+def changed_channels(channels, marks=None, after_date=None, cache=None, max_workers=1):
+    """ Gets the channels whose feeds show uploads newer than their mark, or than the date for channels without one. Channels whose feeds can't be read are kept so the Data API is asked instead.
+
+        Args:
+            channels (list): list of ytlink.Channel's to poll.
+
+        Kwargs:
+            marks (ytlink.marks.Marks): the newest video seen for each channel.
+
+            after_date (datetime.datetime): the date of the last run.
+
+            cache (ytlink.feeds.FeedCache): the validators of earlier polls.
+
+            max_workers (int): the maximum number of feeds to request concurrently.
+
+        Returns:
+            (list): the ytlink.Channel's to pull, in the order given.
+
+    """
+    def changed(channel):
+        try:
+            newest = newest_upload(channel, cache)
+        except (OSError, http.client.HTTPException, ET.ParseError, ValueError):
+            # Connection, HTTP and malformed feed errors alike
+            return True
+
+        mark = marks.get(channel.ID) if marks is not None else None
+        return is_newer(newest, mark, after_date)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        flags = list(executor.map(changed, channels))
+
+    return [ channel for channel, flag in zip(channels, flags) if flag ]
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Compiles per-channel video filters once per run, keyed by channel ID.
+
+Rules are given per channel name or channel ID. A plain string skips videos
+whose title or description contains it, ignoring case. A dictionary rule
+takes one of:
+
+    { "regex": "Round ?up" }   a regular expression
+    { "word": "Live" }         a whole word
+    { "phrase": "Leak" }       a substring, same as a plain string
+
+and can add "title_only": true to ignore the description.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import re
+#======================== Helper ========================#
+
+
+def _rule_pattern(rule):
+    """ Gets the (label, pattern, title_only) of a filter rule from settings. Plain phrases have a None pattern. """
+    if isinstance(rule, str): return rule, None, False
+
+    title_only = rule.get('title_only', False)
+    if 'regex' in rule: return rule['regex'], rule['regex'], title_only
+    if 'word' in rule:
+        return rule['word'], rf'\b{re.escape(rule["word"])}\b', title_only
+    if 'phrase' in rule: return rule['phrase'], None, title_only
+
+    raise ValueError(f'Unrecognized filter rule: {rule}.')
+
+
+#======================== Objects ========================#
+
+
+class _Rules:
+    """ Rules for one field of a channel's videos. Phrases are lower cased once and checked with substring search, which is faster than a regex in CPython. Patterns are joined into a single case insensitive alternation. """
+    __slots__ = ('phrases', 'regex', 'labels')
+
+    def __init__(self, rules):
+        self.phrases = tuple(
+            (label.lower(), label) for label, pattern in rules if pattern is None
+        )
+
+        patterns = [ (label, pattern) for label, pattern in rules if pattern is not None ]
+        self.labels = [ label for label, _ in patterns ]
+        self.regex = re.compile(
+            '|'.join( f'(?P<_rule{i}>{pattern})' for i, (_, pattern) in enumerate(patterns) ),
+            re.IGNORECASE
+        ) if patterns else None
+
+    def search(self, text):
+        """ Gets the label of the rule matching the text or None. """
+        if not text: return None
+
+        if self.phrases:
+            lower_text = text.lower()
+            for phrase, label in self.phrases:
+                if phrase in lower_text: return label
+
+        if self.regex is None: return None
+        match = self.regex.search(text)
+        if match is None: return None
+
+        for i, label in enumerate(self.labels):
+            if match.group(f'_rule{i}') is not None: return label
+
+
+class FilterSet:
+    """ Filters from settings compiled once per run and looked up by channel ID.
+
+        Attributes:
+            unknown: names of channels in the filters that aren't among the channels provided
+    """
+    def __init__(self, filters, channels):
+        """ Compiles the filters.
+
+            Args:
+                filters (dict): lists of rules keyed by channel name or ID.
+
+                channels (list): the ytlink.Channel's to resolve channel names with.
+
+        """
+        IDs = { channel.name: channel.ID for channel in channels }
+        known_IDs = set(IDs.values())
+
+        self.unknown = []
+        # Compiled (title, description) rules keyed by channel ID
+        self._rules = {}
+        for key, rules in filters.items():
+            channelID = key if key in known_IDs else IDs.get(key)
+            if channelID is None:
+                self.unknown.append(key)
+                continue
+
+            patterns = [ _rule_pattern(rule) for rule in rules ]
+            self._rules[channelID] = (
+                _Rules([ (label, pattern) for label, pattern, _ in patterns ]),
+                _Rules([
+                    (label, pattern)
+                    for label, pattern, title_only in patterns if not title_only
+                ])
+            )
+
+    def match(self, video):
+        """ Gets the rule that filters the video or None if the video should not be filtered. """
+        rules = self._rules.get(video._channelID)
+        if rules is None: return None
+
+        title_rules, description_rules = rules
+        label = title_rules.search(video.name)
+        if label is not None: return label
+
+        return description_rules.search(video.description)
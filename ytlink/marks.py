@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Stores the newest video seen for each channel so runs only request what is new.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import os
+import json
+import threading
+from pathlib import Path
+from datetime import datetime
+#======================== Fields ========================#
+_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+#======================== Objects ========================#
+
+
+class Mark:
+    """ High-water mark of a channel.
+
+        Attributes:
+            videoID: the ID of the newest video seen
+            date: the publish date of that video
+    """
+    def __init__(self, videoID, date):
+        self.videoID = videoID
+        self.date = date
+
+    def dict(self):
+        return { 'videoID': self.videoID, 'date': self.date.strftime(_DATE_FORMAT) }
+
+    @staticmethod
+    def from_dict(mark_dict):
+        return Mark(
+            mark_dict['videoID'],
+            datetime.strptime(mark_dict['date'], _DATE_FORMAT)
+        )
+
+
+class Marks:
+    """ Thread-safe store of channel marks saved as JSON after every change.
+
+        Attributes:
+            fname: the path to the JSON file holding the marks
+    """
+    def __init__(self, fname):
+        self.fname = Path(fname)
+        self._lock = threading.Lock()
+
+        self._marks = {}
+        if self.fname.exists():
+            with open(self.fname, 'r') as f:
+                self._marks = {
+                    channelID: Mark.from_dict(mark_dict)
+                    for channelID, mark_dict in json.load(f).items()
+                }
+
+    def __contains__(self, channelID):
+        return channelID in self._marks
+
+    def get(self, channelID):
+        """ Gets the mark for a channel or None if the channel has never been seen. """
+        return self._marks.get(channelID)
+
+    def advance(self, videos):
+        """ Moves the mark of each video's channel to the video if it is newer than the current mark and saves once. """
+        with self._lock:
+            changed = False
+            for video in videos:
+                mark = self._marks.get(video._channelID)
+                if mark is not None and video.date <= mark.date: continue
+
+                self._marks[video._channelID] = Mark(video.ID, video.date)
+                changed = True
+
+            if changed: self._save()
+
+    def remove(self, channelIDs):
+        """ Forgets the marks of channels, i.e. those unsubscribed from, and saves once. """
+        with self._lock:
+            removed = [ self._marks.pop(channelID, None) for channelID in channelIDs ]
+            if any(mark is not None for mark in removed): self._save()
+
+    def _save(self):
+        """ Atomically writes the marks. Requires the lock. """
+        tmp_fname = self.fname.with_suffix('.tmp')
+        with open(tmp_fname, 'w') as f:
+            json.dump({
+                channelID: mark.dict()
+                for channelID, mark in self._marks.items()
+            }, f, indent=4)
+        os.replace(tmp_fname, self.fname)
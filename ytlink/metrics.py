@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""Records the calls, latency, bytes, retries and quota of every API endpoint.
+
+Every request made through ytlink is recorded by ytlink.metrics.recorder,
+one span per attempt. Hooks receive each finished span, i.e. to export them
+as OpenTelemetry spans:
+
+    tracer = opentelemetry.trace.get_tracer('ytlink')
+
+    def export(span):
+        otel_span = tracer.start_span(span.endpoint, start_time=int(span.start * 1e9))
+        otel_span.set_attribute('ytlink.units', span.units)
+        otel_span.end(end_time=int((span.start + span.duration) * 1e9))
+
+    ytlink.metrics.recorder.add_hook(export)
+
+Scripts run with --metrics print a JSON summary when they finish, and
+--metrics=FILE saves it instead, in the Prometheus text format for a .prom
+file.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import sys
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+#--- Custom imports ---#
+from ytlink.tools.console import *
+import ytlink.quota
+#======================== Fields ========================#
+# Upper bounds in seconds of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Flag for dumping the metrics at the end of a script
+_METRICS_ARG = '--metrics'
+#======================== Objects ========================#
+
+
+class Span:
+    """ A single attempt at an API request.
+
+        Attributes:
+            endpoint: the endpoint called, i.e. playlistItems.list
+            calls: the number of API calls in the request, more than one for batches
+            units: the quota units charged
+            attempt: the number of attempts made before this one
+            start: the time.time the attempt started
+            duration: the seconds the attempt took
+            bytes: the bytes received, 0 if unknown
+            error: the exception raised by the attempt or None
+    """
+    __slots__ = (
+        'endpoint', 'calls', 'units', 'attempt', 'start', 'duration',
+        'bytes', 'error'
+    )
+
+    def __init__(self, endpoint, calls=1, attempt=0):
+        self.endpoint = endpoint
+        self.calls = calls
+        self.units = ytlink.quota.cost(endpoint, calls)
+        self.attempt = attempt
+        self.start = time.time()
+        self.duration = 0
+        self.bytes = 0
+        self.error = None
+
+
+class _EndpointStats:
+    __slots__ = (
+        'requests', 'calls', 'errors', 'retries', 'units', 'bytes',
+        'buckets', 'seconds'
+    )
+
+    def __init__(self):
+        self.requests = 0
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.units = 0
+        self.bytes = 0
+        # Requests per latency bucket, the last bucket is +Inf
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.seconds = 0
+
+    def dict(self):
+        return {
+            'requests': self.requests, 'calls': self.calls,
+            'errors': self.errors, 'retries': self.retries,
+            'units': self.units, 'bytes': self.bytes,
+            'seconds': round(self.seconds, 6),
+            'latency_buckets': dict(zip(
+                [ str(bound) for bound in BUCKETS ] + ['+Inf'], self.buckets
+            )),
+        }
+
+
+class Recorder:
+    """ Thread-safe per-endpoint statistics and the hooks called with each span. """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._hooks = []
+
+    def add_hook(self, hook):
+        """ Calls hook(span) with every finished ytlink.metrics.Span. """
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self._hooks.remove(hook)
+
+    def _stats(self, endpoint):
+        """ Requires the lock. """
+        if endpoint not in self._endpoints:
+            self._endpoints[endpoint] = _EndpointStats()
+        return self._endpoints[endpoint]
+
+    @contextmanager
+    def span(self, endpoint, calls=1, attempt=0):
+        """ Times the enclosed request and records it, along with any error it raises.
+
+            Args:
+                endpoint (str): the endpoint called, i.e. playlistItems.list.
+
+            Kwargs:
+                calls (int): the number of API calls in the request.
+
+                attempt (int): the number of attempts made before this one.
+
+            Yields:
+                (ytlink.metrics.Span): the span to set the bytes received on.
+
+        """
+        span = Span(endpoint, calls=calls, attempt=attempt)
+        start = time.perf_counter()
+        try:
+            yield span
+        except Exception as e:
+            span.error = e
+            raise
+        finally:
+            span.duration = time.perf_counter() - start
+            self.record(span)
+
+    def record(self, span):
+        with self._lock:
+            stats = self._stats(span.endpoint)
+            stats.requests += 1
+            stats.calls += span.calls
+            stats.units += span.units
+            stats.bytes += span.bytes
+            stats.seconds += span.duration
+            stats.buckets[bisect.bisect_left(BUCKETS, span.duration)] += 1
+            if span.error is not None: stats.errors += 1
+            if span.attempt > 0: stats.retries += 1
+
+        for hook in list(self._hooks):
+            try:
+                hook(span)
+            except Exception as e:
+                # Instrumentation never takes a run down
+                print(f'[warning]Metrics hook {hook} failed:[/] {e}')
+
+    def count(self, endpoint, errors=0, retries=0):
+        """ Counts errors and retries of calls made inside a request, i.e. the inserts of a batch. """
+        with self._lock:
+            stats = self._stats(endpoint)
+            stats.errors += errors
+            stats.retries += retries
+
+    def reset(self):
+        with self._lock: self._endpoints = {}
+
+    def summary(self):
+        """ Gets the statistics of every endpoint keyed by endpoint. """
+        with self._lock:
+            return {
+                endpoint: stats.dict()
+                for endpoint, stats in sorted(self._endpoints.items())
+            }
+
+    def json(self):
+        return json.dumps(self.summary(), indent=4)
+
+    def prometheus(self):
+        """ Gets the statistics in the Prometheus text exposition format. """
+        summary = self.summary()
+        lines = []
+
+        def counter(name, key, description):
+            lines.append(f'# HELP ytlink_{name} {description}')
+            lines.append(f'# TYPE ytlink_{name} counter')
+            for endpoint, stats in summary.items():
+                lines.append(f'ytlink_{name}{{endpoint="{endpoint}"}} {stats[key]}')
+
+        counter('requests_total', 'requests', 'HTTP requests made.')
+        counter('calls_total', 'calls', 'API calls made, batches count each call.')
+        counter('errors_total', 'errors', 'API calls that failed.')
+        counter('retries_total', 'retries', 'API calls retried.')
+        counter('quota_units_total', 'units', 'Quota units charged.')
+        counter('received_bytes_total', 'bytes', 'Response bytes received.')
+
+        lines.append('# HELP ytlink_request_duration_seconds Latency of HTTP requests.')
+        lines.append('# TYPE ytlink_request_duration_seconds histogram')
+        for endpoint, stats in summary.items():
+            cumulative = 0
+            for bound, count in stats['latency_buckets'].items():
+                cumulative += count
+                lines.append(
+                    'ytlink_request_duration_seconds_bucket'
+                    f'{{endpoint="{endpoint}",le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'ytlink_request_duration_seconds_sum{{endpoint="{endpoint}"}} {stats["seconds"]}')
+            lines.append(f'ytlink_request_duration_seconds_count{{endpoint="{endpoint}"}} {stats["requests"]}')
+
+        return '\n'.join(lines) + '\n'
+
+
+# Recorder of every request made through the package
+recorder = Recorder()
+
+
+#======================== Output ========================#
+
+
+def dump(destination=None):
+    """ Writes the summary to stdout as JSON, or to a file. Files ending in .prom get the Prometheus text format, any other file gets JSON. """
+    if destination is None:
+        # Bypass rich, the summary isn't markup
+        sys.stdout.write(recorder.json() + '\n')
+        return
+
+    text = recorder.prometheus() if str(destination).endswith('.prom') else recorder.json()
+    with open(destination, 'w') as f: f.write(text)
+    print(f'Metrics saved to [emph]{destination}[/].')
+
+
+def dump_from_args(argv):
+    """ Dumps the summary if the script was run with --metrics or --metrics=FILE. """
+    for arg in argv[1:]:
+        if arg == _METRICS_ARG:
+            return dump()
+        if arg.startswith(f'{_METRICS_ARG}='):
+            return dump(arg.split('=', 1)[1])
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Keeps a ledger of the YouTube Data API quota spent each day.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import os
+import json
+import math
+import atexit
+import threading
+from pathlib import Path
+from datetime import datetime
+from zoneinfo import ZoneInfo
+#--- Custom imports ---#
+import ytlink
+#======================== Fields ========================#
+# Default daily quota for a project
+DAILY_LIMIT = 10000
+# Units charged per request for each endpoint, any other call costs 1 unit
+COSTS = {
+    'search.list': 100,
+    'playlistItems.insert': 50,
+    'playlists.insert': 50,
+    # Public Atom feeds and the WebSub hub aren't part of the Data API
+    'feeds': 0,
+    'websub': 0,
+}
+_DEFAULT_COST = 1
+# Units charged between writes of the ledger to disk
+_FLUSH_EVERY = 500
+# The quota resets at midnight Pacific time
+_TIMEZONE = ZoneInfo('America/Los_Angeles')
+#======================== Helper ========================#
+
+
+def cost(endpoint, calls=1):
+    """ Gets the number of units a number of calls to an endpoint costs. """
+    return COSTS.get(endpoint, _DEFAULT_COST) * calls
+
+
+def today():
+    """ Gets the current quota day as an ISO formatted date. """
+    return datetime.now(_TIMEZONE).date().isoformat()
+
+
+#======================== Objects ========================#
+
+
+class Ledger:
+    """ Thread-safe count of the units used today, saved across runs. The count is kept in memory and written every flush_every units, when the quota is exhausted and at exit. Units a thread reserves for its upcoming calls aren't remaining for the other threads, and its calls are charged to its reservation first.
+
+        Attributes:
+            fname: the path to the JSON file holding the ledger, None for quota.json in ytlink.CONFIG_DIR when first used
+            limit: the daily quota
+            flush_every: the number of units charged between writes
+    """
+    def __init__(self, fname=None, limit=DAILY_LIMIT, flush_every=_FLUSH_EVERY):
+        self.fname = Path(fname) if fname is not None else None
+        self.limit = limit
+        self.flush_every = flush_every
+
+        self._lock = threading.Lock()
+        # Loaded on first use
+        self._day = None
+        self._used = 0
+        # Units charged since the last write
+        self._unsaved = 0
+        # Units set aside with Ledger.reserve keyed by thread, never saved
+        self._reserved = {}
+        atexit.register(self.flush)
+
+    def _load(self):
+        """ Loads the ledger and resets it if the quota day has changed. Requires the lock. """
+        if self.fname is None: self.fname = ytlink.CONFIG_DIR / 'quota.json'
+        if self._day is None and self.fname.exists():
+            with open(self.fname, 'r') as f: data = json.load(f)
+            self._day, self._used = data['day'], data['used']
+
+        if self._day != today():
+            self._day, self._used = today(), 0
+            self._unsaved = 0
+
+    def _save(self):
+        """ Atomically writes the ledger. Requires the lock. """
+        self.fname.parent.mkdir(parents=True, exist_ok=True)
+        tmp_fname = self.fname.with_suffix('.tmp')
+        with open(tmp_fname, 'w') as f:
+            json.dump({ 'day': self._day, 'used': self._used }, f)
+        os.replace(tmp_fname, self.fname)
+        self._unsaved = 0
+
+    @property
+    def used(self):
+        with self._lock:
+            self._load()
+            return self._used
+
+    @property
+    def remaining(self):
+        with self._lock:
+            self._load()
+            return self._remaining()
+
+    def _remaining(self):
+        """ Gets the units neither used nor reserved. Requires the lock. """
+        return max(0, self.limit - self._used - sum(self._reserved.values()))
+
+    def charge(self, endpoint, calls=1):
+        """ Records calls made to an endpoint and returns the units charged. """
+        units = cost(endpoint, calls)
+        with self._lock:
+            self._load()
+            self._used += units
+            thread = threading.get_ident()
+            if thread in self._reserved:
+                self._reserved[thread] = max(0, self._reserved[thread] - units)
+            self._unsaved += units
+            if self._unsaved >= self.flush_every: self._save()
+
+        return units
+
+    def flush(self):
+        """ Writes any units charged since the last write. """
+        with self._lock:
+            if self._unsaved: self._save()
+
+    def exhaust(self):
+        """ Records that the API reported the quota as exceeded for today. """
+        with self._lock:
+            self._load()
+            self._used = max(self._used, self.limit)
+            self._save()
+
+    def reserve(self, endpoint, calls):
+        """ Sets aside the units of up to a number of calls to an endpoint for the calling thread, as many as the remaining budget allows. The thread's charges use them up, give back the rest with Ledger.release.
+
+            Returns:
+                (int): the number of calls reserved.
+
+        """
+        units = cost(endpoint)
+        with self._lock:
+            self._load()
+            if units: calls = min(calls, self._remaining() // units)
+            thread = threading.get_ident()
+            self._reserved[thread] = self._reserved.get(thread, 0) + units * calls
+
+        return calls
+
+    def release(self):
+        """ Gives back the units the calling thread reserved and didn't spend. """
+        with self._lock: self._reserved.pop(threading.get_ident(), None)
+
+    def affordable(self, endpoint, reserve=0):
+        """ Gets the number of calls to an endpoint that fit in the remaining budget after reserving some units, math.inf for endpoints that cost nothing. """
+        units = cost(endpoint)
+        if not units: return math.inf
+        return max(0, self.remaining - reserve) // units
+
+
+# Ledger shared by every request made through the package
+ledger = Ledger()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""Resolves channels from @handles, channel, custom and video URLs or plain names.
+
+Lookups go from the cheapest to the most expensive: channels already known
+locally cost nothing, handles, channel IDs, usernames and videos are looked
+up for 1 unit each, and the 100 unit search is only made once every other
+candidate was turned down.
+
+    for channel in ytlink.resolve.candidates('@rushfaster', known=channels):
+        ...
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import re
+import difflib
+import urllib.parse
+#--- Custom imports ---#
+import ytlink
+#======================== Fields ========================#
+# Similarity from 0 to 1 for a name to match a known channel's
+CUTOFF = 0.6
+# Most known channels proposed for a name
+_MAX_MATCHES = 3
+_CHANNEL_ID = re.compile(r'UC[\w-]{22}')
+_HOSTS = { 'youtube.com', 'm.youtube.com', 'music.youtube.com', 'youtu.be' }
+# Paths whose next segment is a video ID
+_VIDEO_PATHS = { 'shorts', 'live', 'embed', 'v' }
+#======================== Helper ========================#
+
+
+def _normalize(name):
+    """ Reduces a name to its lowercase letters and digits, so names and handles compare alike. """
+    return ''.join( char for char in name.casefold() if char.isalnum() )
+
+
+def parse(text):
+    """ Works out what the text names.
+
+        Args:
+            text (str): an @handle, a channel ID, a channel, custom or video URL, or a channel's name.
+
+        Returns:
+            (tuple): the kind, one of 'id', 'handle', 'username', 'custom', 'video' or 'name', and the value to look up.
+
+    """
+    text = text.strip()
+    if text.startswith('@'): return 'handle', text[1:]
+    if _CHANNEL_ID.fullmatch(text): return 'id', text
+
+    parts = urllib.parse.urlsplit(text if '://' in text else f'https://{text}')
+    host = parts.netloc.lower()
+    if host.startswith('www.'): host = host[len('www.'):]
+    if host not in _HOSTS: return 'name', text
+
+    segments = [ urllib.parse.unquote(segment) for segment in parts.path.split('/') if segment ]
+    query = urllib.parse.parse_qs(parts.query)
+    if host == 'youtu.be' and segments: return 'video', segments[0]
+    if 'v' in query: return 'video', query['v'][0]
+    if not segments: return 'name', text
+
+    first = segments[0]
+    if first.startswith('@'): return 'handle', first[1:]
+    if len(segments) > 1:
+        if first == 'channel': return 'id', segments[1]
+        if first == 'user': return 'username', segments[1]
+        if first == 'c': return 'custom', segments[1]
+        if first in _VIDEO_PATHS: return 'video', segments[1]
+
+    # Legacy custom URLs, i.e. youtube.com/name
+    return 'custom', first
+
+
+#======================== Objects ========================#
+
+
+class ChannelIndex:
+    """ Index of known channels matched by name without any request.
+
+        Attributes:
+            channels: the indexed ytlink.Channel's keyed by ID
+    """
+    def __init__(self, channels=()):
+        self.channels = {}
+        self._names = {}
+        for channel in channels: self.add(channel)
+
+    def add(self, channel):
+        self.channels[channel.ID] = channel
+        self._names.setdefault(_normalize(channel.name), channel)
+
+    def exact(self, name):
+        """ Gets the channel named the same but for case, spaces and punctuation, None if there is none. """
+        return self._names.get(_normalize(name))
+
+    def match(self, name, limit=_MAX_MATCHES, cutoff=CUTOFF):
+        """ Gets the known channels with names closest to the name, best first. """
+        return [
+            self._names[key] for key in difflib.get_close_matches(
+                _normalize(name), self._names, n=limit, cutoff=cutoff
+            )
+        ]
+
+
+#======================== Entry ========================#
+
+
+def _by_name(name, index, search=True, handle=True):
+    """ Generates the channels a name could be, from the cheapest lookups to the search. Skips looking the name up as a handle if it already was. """
+    yield index.exact(name)
+    # Handles are usually the channel's name without spaces, they keep any
+        # dots, underscores and hyphens
+    guess = ''.join(name.split())
+    if handle and guess: yield ytlink.Channel.from_handle(guess)
+    yield from index.match(name)
+
+    if not search: return
+    # Only propose results named like the search, as the search is broad
+    key = _normalize(name)
+    for item in ytlink.keyphrase_search(name, kind='channel'):
+        if _normalize(item['snippet']['title']) == key:
+            yield ytlink.Channel(name=item['snippet']['title'], ID=item['id']['channelId'])
+
+
+def _lookups(kind, value, index, search=True):
+    """ Generates the channels the parsed text could be, None for lookups that found nothing. """
+    if kind == 'id':
+        yield index.channels.get(value) or ytlink.Channel.from_ID(value)
+    elif kind == 'video':
+        yield ytlink.Channel.from_videoID(value)
+    elif kind == 'handle':
+        channel = ytlink.Channel.from_handle(value)
+        yield channel
+        if channel is None: yield from _by_name(value, index, search=search, handle=False)
+    elif kind == 'username':
+        channel = ytlink.Channel.from_username(value)
+        yield channel
+        if channel is None: yield from _by_name(value, index, search=search)
+    else:
+        # Custom URLs can't be looked up, but mostly match the handle or name
+        yield from _by_name(value, index, search=search)
+
+
+def candidates(text, known=(), search=True):
+    """ Generates the channels the text could name, one lookup at a time so the caller can stop at the right one. Lookups that cost more come later, the search last.
+
+        Args:
+            text (str): an @handle, a channel ID, a channel, custom or video URL, or a channel's name.
+
+        Kwargs:
+            known (iterable): ytlink.Channel's matched without any request, i.e. the catalog's. Channels found through the API are given as the known channel with the same ID, playlists included.
+
+            search (bool): whether to fall back to the 100 unit search.
+
+        Yields:
+            (ytlink.Channel): each channel found once.
+
+    """
+    index = ChannelIndex(known)
+    seen = set()
+    for channel in _lookups(*parse(text), index, search=search):
+        if channel is None or channel.ID in seen: continue
+        seen.add(channel.ID)
+        yield index.channels.get(channel.ID, channel)
+
+
+def resolve(text, known=(), search=True):
+    """ Gets the likeliest channel the text names, None if nothing was found. See candidates. """
+    return next(candidates(text, known=known, search=search), None)
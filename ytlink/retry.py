@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""Retries throttled and failed API requests with paced, jittered exponential backoff.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import json
+import time
+import random
+import itertools
+import threading
+#--- Custom imports ---#
+import ytlink.quota
+import ytlink.metrics
+#======================== Fields ========================#
+# Error reasons that clear up on their own after waiting
+RETRYABLE_REASONS = {
+    'rateLimitExceeded', 'userRateLimitExceeded',
+    'backendError', 'internalError',
+}
+# Error reasons that will not clear up until the daily quota resets
+QUOTA_REASONS = { 'quotaExceeded', 'dailyLimitExceeded' }
+# Statuses worth retrying regardless of the reason
+_RETRYABLE_STATUSES = { 429, 500, 502, 503, 504 }
+# Default pace of Data API requests, also the largest burst
+REQUESTS_PER_SECOND = 20
+#======================== Helper ========================#
+
+
+def status(error):
+    """ Gets the HTTP status of a urllib or googleapiclient error, None for other errors. """
+    if hasattr(error, 'resp'):
+        # googleapiclient.errors.HttpError
+        return int(error.resp.status)
+    return getattr(error, 'code', None)
+
+
+def _body(error):
+    """ Gets the body of an HTTP error, reading a urllib error only once. """
+    if hasattr(error, 'content'): return error.content
+
+    if not hasattr(error, 'ytlink_body'):
+        try:
+            error.ytlink_body = error.read()
+        except Exception:
+            error.ytlink_body = b''
+    return error.ytlink_body
+
+
+def reason(error):
+    """ Gets the reason Google gives for an HTTP error, i.e. quotaExceeded. None if there is none. """
+    if status(error) is None: return None
+
+    try:
+        errors = json.loads(_body(error))['error']['errors']
+        return errors[0]['reason']
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
+
+
+def is_quota_error(error):
+    return reason(error) in QUOTA_REASONS
+
+
+def is_retryable(error):
+    """ Whether the request that raised the error should be tried again. """
+    code = status(error)
+    if code is None:
+        # Dropped and timed out connections
+        return isinstance(error, (ConnectionError, TimeoutError))
+
+    if is_quota_error(error): return False
+    return code in _RETRYABLE_STATUSES or reason(error) in RETRYABLE_REASONS
+
+
+def _retry_after(error):
+    """ Gets the seconds the server asked to wait before retrying, if any. """
+    headers = getattr(error, 'headers', None) or getattr(error, 'resp', None)
+    try:
+        return float(headers.get('Retry-After') or headers.get('retry-after'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+#======================== Objects ========================#
+
+
+class TokenBucket:
+    """ Thread-safe token bucket pacing requests to a steady rate with bursts.
+
+        Attributes:
+            rate: the tokens added per second
+            capacity: the most tokens that can be saved up for a burst
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """ Takes a token and returns the seconds to wait before it can be used. """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            # Going negative queues later callers behind this one
+            self._tokens -= 1
+            return 0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0: time.sleep(delay)
+
+
+class RetryPolicy:
+    """ Jittered exponential backoff shared by a family of requests.
+
+        Attributes:
+            max_retries: the number of retries before giving up
+            base: the backoff in seconds of the first retry
+            cap: the longest backoff in seconds
+            bucket: the TokenBucket pacing each attempt, None for no pacing
+    """
+    def __init__(self, max_retries=5, base=1, cap=32, bucket=None):
+        self.max_retries = max_retries
+        self.base = base
+        self.cap = cap
+        self.bucket = bucket
+
+    def backoff(self, attempt, error=None):
+        """ Gets the seconds to wait before a retry with full jitter, honoring Retry-After. """
+        delay = random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+        retry_after = _retry_after(error) if error is not None else None
+        return max(delay, retry_after or 0)
+
+    def call(self, function, *args, **kwargs):
+        """ Calls the function, retrying it while it raises retryable errors. The last error is raised once retries run out. """
+        for attempt in range(self.max_retries + 1):
+            if self.bucket is not None: self.bucket.acquire()
+
+            try:
+                return function(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e): raise
+                time.sleep(self.backoff(attempt, e))
+
+    async def acall(self, function, *args, **kwargs):
+        """ Awaits the coroutine function like RetryPolicy.call, waiting without blocking the event loop. """
+        # Only loaded by coroutines, asyncio is slow to import
+        import asyncio
+
+        for attempt in range(self.max_retries + 1):
+            if self.bucket is not None:
+                delay = self.bucket.reserve()
+                if delay > 0: await asyncio.sleep(delay)
+
+            try:
+                return await function(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e): raise
+                await asyncio.sleep(self.backoff(attempt, e))
+
+
+# Policy for requests outside the Data API, i.e. public feeds and the WebSub hub
+policy = RetryPolicy()
+# Policy shared by every Data API request made through the package
+api_policy = RetryPolicy(
+    bucket=TokenBucket(rate=REQUESTS_PER_SECOND, capacity=REQUESTS_PER_SECOND)
+)
+
+
+def pace(rate):
+    """ Sets the requests per second Data API requests are paced to, None or 0 to stop pacing them. """
+    api_policy.bucket = TokenBucket(rate=rate, capacity=rate) if rate else None
+
+
+def call(endpoint, function, calls=1):
+    """ Calls the function under the Data API policy. Every attempt is charged against the quota, since Google counts failed requests too, and recorded in ytlink.metrics.
+
+        Args:
+            endpoint (str): the endpoint the function requests, i.e. playlistItems.list.
+
+            function (function): makes the request, returning its response.
+
+        Kwargs:
+            calls (int): the number of API calls in the request.
+
+        Returns:
+            the function's return.
+
+    """
+    attempts = itertools.count()
+
+    def attempt():
+        ytlink.quota.ledger.charge(endpoint, calls)
+        with ytlink.metrics.recorder.span(endpoint, calls, next(attempts)) as span:
+            response = function()
+            span.bytes = getattr(response, 'size', 0)
+            return response
+
+    return api_policy.call(attempt)
+
+
+async def acall(endpoint, function, calls=1):
+    """ Coroutine version of ytlink.retry.call, function returns an awaitable. The ledger is charged in a worker thread since it may write to disk. """
+    # Only loaded by coroutines, asyncio is slow to import
+    import asyncio
+
+    attempts = itertools.count()
+
+    async def attempt():
+        await asyncio.to_thread(ytlink.quota.ledger.charge, endpoint, calls)
+        with ytlink.metrics.recorder.span(endpoint, calls, next(attempts)) as span:
+            response = await function()
+            span.bytes = getattr(response, 'size', 0)
+            return response
+
+    return await api_policy.acall(attempt)
+
+
+def execute(request, endpoint, calls=1):
+    """ Executes a googleapiclient request under the Data API policy. See ytlink.retry.call. """
+    return call(endpoint, request.execute, calls)
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""Schedules when each channel is checked for new uploads from its upload history.
+
+A channel's uploads are treated as arriving at a steady rate, the number of
+its recent uploads over the time from the oldest of them until now, so a
+channel that goes quiet is checked less and less on its own. The rate is
+weighted by the hour of the day (UTC) the channel usually uploads at. A
+channel is checked again once a quarter of an upload is expected since its
+last check, bounded by a minimum and maximum interval, and every interval is
+stretched alike when the checks planned per day exceed the budget.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import os
+import json
+import heapq
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+#======================== Fields ========================#
+# Number of newest uploads the rate and hours are learned from
+HISTORY = 50
+# Expected uploads since the last check that make a channel due
+THRESHOLD = 0.25
+MIN_INTERVAL = timedelta(minutes=30)
+MAX_INTERVAL = timedelta(days=7)
+# Interval for channels without any saved uploads
+_UNKNOWN_INTERVAL = timedelta(hours=6)
+# Resolution of the expected uploads over the day
+_STEP = timedelta(minutes=15)
+_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+#======================== Helper ========================#
+
+
+def utcnow():
+    """ Gets the current time as a naive UTC datetime, like the dates of videos. """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+#======================== Objects ========================#
+
+
+class UploadModel:
+    """ Expected uploads of a channel over time, learned from its past uploads.
+
+        Attributes:
+            rate: the uploads expected per hour on average
+            weights: how much more likely than average an upload is in each hour of the day, averaging 1
+    """
+    __slots__ = ('rate', 'weights')
+
+    def __init__(self, dates, now=None):
+        """ Learns the model.
+
+            Args:
+                dates (list): the datetimes of the channel's newest uploads in UTC.
+
+            Kwargs:
+                now (datetime.datetime): the current time in UTC.
+
+        """
+        if now is None: now = utcnow()
+
+        self.rate = None
+        if dates:
+            # Never less than an hour, so a burst of uploads doesn't explode the rate
+            hours = max(1, (now - min(dates)).total_seconds() / 3600)
+            self.rate = len(dates) / hours
+
+        # One upload spread over every hour smooths out hours never seen
+        counts = [1] * 24
+        for date in dates: counts[date.hour] += 1
+        self.weights = [ 24 * count / sum(counts) for count in counts ]
+
+    def interval(self, start, threshold=THRESHOLD, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL):
+        """ Gets the time after start when the expected uploads since start reach the threshold, within bounds. """
+        if self.rate is None: return max(min_interval, min(_UNKNOWN_INTERVAL, max_interval))
+
+        expected = 0
+        step_hours = _STEP.total_seconds() / 3600
+        elapsed = timedelta(0)
+        while elapsed < max_interval:
+            expected += self.rate * self.weights[(start + elapsed).hour] * step_hours
+            elapsed += _STEP
+            if expected >= threshold: break
+
+        return max(min_interval, min(elapsed, max_interval))
+
+
+class Scheduler:
+    """ Priority queue of the next check of each channel. The time of each channel's last check is saved with Scheduler.save.
+
+        Attributes:
+            fname: the path to the JSON file holding the last checks, None to keep them in memory
+            checks_per_day: the most checks to plan per day, None for no limit
+            threshold: the expected uploads since the last check that make a channel due
+            min_interval: the shortest time between checks of a channel
+            max_interval: the longest time between checks of a channel
+    """
+    def __init__(
+            self, fname=None, checks_per_day=None, threshold=THRESHOLD,
+            min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL
+        ):
+        self.fname = Path(fname) if fname is not None else None
+        self.checks_per_day = checks_per_day
+        self.threshold = threshold
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+        self._last_checked = {}
+        if self.fname is not None and self.fname.exists():
+            with open(self.fname, 'r') as f:
+                self._last_checked = {
+                    channelID: datetime.strptime(date, _DATE_FORMAT)
+                    for channelID, date in json.load(f).items()
+                }
+
+        # Unstretched interval of each channel
+        self._intervals = {}
+        # Next check of each channel, heap entries that disagree are stale
+        self._next = {}
+        self._heap = []
+
+    def __len__(self):
+        return len(self._next)
+
+    def __contains__(self, channelID):
+        """ Whether the channel has a check scheduled. """
+        return channelID in self._next
+
+    @property
+    def planned(self):
+        """ Gets the checks a day the unstretched intervals add up to. """
+        return sum(
+            timedelta(days=1) / interval for interval in self._intervals.values()
+        )
+
+    @property
+    def stretch(self):
+        """ Gets the factor every interval is multiplied by to fit the checks planned per day in the budget. """
+        if not self.checks_per_day: return 1
+        return max(1, self.planned / self.checks_per_day)
+
+    def schedule(self, channelID, dates, now=None):
+        """ Plans the next check of a channel from its upload history.
+
+            Args:
+                channelID (str): the channel's ID.
+
+                dates (list): the datetimes of the channel's newest uploads in UTC.
+
+            Kwargs:
+                now (datetime.datetime): the current time in UTC.
+
+            Returns:
+                (datetime.datetime): the time the channel is due.
+
+        """
+        if now is None: now = utcnow()
+
+        last_checked = self._last_checked.get(channelID)
+        start = last_checked or now
+        self._intervals[channelID] = UploadModel(dates, now=now).interval(
+            start, self.threshold, self.min_interval, self.max_interval
+        )
+        # Channels never checked are due right away
+        due = (
+            start + self._intervals[channelID] * self.stretch
+            if last_checked is not None else now
+        )
+
+        self._next[channelID] = due
+        heapq.heappush(self._heap, (due, channelID))
+        return due
+
+    def postpone(self, channelID, until):
+        """ Checks a channel no earlier than a time, i.e. after a failed check, keeping its last check. """
+        self._next[channelID] = until
+        heapq.heappush(self._heap, (until, channelID))
+
+    def remove(self, channelID):
+        """ Stops checking a channel. """
+        self._next.pop(channelID, None)
+        self._intervals.pop(channelID, None)
+
+    def _clean(self):
+        """ Drops stale entries from the top of the heap. """
+        while self._heap and self._next.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def next_due(self):
+        """ Gets the time the next channel is due, None if no channel is scheduled. """
+        self._clean()
+        return self._heap[0][0] if self._heap else None
+
+    def due(self, now=None, limit=None):
+        """ Takes the channels due by now, earliest first. They are not scheduled again until Scheduler.schedule.
+
+            Kwargs:
+                now (datetime.datetime): the current time in UTC.
+
+                limit (int): the most channels to take.
+
+            Returns:
+                (list): the IDs of the channels due.
+
+        """
+        if now is None: now = utcnow()
+
+        channelIDs = []
+        while limit is None or len(channelIDs) < limit:
+            self._clean()
+            if not self._heap or self._heap[0][0] > now: break
+
+            _, channelID = heapq.heappop(self._heap)
+            del self._next[channelID]
+            channelIDs.append(channelID)
+
+        return channelIDs
+
+    def checked(self, channelIDs, now=None):
+        """ Records when channels were checked. """
+        if now is None: now = utcnow()
+        for channelID in channelIDs: self._last_checked[channelID] = now
+
+    def save(self):
+        """ Atomically writes the last checks. """
+        if self.fname is None: return
+
+        tmp_fname = self.fname.with_suffix('.tmp')
+        with open(tmp_fname, 'w') as f:
+            json.dump({
+                channelID: date.strftime(_DATE_FORMAT)
+                for channelID, date in self._last_checked.items()
+            }, f)
+        os.replace(tmp_fname, self.fname)
@@ -1,20 +1,19 @@
 #!/usr/bin/env python3
 """Holds console configuration for printing to terminal by customizing Rich.
 
+Rich is only imported, and its tracebacks installed, the first time the
+console is used, so importing ytlink stays fast for code that never prints.
+
 **Author: Jonathan Delgado**
 
 """
 #======================== Rich ========================#
-#------------- Imports -------------#
-import rich.theme, rich.progress, rich.console
-# Improved tracebacks
-import rich.traceback; rich.traceback.install()
 #------------- Settings -------------#
 # Store colors as variables for use with library objects
 cblue = '#0675BB'
 cgreen = 'green'
-# Custom theme
-theme = rich.theme.Theme({
+# Custom theme styles
+_STYLES = {
     # Syntax highlighting for numbers, light mint
     "repr.number": "#9DFBCC",
     #--- Colors ---#
@@ -27,12 +26,31 @@ theme = rich.theme.Theme({
     # Amaranth red
     'warning': '#E03E52',
     'fail': '#E03E52'
-})
+}
+
+
+class _LazyConsole:
+    """ Stands in for the rich Console, creating it on first use. """
+    _console = None
+
+    def _load(self):
+        if _LazyConsole._console is None:
+            import rich.theme, rich.console
+            # Improved tracebacks
+            import rich.traceback; rich.traceback.install()
+            _LazyConsole._console = rich.console.Console(
+                theme=rich.theme.Theme(_STYLES)
+            )
+        return _LazyConsole._console
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
 
-console = rich.console.Console(theme=theme)
+console = _LazyConsole()
 # Override the print and input functionality
-print = console.print
-input = console.input
+def print(*args, **kwargs): return console.print(*args, **kwargs)
+def input(*args, **kwargs): return console.input(*args, **kwargs)
 # Provide a rich status function for indeterminate progress
 rstatus = lambda text: console.status(
     text, spinner='dots', spinner_style=cblue
@@ -40,11 +58,12 @@ rstatus = lambda text: console.status(
 #--- Progress bar ---#
 def Progress(label='Progress'):
     """ Overload constructor for generating progress bars. """
+    import rich.progress
     return rich.progress.Progress(
         rich.progress.SpinnerColumn('dots', style=cblue),
         rich.progress.TextColumn(f'{label}:', style=cblue),
         rich.progress.BarColumn(complete_style=cgreen, finished_style=cblue),
         rich.progress.MofNCompleteColumn(),
-        console=console
+        console=console._load()
     )
-#======================== End Rich ========================#
\ No newline at end of file
+#======================== End Rich ========================#
@@ -0,0 +1,837 @@
+#!/usr/bin/env python3
+"""Local stand-in for the YouTube Data API serving synthetic channels.
+
+Implements the endpoints ytlink uses under /youtube/v3: channels, playlists
+(list and insert), playlistItems (list and insert), videos, search and
+subscriptions, along with the batch endpoint and a discovery document so
+the Google API client can be built against it. Channel Atom feeds are
+served from /feeds/videos.xml. Responses are trimmed to the fields
+parameter like Google's partial responses. Feeds and list pages carry
+ETags and answer 304 Not Modified to a matching If-None-Match. A WebSub
+hub at /hub pushes feeds to subscribers with FakeHub.publish. Point ytlink
+at the server with:
+
+    YTLINK_API_URL=http://127.0.0.1:8080/youtube/v3
+    YTLINK_FEED_URL=http://127.0.0.1:8080/feeds/videos.xml?channel_id={channelID}
+    YTLINK_HUB_URL=http://127.0.0.1:8080/hub
+
+or, in process, with FakeServer.configure.
+
+Every HTTP request and quota unit is counted, and the counts are served as
+JSON from /stats. Run from the repository root:
+
+    python -m ytlink.tools.fake_api --channels 100 --latency 0.05
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import re
+import json
+import gzip
+import time
+import email
+import hmac
+import random
+import hashlib
+import argparse
+import threading
+import http.server
+import urllib.parse
+import urllib.request
+from xml.sax.saxutils import escape
+from datetime import datetime, timedelta, timezone
+#--- Custom imports ---#
+import ytlink.quota
+#======================== Fields ========================#
+_SERVICE_PATH = 'youtube/v3/'
+_BATCH_PATH = 'batch/youtube/v3'
+_BATCH_BOUNDARY = 'batch_ytlink_fake_api'
+# Channel that owns the playlists made through the API
+_MY_CHANNEL = ('UCytlinkfakeapiuser00000', 'YTLink Fake User')
+# (status, reason) of the errors injected at random
+_INJECTED_ERRORS = [
+    (403, 'rateLimitExceeded'), (429, 'rateLimitExceeded'),
+    (503, 'backendError'),
+]
+_DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+# Uploads listed in a channel's Atom feed
+_FEED_LENGTH = 15
+# (name, width) of the thumbnails in a snippet
+_THUMBNAILS = [
+    ('default', 120), ('medium', 320), ('high', 480),
+    ('standard', 640), ('maxres', 1280),
+]
+#======================== Helper ========================#
+
+
+def _error(status, reason, message=None):
+    """ Gets the (status, body) of an error response in Google's format. """
+    message = message or reason
+    return status, {
+        'error': {
+            'code': status, 'message': message,
+            'errors': [ { 'reason': reason, 'message': message } ]
+        }
+    }
+
+
+def _page(items, params, page_size):
+    """ Gets the response with the page of items requested through maxResults and pageToken. """
+    start = int(params.get('pageToken', 0))
+    size = min(int(params.get('maxResults', 5)), page_size)
+
+    response = { 'items': items[start:start + size], 'pageInfo': { 'totalResults': len(items) } }
+    if start + size < len(items): response['nextPageToken'] = str(start + size)
+    # Pages change their ETag whenever their content does
+    response['etag'] = hashlib.sha1(
+        json.dumps(response, sort_keys=True).encode()
+    ).hexdigest()
+    return response
+
+
+def _parse_fields(fields, start=0):
+    """ Parses a partial response mask, i.e. nextPageToken,items(id,snippet/title), from the start index.
+
+        Returns:
+            (tuple): the selection as nested dicts keyed by field, None selecting the whole field, and the index the selection ended at.
+
+    """
+    selection = {}
+    i = start
+    while i < len(fields) and fields[i] != ')':
+        j = i
+        while j < len(fields) and fields[j] not in ',()': j += 1
+        *parents, name = fields[i:j].split('/')
+
+        subselection = None
+        if j < len(fields) and fields[j] == '(':
+            subselection, j = _parse_fields(fields, j + 1)
+            # Skip the closing parenthesis
+            j += 1
+
+        node = selection
+        for parent in parents:
+            node = node.setdefault(parent, {})
+            # The parent was already selected whole
+            if node is None: break
+        else:
+            node[name] = subselection
+
+        i = j + 1 if j < len(fields) and fields[j] == ',' else j
+
+    return selection, i
+
+
+def _project(value, selection):
+    """ Trims a decoded response to the selection of _parse_fields. """
+    if selection is None: return value
+    if isinstance(value, list): return [ _project(item, selection) for item in value ]
+    if not isinstance(value, dict): return value
+    return {
+        key: _project(value[key], subselection)
+        for key, subselection in selection.items() if key in value
+    }
+
+
+def _method(path, http_method, parameters, request=None):
+    """ Gets the discovery description of an API method. """
+    description = {
+        'id': f'youtube.{path}', 'path': path, 'httpMethod': http_method,
+        'parameters': {
+            name: { 'type': kind, 'location': 'query' }
+            for name, kind in parameters.items()
+        },
+        'response': { '$ref': 'Response' },
+    }
+    if request is not None: description['request'] = { '$ref': request }
+    return description
+
+
+def discovery_document(root_url):
+    """ Gets a discovery document describing the methods ytlink calls through the Google API client.
+
+        Args:
+            root_url (str): the url of the server, ending with a slash.
+
+        Returns:
+            (dict): the discovery document.
+
+    """
+    list_parameters = {
+        'part': 'string', 'id': 'string', 'mine': 'boolean',
+        'maxResults': 'integer', 'pageToken': 'string',
+        'playlistId': 'string', 'videoId': 'string',
+    }
+
+    def methods(resource, insert=True):
+        resource_methods = { 'list': _method(resource, 'GET', list_parameters) }
+        if insert:
+            resource_methods['insert'] = _method(
+                resource, 'POST', { 'part': 'string' }, request='Resource'
+            )
+        return { 'methods': resource_methods }
+
+    return {
+        'kind': 'discovery#restDescription',
+        'discoveryVersion': 'v1',
+        'id': 'youtube:v3', 'name': 'youtube', 'version': 'v3',
+        'rootUrl': root_url,
+        'servicePath': _SERVICE_PATH,
+        'batchPath': _BATCH_PATH,
+        'parameters': {
+            'key': { 'type': 'string', 'location': 'query' },
+            'alt': { 'type': 'string', 'location': 'query', 'default': 'json' },
+            'fields': { 'type': 'string', 'location': 'query' },
+        },
+        'schemas': {
+            'Resource': { 'id': 'Resource', 'type': 'object' },
+            'Response': { 'id': 'Response', 'type': 'object' },
+        },
+        'resources': {
+            'subscriptions': methods('subscriptions', insert=False),
+            'playlists': methods('playlists'),
+            'playlistItems': methods('playlistItems'),
+        },
+    }
+
+
+#======================== Objects ========================#
+
+
+class FakeYouTube:
+    """ Synthetic YouTube served by FakeServer. Channel uploads are computed on request so channels of any size cost no memory, playlists made through the API are kept in memory.
+
+        Attributes:
+            num_channels: the number of channels, all of which are subscribed to
+            num_videos: the number of uploads of each channel
+            page_size: the most results returned in a page regardless of maxResults
+            latency: the seconds each HTTP request takes
+            error_rate: the chance an API call fails with a throttling or server error
+            quota_limit: the quota units served before every call fails with quotaExceeded, None for no limit
+            upload_interval: the hours between uploads of a channel
+    """
+    def __init__(
+            self, num_channels=100, num_videos=200, page_size=50, latency=0,
+            error_rate=0, quota_limit=None, upload_interval=24, seed=0
+        ):
+        self.num_channels = num_channels
+        self.num_videos = num_videos
+        self.page_size = page_size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.quota_limit = quota_limit
+        self.upload_interval = upload_interval
+
+        # Newest upload of the first channel, later channels are staggered
+        self._newest = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        # Playlists made or written to through the API: ID -> (title, video IDs)
+        self._playlists = {}
+        # (status, reason) of the errors the next calls fail with
+        self._failures = []
+        self.hub = FakeHub(self)
+        self.reset_stats()
+
+    #------------- Statistics -------------#
+
+    def reset_stats(self):
+        with self._lock:
+            self._requests = 0
+            self._calls = {}
+            self._units = 0
+
+    def stats(self):
+        """ Gets the number of HTTP requests, calls per endpoint and quota units served. """
+        with self._lock:
+            return {
+                'requests': self._requests, 'calls': dict(self._calls),
+                'units': self._units,
+            }
+
+    def _count_request(self):
+        with self._lock: self._requests += 1
+
+    def _charge(self, endpoint):
+        """ Counts an API call and decides whether it fails. Returns an error response or None. """
+        with self._lock:
+            self._calls[endpoint] = self._calls.get(endpoint, 0) + 1
+            if self.quota_limit is not None and self._units >= self.quota_limit:
+                return _error(403, 'quotaExceeded', 'The request cannot be completed because you have exceeded your quota.')
+
+            self._units += ytlink.quota.cost(endpoint)
+            if self._failures: return _error(*self._failures.pop(0))
+            if self._random.random() < self.error_rate:
+                return _error(*self._random.choice(_INJECTED_ERRORS))
+
+        return None
+
+    def fail_next(self, status, reason, times=1):
+        """ Fails the next API calls with an error, i.e. one of _INJECTED_ERRORS, regardless of the error rate. """
+        with self._lock: self._failures += [ (status, reason) ] * times
+
+    #------------- Synthetic data -------------#
+
+    @staticmethod
+    def channel_ID(i): return f'UC{i:022d}'
+
+    @staticmethod
+    def channel_name(i): return f'Channel {i}'
+
+    @staticmethod
+    def channel_handle(i): return f'@channel{i}'
+
+    @staticmethod
+    def video_ID(channel, i): return f'v{channel:05d}x{i:05d}'
+
+    def _channel_index(self, ID):
+        """ Gets the index of a synthetic channel from its channel or uploads playlist ID, None if there is none. """
+        if len(ID) != 24 or ID[:2] not in ('UC', 'UU') or not ID[2:].isdigit():
+            return None
+
+        i = int(ID[2:])
+        return i if i < self.num_channels else None
+
+    def _video_index(self, ID):
+        """ Gets the (channel, upload) of a synthetic video ID, uploads are numbered newest first. None if there is none. """
+        try:
+            channel, i = int(ID[1:6]), int(ID[7:])
+        except ValueError:
+            return None
+
+        if ID[0] != 'v' or ID[6] != 'x': return None
+        if channel >= self.num_channels or i >= self.num_videos: return None
+        return channel, i
+
+    def _video_snippet(self, channel, i):
+        # Each channel uploads at a different hour
+        date = self._newest - timedelta(
+            hours=channel % self.upload_interval + i * self.upload_interval
+        )
+        number = self.num_videos - i
+        return {
+            'publishedAt': date.strftime(_DATE_FORMAT),
+            'channelId': self.channel_ID(channel),
+            'channelTitle': self.channel_name(channel),
+            'title': f'{self.channel_name(channel)} video {number}',
+            'description': f'Upload number {number} of {self.channel_name(channel)}.',
+            # Thumbnails take up most of a real snippet
+            'thumbnails': {
+                size: {
+                    'url': f'https://i.ytimg.com/vi/{self.video_ID(channel, i)}/{size}.jpg',
+                    'width': width, 'height': width * 9 // 16,
+                }
+                for size, width in _THUMBNAILS
+            },
+        }
+
+    def _channel_resource(self, i):
+        ID = self.channel_ID(i)
+        return {
+            'kind': 'youtube#channel', 'id': ID,
+            'snippet': {
+                'title': self.channel_name(i), 'customUrl': self.channel_handle(i)
+            },
+            'contentDetails': { 'relatedPlaylists': { 'uploads': f'UU{ID[2:]}' } },
+        }
+
+    def _playlist_item(self, playlistID, videoID, position):
+        channel, i = self._video_index(videoID)
+        snippet = self._video_snippet(channel, i)
+        snippet.update({
+            'playlistId': playlistID, 'position': position,
+            'resourceId': { 'kind': 'youtube#video', 'videoId': videoID },
+            'videoOwnerChannelId': snippet['channelId'],
+        })
+        return {
+            'kind': 'youtube#playlistItem', 'id': f'{playlistID}.{videoID}',
+            'snippet': snippet
+        }
+
+    #------------- Endpoints -------------#
+
+    def _channels_list(self, params):
+        if 'forHandle' in params or 'forUsername' in params:
+            name = params.get('forHandle', params.get('forUsername', '')).lstrip('@').lower()
+            i = int(name[len('channel'):]) if re.fullmatch(r'channel\d+', name) else None
+            # Like the real API, a lookup without a match has no items
+            if i is None or i >= self.num_channels: return 200, {}
+            return 200, { 'items': [ self._channel_resource(i) ] }
+
+        IDs = params.get('id', '').split(',')
+        indices = [ self._channel_index(ID) for ID in IDs ]
+        return 200, { 'items': [
+            self._channel_resource(i) for i in indices if i is not None
+        ] }
+
+    def _playlists_list(self, params):
+        items = []
+        for ID in params.get('id', '').split(','):
+            i = self._channel_index(ID)
+            if ID.startswith('UU') and i is not None:
+                title, channelID, channel_title, count = (
+                    f'Uploads from {self.channel_name(i)}', self.channel_ID(i),
+                    self.channel_name(i), self.num_videos
+                )
+            elif ID in self._playlists:
+                title, videos = self._playlists[ID]
+                channelID, channel_title = _MY_CHANNEL
+                count = len(videos)
+            else:
+                continue
+
+            items.append({
+                'kind': 'youtube#playlist', 'id': ID,
+                'snippet': {
+                    'title': title, 'channelId': channelID,
+                    'channelTitle': channel_title
+                },
+                'contentDetails': { 'itemCount': count },
+            })
+
+        return 200, { 'items': items }
+
+    def _playlists_insert(self, params, body):
+        with self._lock:
+            ID = f'PLfake{len(self._playlists):028d}'
+            self._playlists[ID] = (body['snippet']['title'], [])
+
+        return 200, { 'kind': 'youtube#playlist', 'id': ID, 'snippet': body['snippet'] }
+
+    def _playlist_items_list(self, params):
+        ID = params.get('playlistId', '')
+        i = self._channel_index(ID)
+        if ID.startswith('UU') and i is not None:
+            start = int(params.get('pageToken', 0))
+            size = min(int(params.get('maxResults', 5)), self.page_size)
+            stop = min(start + size, self.num_videos)
+
+            response = { 'items': [
+                self._playlist_item(ID, self.video_ID(i, j), j)
+                for j in range(start, stop)
+            ], 'pageInfo': { 'totalResults': self.num_videos } }
+            if stop < self.num_videos: response['nextPageToken'] = str(stop)
+            return 200, response
+
+        if ID not in self._playlists: return _error(404, 'playlistNotFound')
+
+        with self._lock: videos = list(self._playlists[ID][1])
+        items = [ self._playlist_item(ID, video, j) for j, video in enumerate(videos) ]
+        if 'videoId' in params:
+            # Lookup of a video's items in the playlist
+            items = [
+                item for item in items
+                if item['snippet']['resourceId']['videoId'] == params['videoId']
+            ]
+        return 200, _page(items, params, self.page_size)
+
+    def _playlist_items_insert(self, params, body):
+        snippet = body['snippet']
+        videoID = snippet['resourceId']['videoId']
+        if self._video_index(videoID) is None: return _error(404, 'videoNotFound')
+
+        playlistID = snippet['playlistId']
+        with self._lock:
+            # Playlists from settings are made on their first insert
+            _, videos = self._playlists.setdefault(playlistID, ('Playlist', []))
+            position = snippet.get('position', len(videos))
+            if position > len(videos): return _error(400, 'invalidPlaylistItemPosition')
+            videos.insert(position, videoID)
+
+        return 200, self._playlist_item(playlistID, videoID, position)
+
+    def _videos_list(self, params):
+        items = []
+        for ID in params.get('id', '').split(','):
+            index = self._video_index(ID)
+            if index is None: continue
+            items.append({
+                'kind': 'youtube#video', 'id': ID,
+                'snippet': self._video_snippet(*index)
+            })
+
+        return 200, { 'items': items }
+
+    def _search_list(self, params):
+        query = params.get('q', '').lower()
+        items = []
+        for i in range(self.num_channels):
+            if query not in self.channel_name(i).lower(): continue
+
+            items.append({
+                'kind': 'youtube#searchResult',
+                'id': { 'kind': 'youtube#channel', 'channelId': self.channel_ID(i) },
+                'snippet': {
+                    'channelId': self.channel_ID(i),
+                    'title': self.channel_name(i),
+                    'channelTitle': self.channel_name(i),
+                },
+            })
+            if len(items) >= self.page_size: break
+
+        return 200, { 'items': items }
+
+    def _subscriptions_list(self, params):
+        return 200, _page([
+            {
+                'kind': 'youtube#subscription',
+                'snippet': {
+                    'title': self.channel_name(i),
+                    'resourceId': {
+                        'kind': 'youtube#channel', 'channelId': self.channel_ID(i)
+                    },
+                },
+                'contentDetails': { 'totalItemCount': self.num_videos },
+            }
+            for i in range(self.num_channels)
+        ], params, self.page_size)
+
+    def feed(self, channelID, length=_FEED_LENGTH):
+        """ Gets the (ETag, Atom feed) of a channel's latest uploads, None if there is no such channel. """
+        i = self._channel_index(channelID or '')
+        if i is None or not channelID.startswith('UC'): return None
+
+        self._charge('feeds')
+        entries = []
+        for j in range(min(length, self.num_videos)):
+            snippet = self._video_snippet(i, j)
+            published = snippet['publishedAt'].replace('Z', '+00:00')
+            entries.append(
+                '<entry>'
+                f'<id>yt:video:{self.video_ID(i, j)}</id>'
+                f'<yt:videoId>{self.video_ID(i, j)}</yt:videoId>'
+                f'<yt:channelId>{channelID}</yt:channelId>'
+                f'<title>{escape(snippet["title"])}</title>'
+                f'<published>{published}</published>'
+                f'<updated>{published}</updated>'
+                '<media:group>'
+                f'<media:title>{escape(snippet["title"])}</media:title>'
+                f'<media:description>{escape(snippet["description"])}</media:description>'
+                '</media:group>'
+                '</entry>'
+            )
+
+        feed = (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" '
+            'xmlns:media="http://search.yahoo.com/mrss/" '
+            'xmlns="http://www.w3.org/2005/Atom">'
+            f'<title>{escape(self.channel_name(i))}</title>'
+            f'{"".join(entries)}</feed>'
+        ).encode()
+        # Uploads only change when the server is restarted
+        return f'"{i}-{self._newest:%Y%m%d%H%M%S}"', feed
+
+    def call(self, method, api, params, body=None):
+        """ Answers an API call.
+
+            Args:
+                method (str): the HTTP method.
+
+                api (str): the API called, i.e. playlistItems.
+
+                params (dict): the query parameters.
+
+            Kwargs:
+                body (dict): the decoded request body.
+
+            Returns:
+                (tuple): the status and decoded body of the response.
+
+        """
+        handlers = {
+            ('GET', 'channels'): self._channels_list,
+            ('GET', 'playlists'): self._playlists_list,
+            ('GET', 'playlistItems'): self._playlist_items_list,
+            ('GET', 'videos'): self._videos_list,
+            ('GET', 'search'): self._search_list,
+            ('GET', 'subscriptions'): self._subscriptions_list,
+            ('POST', 'playlists'): self._playlists_insert,
+            ('POST', 'playlistItems'): self._playlist_items_insert,
+        }
+        if (method, api) not in handlers: return _error(404, 'notFound')
+
+        error = self._charge(f'{api}.{"list" if method == "GET" else "insert"}')
+        if error is not None: return error
+
+        if method == 'GET':
+            status, response = handlers[method, api](params)
+        else:
+            status, response = handlers[method, api](params, body)
+
+        if status == 200 and params.get('fields'):
+            response = _project(response, _parse_fields(params['fields'])[0])
+        return status, response
+
+
+class FakeHub:
+    """ WebSub hub pushing the fake channels' feeds. Unlike the real hub, subscriptions are verified before the hub answers.
+
+        Attributes:
+            api: the FakeYouTube whose channels are published
+            max_lease_seconds: the longest lease granted, None to grant the lease asked for
+    """
+    def __init__(self, api, max_lease_seconds=None):
+        self.api = api
+        self.max_lease_seconds = max_lease_seconds
+        self._lock = threading.Lock()
+        # (callback, secret) of each verified subscription keyed by channel ID
+        self._subscribers = {}
+
+    def subscribers(self, channelID):
+        with self._lock: return list(self._subscribers.get(channelID, {}).items())
+
+    def subscribe(self, form):
+        """ Verifies a (un)subscription request with the callback. Returns the (status, body) to answer with. """
+        mode, topic, callback = (
+            form.get('hub.mode'), form.get('hub.topic'), form.get('hub.callback')
+        )
+        channelID = dict(urllib.parse.parse_qsl(
+            urllib.parse.urlsplit(topic or '').query
+        )).get('channel_id')
+        if mode not in ('subscribe', 'unsubscribe') or not callback or channelID is None:
+            return 400, b'Bad subscription request.'
+
+        challenge = f'{self.api._random.getrandbits(64):x}'
+        lease_seconds = int(form.get('hub.lease_seconds', 0))
+        if self.max_lease_seconds is not None:
+            lease_seconds = min(lease_seconds, self.max_lease_seconds)
+        query = urllib.parse.urlencode({
+            'hub.mode': mode, 'hub.topic': topic, 'hub.challenge': challenge,
+            'hub.lease_seconds': lease_seconds,
+        })
+        try:
+            with urllib.request.urlopen(f'{callback}?{query}', timeout=10) as response:
+                verified = response.read().decode() == challenge
+        except OSError:
+            verified = False
+        if not verified: return 409, b'Callback did not echo the challenge.'
+
+        with self._lock:
+            callbacks = self._subscribers.setdefault(channelID, {})
+            if mode == 'subscribe':
+                callbacks[callback] = form.get('hub.secret')
+            else:
+                callbacks.pop(callback, None)
+
+        return 202, b''
+
+    def publish(self, channelID, length=1):
+        """ Pushes the channel's feed with its newest uploads to every subscriber. Returns the number of notifications delivered. """
+        feed = self.api.feed(channelID, length=length)
+        if feed is None: return 0
+
+        _, body = feed
+        delivered = 0
+        for callback, secret in self.subscribers(channelID):
+            headers = { 'Content-Type': 'application/atom+xml' }
+            if secret is not None:
+                headers['X-Hub-Signature'] = 'sha1=' + hmac.new(
+                    secret.encode(), body, hashlib.sha1
+                ).hexdigest()
+
+            request = urllib.request.Request(callback, data=body, headers=headers)
+            try:
+                with urllib.request.urlopen(request, timeout=10): delivered += 1
+            except OSError:
+                pass
+
+        return delivered
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Small responses would otherwise wait on delayed acknowledgements
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args): pass
+
+    def _send(
+            self, status, body, content_type='application/json; charset=UTF-8',
+            headers=None
+        ):
+        if isinstance(body, dict): body = json.dumps(body).encode()
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        for name, value in (headers or {}).items(): self.send_header(name, value)
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return self.rfile.read(length) if length else b''
+
+    def _route(self, method):
+        api = self.server.api
+        parts = urllib.parse.urlsplit(self.path)
+        params = dict(urllib.parse.parse_qsl(parts.query))
+        body = self._read_body()
+
+        if parts.path == '/stats': return self._send(200, api.stats())
+
+        api._count_request()
+        if api.latency: time.sleep(api.latency)
+
+        if parts.path == '/feeds/videos.xml': return self._feed(params)
+        if parts.path == '/hub' and method == 'POST':
+            status, response = api.hub.subscribe(
+                dict(urllib.parse.parse_qsl(body.decode()))
+            )
+            return self._send(status, response, content_type='text/plain')
+        if parts.path == f'/{_SERVICE_PATH}$discovery/rest':
+            return self._send(200, discovery_document(self.server.root_url))
+        if parts.path == f'/{_BATCH_PATH}' and method == 'POST':
+            return self._batch(body)
+        if not parts.path.startswith(f'/{_SERVICE_PATH}'):
+            return self._send(*_error(404, 'notFound'))
+
+        api_name = parts.path[len(_SERVICE_PATH) + 1:]
+        status, response = self.server.api.call(
+            method, api_name, params, json.loads(body) if body else None
+        )
+        etag = response.get('etag') if status == 200 else None
+        if etag is not None and self.headers.get('If-None-Match') == etag:
+            return self._not_modified(etag)
+        self._send(status, response)
+
+    def _not_modified(self, etag):
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.end_headers()
+
+    def _feed(self, params):
+        feed = self.server.api.feed(params.get('channel_id'))
+        if feed is None: return self._send(404, b'', content_type='text/html')
+
+        etag, body = feed
+        if self.headers.get('If-None-Match') == etag: return self._not_modified(etag)
+
+        self._send(200, body, content_type='application/atom+xml; charset=UTF-8', headers={ 'ETag': etag })
+
+    def _batch(self, body):
+        """ Answers a multipart/mixed batch of API calls. """
+        message = email.message_from_bytes(
+            f'Content-Type: {self.headers["Content-Type"]}\r\n\r\n'.encode() + body
+        )
+
+        parts = []
+        for part in message.get_payload():
+            # The Google API client serializes requests with bare newlines
+            request = part.get_payload().replace('\r\n', '\n')
+            head, _, request_body = request.partition('\n\n')
+            method, target, _ = head.split('\n', 1)[0].split(' ', 2)
+            target = urllib.parse.urlsplit(target)
+
+            status, response = self.server.api.call(
+                method, target.path[len(_SERVICE_PATH) + 1:],
+                dict(urllib.parse.parse_qsl(target.query)),
+                json.loads(request_body) if request_body.strip() else None
+            )
+            # Content-ID's are answered as <response-ID>
+            content_ID = part['Content-ID'].strip('<>')
+            parts.append(
+                f'--{_BATCH_BOUNDARY}\r\n'
+                'Content-Type: application/http\r\n'
+                f'Content-ID: <response-{content_ID}>\r\n\r\n'
+                f'HTTP/1.1 {status} {http.HTTPStatus(status).phrase}\r\n'
+                'Content-Type: application/json; charset=UTF-8\r\n\r\n'
+                f'{json.dumps(response)}\r\n'
+            )
+
+        self._send(
+            200, (''.join(parts) + f'--{_BATCH_BOUNDARY}--\r\n').encode(),
+            content_type=f'multipart/mixed; boundary={_BATCH_BOUNDARY}'
+        )
+
+    def do_GET(self): self._route('GET')
+
+    def do_POST(self): self._route('POST')
+
+
+class FakeServer(http.server.ThreadingHTTPServer):
+    """ HTTP server for a FakeYouTube.
+
+        Attributes:
+            api: the FakeYouTube answering the calls
+    """
+    daemon_threads = True
+
+    def __init__(self, api, host='127.0.0.1', port=0):
+        self.api = api
+        super().__init__((host, port), _Handler)
+        self._thread = None
+
+    @property
+    def root_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    @property
+    def url(self):
+        """ Gets the API url to set as YTLINK_API_URL. """
+        return f'{self.root_url}{_SERVICE_PATH.rstrip("/")}'
+
+    @property
+    def feed_url(self):
+        """ Gets the feed url template to set as YTLINK_FEED_URL. """
+        return f'{self.root_url}feeds/videos.xml?channel_id={{channelID}}'
+
+    @property
+    def hub_url(self):
+        """ Gets the hub url to set as YTLINK_HUB_URL. """
+        return f'{self.root_url}hub'
+
+    def configure(self):
+        """ Points ytlink at this server, see ytlink.configure. """
+        import ytlink
+        ytlink.configure(api_url=self.url, feed_url=self.feed_url, hub_url=self.hub_url)
+
+    def start(self):
+        """ Serves in a background thread. """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+#======================== Entry ========================#
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the YouTube Data API.')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--channels', type=int, default=100, help='number of subscribed channels')
+    parser.add_argument('--videos', type=int, default=200, help='uploads per channel')
+    parser.add_argument('--page-size', type=int, default=50, help='most results per page')
+    parser.add_argument('--latency', type=float, default=0, help='seconds per request')
+    parser.add_argument('--error-rate', type=float, default=0, help='chance a call fails')
+    parser.add_argument('--quota', type=int, default=None, help='units served before quotaExceeded')
+    args = parser.parse_args()
+
+    api = FakeYouTube(
+        num_channels=args.channels, num_videos=args.videos,
+        page_size=args.page_size, latency=args.latency,
+        error_rate=args.error_rate, quota_limit=args.quota
+    )
+    server = FakeServer(api, port=args.port)
+    print(f'Serving {args.channels} channels at {server.url}, stats at {server.root_url}stats')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(json.dumps(api.stats(), indent=4))
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""Receives WebSub (PubSubHubbub) notifications of new uploads and queues them for playlists.
+
+YouTube's hub pushes a channel's Atom feed to a callback url whenever the
+channel uploads, so new videos arrive without spending any quota on
+polling. Notifications are deduplicated and queued in the catalog, which
+makes the queue survive restarts, and a single worker adds everything
+queued in batches. Subscriptions are renewed before the lease the hub
+granted runs out. The hub can be pointed elsewhere, i.e. at the fake hub
+of ytlink.tools.fake_api, through YTLINK_HUB_URL or ytlink.configure.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+import hmac
+import time
+import hashlib
+import threading
+import http.client
+import urllib.parse
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+#--- Custom imports ---#
+from ytlink.tools.console import *
+import ytlink
+import ytlink.retry
+import ytlink.feeds
+import ytlink.metrics
+import ytlink.connection
+import ytlink.workqueue
+#======================== Fields ========================#
+_TOPIC_URL = 'https://www.youtube.com/xml/feeds/videos.xml?channel_id={channelID}'
+# Seconds a subscription is asked to last, the hub may grant less
+LEASE_SECONDS = 10 * 24 * 60 * 60
+# Share of the granted lease after which a subscription is renewed
+RENEW_SHARE = 0.8
+# Seconds to wait for the hub to verify a subscription before asking again
+_VERIFY_WAIT = 60 * 60
+# Seconds to let a burst of notifications collect before adding them
+_BATCH_DELAY = 2
+# Seconds to wait after a failed or unaffordable round of inserts
+_RETRY_DELAY = 15 * 60
+# Video IDs remembered to drop repeated notifications without the catalog
+_SEEN_SIZE = 10000
+#======================== Helper ========================#
+
+
+def topic_url(channel):
+    return _TOPIC_URL.format(channelID=channel.ID)
+
+
+def channelID_from_topic(topic):
+    """ Gets the channel ID of a topic url, None if it isn't a channel's feed. """
+    query = urllib.parse.parse_qs(urllib.parse.urlsplit(topic or '').query)
+    return query.get('channel_id', [None])[0]
+
+
+def signature(secret, body):
+    """ Gets the X-Hub-Signature the hub sends with a notification body. """
+    return 'sha1=' + hmac.new(secret.encode(), body, hashlib.sha1).hexdigest()
+
+
+def subscribe(channel, callback, hub=None, mode='subscribe', lease_seconds=LEASE_SECONDS, secret=None):
+    """ Asks the hub to push the channel's uploads to the callback. The hub confirms by requesting the callback with a challenge.
+
+        Args:
+            channel (ytlink.Channel): the channel to subscribe to.
+
+            callback (str): the public url of the receiver.
+
+        Kwargs:
+            hub (str): the url of the hub, ytlink.service_url('hub') by default.
+
+            mode (str): subscribe or unsubscribe.
+
+            lease_seconds (int): the seconds the subscription should last.
+
+            secret (str): the key the hub signs notifications with.
+
+        Raises:
+            urllib.error.HTTPError: the hub rejected the request.
+
+    """
+    form = {
+        'hub.callback': callback, 'hub.mode': mode,
+        'hub.topic': topic_url(channel), 'hub.verify': 'async',
+        'hub.lease_seconds': lease_seconds,
+    }
+    if secret is not None: form['hub.secret'] = secret
+    if hub is None: hub = ytlink.service_url('hub')
+
+    # Hubs aren't part of the Data API and cost no quota
+    with ytlink.metrics.recorder.span('websub') as span:
+        response = ytlink.retry.policy.call(
+            ytlink.connection.session.request, 'POST', hub,
+            headers={ 'Content-Type': 'application/x-www-form-urlencoded' },
+            body=urllib.parse.urlencode(form).encode()
+        )
+        span.bytes = response.size
+
+
+def subscribe_all(channels, callback, hub=None, secret=None, max_workers=1, mode='subscribe'):
+    """ Subscribes to, or unsubscribes from, every channel concurrently. Returns the channels that failed. """
+    from concurrent.futures import ThreadPoolExecutor
+
+    def attempt(channel):
+        try:
+            subscribe(channel, callback, hub=hub, mode=mode, secret=secret)
+            return None
+        except (OSError, http.client.HTTPException) as e:
+            print(f'[warning]Requesting to {mode} to {channel.link} failed:[/] {e}')
+            return channel
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        return [ channel for channel in executor.map(attempt, channels) if channel is not None ]
+
+
+#======================== Objects ========================#
+
+
+class Receiver:
+    """ Verifies subscriptions and queues the uploads pushed by the hub. Thread-safe, notifications arrive on many threads at once. Keeps when each subscription is due for renewal from the lease the hub grants.
+
+        Attributes:
+            catalog: the ytlink.catalog.Catalog holding the queue
+            route: function giving the ytlink.Playlist a video goes to, or None to skip the video
+            channels: the subscribed ytlink.Channel's keyed by ID
+            secret: the key notifications must be signed with, None to accept any
+            max_age: notifications of videos older than this are edits of old videos and ignored
+            ordered: whether videos are added one insert at a time to keep playlists in date order, False for batches in any order
+    """
+    def __init__(
+            self, catalog, route, channels, secret=None, max_age=timedelta(days=1),
+            ordered=True
+        ):
+        self.catalog = catalog
+        self.route = route
+        self.channels = { channel.ID: channel for channel in channels }
+        self.secret = secret
+        self.max_age = max_age
+        self.ordered = ordered
+
+        self._lock = threading.Lock()
+        self._seen = OrderedDict()
+        # Set whenever videos are queued, cleared by the worker
+        self._queued = threading.Event()
+        # Names of the playlists routed to, for printing
+        self._playlists = {}
+        # time.monotonic() when each channel's subscription is next requested,
+            # channels missing are due right away
+        self._due = {}
+
+    #------------- Hub requests -------------#
+
+    def verify(self, params):
+        """ Gets the challenge to echo for a subscription the hub is verifying, None to refuse it.
+
+            Args:
+                params (dict): the query parameters of the hub's request.
+
+        """
+        mode = params.get('hub.mode')
+        channelID = channelID_from_topic(params.get('hub.topic'))
+        # Only channels still subscribed to are kept
+        if mode == 'subscribe' and channelID not in self.channels: return None
+        if mode not in ('subscribe', 'unsubscribe'): return None
+
+        if mode == 'subscribe':
+            # The hub may grant a shorter lease than asked for
+            try:
+                lease_seconds = int(params.get('hub.lease_seconds') or LEASE_SECONDS)
+            except ValueError:
+                lease_seconds = LEASE_SECONDS
+            with self._lock:
+                self._due[channelID] = time.monotonic() + lease_seconds * RENEW_SHARE
+
+        return params.get('hub.challenge')
+
+    #------------- Subscriptions -------------#
+
+    def requested(self, channels):
+        """ Records that subscriptions to channels were requested, they are requested again if the hub doesn't verify them in time. """
+        due = time.monotonic() + _VERIFY_WAIT
+        with self._lock:
+            for channel in channels: self._due[channel.ID] = due
+
+    def renewals(self):
+        """ Gets the subscribed channels due for a subscription request: new channels, those the hub never verified and those past RENEW_SHARE of their lease. """
+        now = time.monotonic()
+        with self._lock:
+            return [
+                channel for channelID, channel in self.channels.items()
+                if self._due.get(channelID, 0) <= now
+            ]
+
+    def next_renewal(self):
+        """ Gets the seconds until the next subscription request is due, 0 if one is due already and None without any channel. """
+        now = time.monotonic()
+        with self._lock:
+            due = min(
+                ( self._due.get(channelID, 0) for channelID in self.channels ),
+                default=None
+            )
+        return None if due is None else max(0, due - now)
+
+    def update_channels(self, channels, route=None):
+        """ Replaces the subscribed channels, i.e. once the subscription list changed, and the route if given. New channels are due for a subscription request right away.
+
+            Returns:
+                (tuple): the lists of ytlink.Channel's added and removed.
+
+        """
+        channels = { channel.ID: channel for channel in channels }
+        with self._lock:
+            added = [ channel for ID, channel in channels.items() if ID not in self.channels ]
+            removed = [ channel for ID, channel in self.channels.items() if ID not in channels ]
+            for channel in removed: self._due.pop(channel.ID, None)
+            self.channels = channels
+            if route is not None: self.route = route
+
+        return added, removed
+
+    def _is_new(self, video):
+        """ Remembers the video, returning whether it wasn't seen before. Requires the lock. """
+        if video.ID in self._seen:
+            self._seen.move_to_end(video.ID)
+            return False
+
+        self._seen[video.ID] = None
+        if len(self._seen) > _SEEN_SIZE: self._seen.popitem(last=False)
+        return True
+
+    def notify(self, body, signature_header=None):
+        """ Queues the uploads in a notification. Notifications with a bad signature, unknown channels, old videos and repeats are dropped.
+
+            Args:
+                body (bytes): the Atom feed the hub pushed.
+
+            Kwargs:
+                signature_header (str): the X-Hub-Signature header.
+
+            Returns:
+                (list): the ytlink.Video's queued.
+
+        """
+        if self.secret is not None and not hmac.compare_digest(
+            signature(self.secret, body), signature_header or ''
+        ):
+            print('[warning]Dropped a notification with a bad signature.')
+            return []
+
+        try:
+            videos = ytlink.feeds.parse_feed(body)
+        except ET.ParseError:
+            print('[warning]Dropped a malformed notification.')
+            return []
+
+        # Upload dates are in UTC
+        oldest = datetime.now(timezone.utc).replace(tzinfo=None) - self.max_age
+        routed = {}
+        with self._lock:
+            for video in videos:
+                channel = self.channels.get(video._channelID)
+                # Deleted entries carry no video and edits of old videos
+                    # are pushed too
+                if channel is None or video.date < oldest: continue
+                if not self._is_new(video): continue
+
+                video._channel = channel
+                playlist = self.route(video)
+                if playlist is None: continue
+
+                self._playlists[playlist.ID] = playlist
+                routed.setdefault(playlist.ID, (playlist, []))[1].append(video)
+
+        if not routed: return []
+
+        queued = [ video for _, videos in routed.values() for video in videos ]
+        self.catalog.add_videos(queued)
+        # Videos already queued or added by another run stay as they were
+        for playlist, videos in routed.values():
+            self.catalog.queue_videos(playlist, videos)
+
+        for video in queued:
+            print(
+                f'Queued [emph]{video.link}[/] from {video.channel.link}; '
+                f'published on {video.date}...'
+            )
+        self._queued.set()
+        return queued
+
+    def server(self, host='', port=8080):
+        """ Gets an HTTP server answering the hub with this receiver. Serve it with serve_forever. """
+        server = _Server((host, port), _Handler)
+        server.receiver = self
+        return server
+
+    #------------- Playlist inserts -------------#
+
+    def add_queued(self, youtube):
+        """ Adds every queued video the remaining quota allows. Returns whether the whole queue was added. """
+        def acknowledge(playlist, batch, results):
+            for video, error in zip(batch, results):
+                if error is None:
+                    print(f'Added [emph]{video.link}[/] to {playlist.link}; published on {video.date}...')
+
+        return ytlink.workqueue.add_queued(
+            youtube, self.catalog, playlists=dict(self._playlists),
+            channels=self.channels, callback=acknowledge, ordered=self.ordered
+        )
+
+    def run_inserts(self, youtube, stop):
+        """ Adds queued videos until stop is set. Bursts of notifications are collected into a single round of batched inserts.
+
+            Args:
+                youtube: the YouTube object from init_youtube.
+
+                stop (threading.Event): set to end the worker.
+
+        """
+        # Anything queued by an earlier run is added first
+        self._queued.set()
+        while not stop.is_set():
+            if not self._queued.wait(timeout=1): continue
+            # Let the rest of the burst arrive
+            if stop.wait(_BATCH_DELAY): break
+            self._queued.clear()
+
+            try:
+                done = self.add_queued(youtube)
+            except (Exception, SystemExit) as e:
+                # Requests that fail are reported and exit through
+                    # ytlink.error.parse, the receiver keeps running either way
+                print(f'[fail]Adding queued videos failed:[/] {type(e).__name__}: {e}')
+                done = False
+
+            if not done:
+                # Try again later even if nothing else arrives
+                if stop.wait(_RETRY_DELAY): break
+                self._queued.set()
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Bursts of notifications open many connections at once
+    request_queue_size = 128
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """ Answers the hub's verification requests and notifications. """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b''):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        params = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(self.path).query))
+        challenge = self.server.receiver.verify(params)
+        if challenge is None: return self._send(404)
+        self._send(200, challenge.encode())
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        # Inserts happen on the worker so the hub is answered right away.
+            # Dropped notifications are acknowledged too or the hub resends them
+        self.server.receiver.notify(body, self.headers.get('X-Hub-Signature'))
+        self._send(204)
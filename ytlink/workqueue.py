@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Adds the videos queued in the catalog to their playlists.
+
+Videos are queued in the catalog's playlist_items table with their target
+playlist, so a queue left by a failed or interrupted run is picked up by the
+next one. They are sent one insert at a time to keep each playlist in date
+order, or in batches of 50 when the order doesn't matter. Each video is
+marked as sending before its insert goes out, then as added, or as failed
+when the API rejects it for good, as soon as the insert is acknowledged. Videos an interrupted run left sending are looked up in
+their playlist before being sent again, so none is added twice.
+
+**Author: Jonathan Delgado**
+
+"""
+#------------- Imports -------------#
+#--- Custom imports ---#
+from ytlink.tools.console import *
+import ytlink
+import ytlink.quota
+import ytlink.retry
+#======================== Helper ========================#
+
+
+def is_rejected(error):
+    """ Whether an insert failed for good, i.e. the video was deleted or made private. """
+    return (
+        ytlink.retry.status(error) is not None
+        and not ytlink.retry.is_retryable(error)
+        and not ytlink.retry.is_quota_error(error)
+    )
+
+
+def resolve_sending(youtube, catalog, playlistIDs=None):
+    """ Settles the inserts an interrupted run sent but never saw acknowledged. Videos found in their playlist are marked as added, the rest go back in the queue. Each lookup costs one unit.
+
+        Returns:
+            (bool): whether every unacknowledged insert was settled. False if the quota ran short.
+
+    """
+    sending = catalog.sending_videos(playlistIDs)
+    num_videos = sum(len(videos) for videos in sending.values())
+    if not num_videos: return True
+
+    if ytlink.quota.ledger.affordable('playlistItems.list') < num_videos:
+        print('[warning]Not enough quota to check the inserts of the last run.')
+        return False
+
+    for playlistID, videos in sending.items():
+        playlist = ytlink.Playlist(playlistID, playlistID)
+        added = [
+            video for video in videos
+            if ytlink.playlist_contains(youtube, playlist, video)
+        ]
+        added_IDs = { video.ID for video in added }
+        catalog.mark_added(playlist, added)
+        catalog.requeue_videos(playlist, [
+            video for video in videos if video.ID not in added_IDs
+        ])
+
+    print(f'Checked [emph]{num_videos}[/] inserts left unacknowledged by the last run.')
+    return True
+
+
+#======================== Entry ========================#
+
+
+def add_queued(
+        youtube, catalog, playlists=None, channels=None, callback=None,
+        playlistIDs=None, ordered=True
+    ):
+    """ Adds every queued video the remaining quota allows, oldest first within each playlist.
+
+        Args:
+            youtube: the YouTube object from init_youtube.
+
+            catalog (ytlink.catalog.Catalog): the catalog holding the queue.
+
+        Kwargs:
+            playlists (dict): ytlink.Playlist's keyed by ID, to print playlists by name.
+
+            channels (dict): ytlink.Channel's keyed by ID, to give videos their channel without a lookup.
+
+            callback (function): called as callback(playlist, batch, results) once each insert is acknowledged, after the catalog is updated.
+
+            playlistIDs (set): only add to these playlists, i.e. those of one account, None for every playlist.
+
+            ordered (bool): whether the videos should appear in each playlist in date order. One insert is sent per request, False sends batches of 50 inserts that land in any order.
+
+        Returns:
+            (bool): whether the whole queue was added. False if the quota ran short or an insert can be retried later.
+
+    """
+    if not resolve_sending(youtube, catalog, playlistIDs): return False
+    queued = catalog.queued_videos(playlistIDs)
+    if not queued: return True
+
+    playlists = playlists or {}
+    channels = channels or {}
+    ledger = ytlink.quota.ledger
+    # Taken from the shared budget up front, so accounts adding at the same
+        # time can't count on the same units. The inserts are charged to it
+    max_inserts = ledger.reserve(
+        'playlistItems.insert', sum(len(videos) for videos in queued.values())
+    )
+
+    def acknowledge(playlist, batch, results):
+        added = [ video for video, error in zip(batch, results) if error is None ]
+        failed = [
+            video for video, error in zip(batch, results) if is_rejected(error)
+        ]
+        # Throttled and quota failures are sent again later
+        retried = [
+            video for video, error in zip(batch, results)
+            if error is not None and not is_rejected(error)
+        ]
+        catalog.mark_added(playlist, added)
+        if failed: catalog.mark_failed(playlist, failed)
+        if retried: catalog.requeue_videos(playlist, retried)
+
+        for video in failed:
+            print(f'[fail]Could not add[/] {video.link} to {playlist.link}, dropping it.')
+        if callback is not None: callback(playlist, batch, results)
+
+    done = True
+    try:
+        for playlistID, videos in queued.items():
+            playlist = playlists.get(playlistID) or ytlink.Playlist(playlistID, playlistID)
+            if len(videos) > max_inserts:
+                print(
+                    f'[warning]Remaining quota only allows adding {max_inserts} '
+                    f'of {len(videos)} videos[/] to {playlist.link}...'
+                )
+                videos = videos[:max_inserts]
+                done = False
+            if not videos: continue
+
+            for video in videos:
+                if video._channelID in channels:
+                    video._channel = channels[video._channelID]
+
+            results = ytlink.add_videos_to_playlist(
+                youtube, playlist, videos, ordered=ordered,
+                callback=lambda batch, results: acknowledge(playlist, batch, results),
+                on_send=lambda batch: catalog.mark_sending(playlist, batch)
+            )
+            max_inserts -= len(results)
+
+            errors = [ error for error in results if error is not None ]
+            if any(ytlink.retry.is_quota_error(error) for error in errors):
+                ledger.exhaust()
+                print('[warning]Quota exceeded[/], the queue waits for more quota.')
+                return False
+            # Retryable failures and the videos never sent stay queued
+            if any(not is_rejected(error) for error in errors) or len(results) < len(videos):
+                done = False
+    finally:
+        # Units of the inserts never sent go back to the budget
+        ledger.release()
+
+    return done
@@ -7,40 +7,149 @@
 #------------- Imports -------------#
 import sys
 import json
+import tempfile
+import time
+import threading
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from abc import ABC, abstractmethod
 from datetime import datetime
 #--- Google necessary imports ---#
 import os
-import google_auth_oauthlib.flow, googleapiclient.discovery
-import urllib.request
+import urllib.error
 #--- Custom imports ---#
 from ytlink.tools.console import *
 import ytlink.error
+import ytlink.connection
+import ytlink.retry
+import ytlink.metrics
 #======================== Fields ========================#
+# Maximum number of results or IDs the API accepts per request
+_MAX_RESULTS = 50
+# Partial responses: each call site only requests the fields it reads
+# Snippet fields read by Video.from_snippet
+_VIDEO_FIELDS = 'publishedAt,channelId,title,description'
+_PLAYLIST_ITEMS_FIELDS = f'nextPageToken,items/snippet({_VIDEO_FIELDS},resourceId)'
+_VIDEOS_FIELDS = f'items(id,snippet({_VIDEO_FIELDS}))'
+_PLAYLIST_CHANNEL_FIELDS = 'items/snippet(channelId,channelTitle)'
+_UPLOADS_FIELDS = 'items/contentDetails/relatedPlaylists/uploads'
+_CHANNEL_FIELDS = 'items(id,snippet/title,contentDetails/relatedPlaylists/uploads)'
+_SUBSCRIPTIONS_FIELDS = 'etag,nextPageToken,items/snippet(title,resourceId/channelId)'
+_SEARCH_FIELDS = 'items(id,snippet(channelId,title,channelTitle))'
+# Only the ID of inserted resources is read
+_INSERT_FIELDS = 'id'
+
+
+# Access to read and write the account's playlists
+_SCOPES = ['https://www.googleapis.com/auth/youtube']
+# YouTube clients built once per process by init_youtube, keyed by config folder
+_youtubes = {}
+_youtubes_lock = threading.Lock()
+# API keys loaded by api_key, keyed by file
+_api_keys = {}
+# Workers fetching the next page of every playlist being read, threads are
+    # only started once pages are prefetched. Readers fetch a page themselves
+    # when its prefetch hasn't started, so busy workers never hold them up
+_prefetcher = ThreadPoolExecutor(max_workers=10, thread_name_prefix='ytlink-prefetch')
+
+
+def _token_fname(config_dir=None):
+    return Path(config_dir or ytlink.CONFIG_DIR) / 'token.json'
+
+
+def _save_credentials(credentials, config_dir=None):
+    """ Atomically saves the OAuth credentials, readable only by the user. """
+    fname = _token_fname(config_dir)
+    fname.parent.mkdir(parents=True, exist_ok=True)
+    tmp_fname = fname.with_suffix('.tmp')
+    fd = os.open(tmp_fname, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f: f.write(credentials.to_json())
+    os.replace(tmp_fname, fname)
+
+
+def _load_credentials(config_dir=None):
+    """ Loads the saved OAuth credentials, renewing them with the refresh token once expired. Returns None if there are none or they can no longer be renewed. """
+    fname = _token_fname(config_dir)
+    if not fname.exists(): return None
+
+    import google.oauth2.credentials, google.auth.exceptions
+    import google.auth.transport.requests
+
+    credentials = google.oauth2.credentials.Credentials.from_authorized_user_file(
+        str(fname), _SCOPES
+    )
+    if credentials.valid: return credentials
+    if not credentials.refresh_token: return None
 
+    try:
+        credentials.refresh(google.auth.transport.requests.Request())
+    except google.auth.exceptions.RefreshError:
+        # Revoked or expired refresh token, the user has to log in again
+        print('[warning]Saved credentials could not be renewed[/], logging in again...')
+        return None
+
+    _save_credentials(credentials, config_dir)
+    return credentials
+
+
+def _login(config_dir=None):
+    """ Runs the interactive OAuth flow and saves the credentials for later runs. """
+    import google_auth_oauthlib.flow
 
-def init_youtube():
-    print('Initializing YouTube object...')
     # Make a new screen for providing the authentication credentials
     with console.screen():
         # Disable OAuthlib's HTTPS verification when running locally.
         # *DO NOT* leave this option enabled in production.
         os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
 
-        client_secrets_fname = Path(__file__).parent / 'config/client_secrets.json'
+        client_secrets_fname = Path(config_dir or ytlink.CONFIG_DIR) / 'client_secrets.json'
         # Get credentials and create an API client
         app_flow = google_auth_oauthlib.flow.InstalledAppFlow
         credentials = app_flow.from_client_secrets_file(
-            client_secrets_fname,
-            'https://www.googleapis.com/auth/youtube'
+            client_secrets_fname, _SCOPES
         ).run_console()
+
+    _save_credentials(credentials, config_dir)
+    return credentials
+
+
+def init_youtube(config_dir=None):
+    """ Gets the OAuth YouTube client, built once per process for each account. Credentials are saved to token.json in the config folder after the first login and renewed from then on, and the discovery document bundled with the Google client is used instead of fetching it.
+
+        Kwargs:
+            config_dir (pathlib.Path): the folder with the account's token.json and client_secrets.json, the package's config folder by default.
+
+        Returns:
+            (googleapiclient.discovery.Resource): the YouTube client.
+
+    """
+    # A client is bound to the API it was built for
+    key = (str(config_dir or ytlink.CONFIG_DIR), ytlink.service_url('api'))
+    with _youtubes_lock:
+        if key in _youtubes: return _youtubes[key]
+
+    # The Google client stack is slow to import, only load it for OAuth
+    import googleapiclient.discovery
+
+    print('Initializing YouTube object...')
+    if ytlink.is_stand_in('api'):
+        # Stand-ins for the API such as ytlink.tools.fake_api take the API key
+            # instead of OAuth and serve their own discovery document
+        youtube = googleapiclient.discovery.build(
+            'youtube', 'v3', developerKey=api_key(),
+            discoveryServiceUrl=f'{ytlink.service_url("api")}/$discovery/rest',
+            static_discovery=False, cache_discovery=False
+        )
+        print(f'Using the API at {ytlink.service_url("api")}.\n')
+    else:
+        credentials = _load_credentials(config_dir) or _login(config_dir)
         youtube = googleapiclient.discovery.build(
-            'youtube', 'v3', credentials=credentials
+            'youtube', 'v3', credentials=credentials,
+            static_discovery=True, cache_discovery=False
         )
+        print('Successfully initialized YouTube object.\n')
 
-    print('Successfully initialized YouTube object.\n')
-    return youtube
+    with _youtubes_lock: return _youtubes.setdefault(key, youtube)
 
 
 #======================== Objects ========================#
@@ -53,12 +162,17 @@ class YTObj(ABC):
             name: the name of the video/playlist/channel
             ID: the name of the video/playlist/channel
     """
+    # No instance dicts, channels can carry tens of thousands of videos
+    __slots__ = ('name', 'ID')
+
     def __init__(self, name, ID):
         self.name = name
         self.ID = ID
 
-        # Get the rich markup for a hyperlink to this object's url.
-        self.link = f'[link={self.url}]{self.name}[/]'
+    @property
+    def link(self):
+        """ Gets the rich markup for a hyperlink to this object's url. """
+        return f'[link={self.url}]{self.name}[/]'
 
     def dict(self):
         """ Converts self to dict for saving as JSON. """
@@ -76,18 +190,20 @@ class YTObj(ABC):
 
 
 class Video(YTObj):
+    __slots__ = ('_date', '_channelID', 'description', '_channel')
+
     def __init__(self, name, ID, date, channelID, description=None):
         super().__init__(name, ID)
-        if 'T' in date:
-            # Use the YouTube formatting parser
-            self.date = datetime.strptime(date, '%Y-%m-%dT%H:%M:%SZ')
-        else:
-            # Use the datetime formatting parser
-            self.date = datetime.strptime(date, '%Y-%m-%d %H:%M:%S')
-
+        # The date string is parsed on first access
+        self._date = date
         self._channelID = channelID
         self.description = description
 
+    @property
+    def date(self):
+        if isinstance(self._date, str): self._date = parse_date(self._date)
+        return self._date
+
     @property
     def url(self):
         return f'https://www.youtube.com/watch?v={self.ID}'
@@ -106,31 +222,91 @@ class Video(YTObj):
 
     @staticmethod
     def ID_from_url(url):
-        return url.split('watch?v=')[-1]
+        # Drop any other parameter, i.e. a timestamp
+        return url.split('watch?v=')[-1].split('&')[0]
+
+    @staticmethod
+    def from_snippet(snippet, ID):
+        """ Generates the Video straight from an API snippet, sharing its strings. """
+        video = Video.__new__(Video)
+        video.name = snippet['title']
+        video.ID = ID
+        video._date = snippet['publishedAt']
+        video._channelID = snippet['channelId']
+        video.description = snippet.get('description')
+        return video
 
     @staticmethod
     def from_ID(ID):
-        info = search('videos', part='snippet', id=ID)['items'][0]['snippet']
-        return Video(
-            name=info['title'], ID=ID,
-            date=info['publishedAt'], description=info['description'],
-            channelID=info['channelId']
+        """ Generates the Video from its ID. Returns None if the video could not be found. """
+        videos = Video.from_IDs([ID])
+        return videos[0] if videos else None
+
+    @staticmethod
+    def from_IDs(IDs):
+        """ Generates Videos from a list of IDs, requesting up to 50 IDs at a time.
+            
+            Args:
+                IDs (list): the video IDs.
+        
+            Returns:
+                (list): list of ytlink.Video's in the order of the IDs provided. IDs of missing or private videos are reported and skipped.
+        
+        """
+        IDs = list(IDs)
+        return Video._from_responses(
+            IDs, [ search(**keys) for keys in Video._IDs_search_keys(IDs) ]
         )
 
+    @staticmethod
+    def _IDs_search_keys(IDs):
+        """ Gets the search keys of the requests for up to 50 of the IDs each. """
+        return [
+            {
+                'api': 'videos', 'part': 'snippet', 'fields': _VIDEOS_FIELDS,
+                'id': ','.join(IDs[i:i + _MAX_RESULTS]),
+                'maxResults': _MAX_RESULTS,
+            }
+            for i in range(0, len(IDs), _MAX_RESULTS)
+        ]
+
+    @staticmethod
+    def _from_responses(IDs, responses):
+        """ Generates the Videos found in the responses to the requests from _IDs_search_keys. """
+        found = {}
+        for response in responses:
+            for item in response['items']:
+                found[item['id']] = Video.from_snippet(item['snippet'], item['id'])
+
+        missing = [ ID for ID in IDs if ID not in found ]
+        if missing:
+            print(
+                f'[warning]No videos found with IDs: {", ".join(missing)}.[/] '
+                'Videos could be private or deleted.'
+            )
+
+        return [ found[ID] for ID in IDs if ID in found ]
+
     @property
     def channel(self):
-        """ Gets the channel that uploaded this video. """
+        """ Gets the channel that uploaded this video. A channel that could not be found, i.e. a deleted one, is named by its ID. """
         try:
             # See if the attribute exists
             return self._channel
         except AttributeError:
             # The channel hasn't been loaded yet
-            self._channel = Channel.from_ID(self._channelID)
+            channel = Channel.from_ID(self._channelID)
+            if channel is None:
+                print(f'No channel found with ID: {self._channelID}. Channel could be deleted.')
+                channel = Channel(name=self._channelID, ID=self._channelID)
+            self._channel = channel
 
         return self.channel
 
 
 class Playlist(YTObj):
+    __slots__ = ('_channel',)
+
     def __init__(self, name, ID):
         super().__init__(name, ID)
 
@@ -139,7 +315,9 @@ class Playlist(YTObj):
 
     @staticmethod
     def from_ID(ID):
-        results = search(api='playlists', part='snippet', id=ID)['items']
+        results = search(
+            api='playlists', part='snippet', fields='items/snippet/title', id=ID
+        )['items']
         if not results:
             # Empty list returned
             print(f'No playlist found with ID: {ID}. Playlist could be private.')
@@ -156,19 +334,26 @@ class Playlist(YTObj):
             return self._channel
         except AttributeError:
             # The channel hasn't been loaded yet
-            snippet = search(
-                api='playlists', part='snippet', id=self.ID
-            )['items'][0]['snippet']
-            name = snippet['channelTitle']
-            channelID = snippet['channelId']
-            playlists = {self.name: self}
-            self._channel = Channel(
-                name=name, ID=channelID, playlists=playlists
-            )
+            self._save_channel(search(**self._channel_search_keys()))
 
         return self.channel
 
-    def videos(self, max_vids=10, after_date=None, chronological=False):
+    def _channel_search_keys(self):
+        return {
+            'api': 'playlists', 'part': 'snippet',
+            'fields': _PLAYLIST_CHANNEL_FIELDS, 'id': self.ID
+        }
+
+    def _save_channel(self, response):
+        """ Saves the channel that created this playlist from a playlists response. """
+        snippet = response['items'][0]['snippet']
+        self._channel = Channel(name=snippet['channelTitle'], ID=snippet['channelId'])
+        self._channel.playlists[self.name] = self
+
+    def videos(
+            self, max_vids=10, after_date=None, until_ID=None,
+            chronological=False
+        ):
         """ Gets the playlist's uploaded videos.
         
             Kwargs:
@@ -176,77 +361,154 @@ class Playlist(YTObj):
 
                 after_date (datetime.datetime): only get the videos after the given date. Ignores the max_vids parameter.
 
+                until_ID (str): only get the videos newer than the video with this ID. Ignores the max_vids parameter.
+
                 chronological (bool): whether to return the videos in chronological order or not.
         
             Returns:
                 (list): list of ytlink.Video's.
         
         """
-        # Ignore max_vids if None is provided or an after_date is provided.
-        if max_vids is None or after_date is not None: max_vids = 9999
+        return list(self.iter_videos(
+            max_vids=max_vids, after_date=after_date, until_ID=until_ID,
+            chronological=chronological
+        ))
+
+    def iter_videos(
+            self, max_vids=10, after_date=None, until_ID=None,
+            chronological=False
+        ):
+        """ Generates the playlist's uploaded videos as each page is parsed. The next page is requested in the background while the caller handles the current one.
         
-        # Don't search for more than 50 results at a time
-        max_results = max_vids if max_vids <= 50 else 50
+            Kwargs:
+                max_vids (int/None): the maximum number of videos to get. None if there should be no maximum (9999).
+
+                after_date (datetime.datetime): only get the videos after the given date. Ignores the max_vids parameter.
+
+                until_ID (str): only get the videos newer than the video with this ID. Ignores the max_vids parameter.
+
+                chronological (bool): whether to generate the videos in chronological order or not. Pages are spilled to a temporary file until the oldest video is reached instead of being held in memory.
+        
+            Yields:
+                (ytlink.Video): the next video.
+        
+        """
+        pages = self._pages(max_vids, after_date, until_ID)
+        if not chronological:
+            for page in pages: yield from page
+            return
+
+        # The pages come newest first, spill them to disk and read them back
+            # from the last page
+        with tempfile.TemporaryFile('w+') as f:
+            spans = [ _spill_page(f, page) for page in pages ]
+            yield from _read_spilled(f, spans, self.channel)
+
+    def _page_requests(self, max_vids, after_date, until_ID):
+        """ Gets the (max_vids, search keys) of the first page request, keys are updated with the page token for each next page. """
+        # Ignore max_vids if None is provided or a stopping point is provided.
+        if max_vids is None or after_date is not None or until_ID is not None:
+            max_vids = 9999
 
-        # To be updated with next_page_token
         search_keys = {
             'api': 'playlistItems',
             'part': 'snippet',
+            'fields': _PLAYLIST_ITEMS_FIELDS,
             'playlistId': self.ID,
             'order': 'date',
-            'maxResults': max_results
+            # Don't search for more than 50 results at a time
+            'maxResults': min(max_vids, _MAX_RESULTS)
         }
+        return max_vids, search_keys
 
-        videos = []
-        # Flag to continue searching through videos
-        cont_search_flag = True
-        while cont_search_flag:
-            # The response will get videos newest first
-            response = search(**search_keys)
-
-            # Run through the page of responses
-            for video_data in response['items']:
-                video_data = video_data['snippet']
-
-                if video_data['resourceId']['kind'] != 'youtube#video':
-                    # This is not a YouTube video
-                    continue
-
-                video = Video(
-                    name=video_data['title'],
-                    ID=video_data['resourceId']['videoId'],
-                    date=video_data['publishedAt'],
-                    channelID=video_data['channelId'],
-                    description=video_data['description'],
-                )
-                # Save time on the channel computation
-                video._channel = self.channel
+    def _parse_page(self, response, max_vids, num_videos, after_date, until_ID):
+        """ Parses a page of playlist items, newest first.
 
-                if after_date is not None and video.date < after_date:
-                    # This video is too old now, break out.
-                    cont_search_flag = False
-                    break
+            Args:
+                response (dict): the decoded playlistItems response.
 
-                videos.append(video)
+                max_vids (int): the maximum number of videos to get overall.
 
-                if len(videos) >= max_vids:
-                    # We have enough videos, break out
-                    cont_search_flag = False
+                num_videos (int): the number of videos found on earlier pages.
 
+                after_date (datetime.datetime): the date to stop at, or None.
 
-            if 'nextPageToken' in response:
-                search_keys['pageToken'] = response['nextPageToken']
-            else:
-                # There are no more pages of videos to parse, break out
-                cont_search_flag = False
-            
+                until_ID (str): the ID of the video to stop at, or None.
 
-        # List of videos will be in reverse chronological order
-        # Reverse it to put it into chronological order
-        return videos[::-1] if chronological else videos
+            Returns:
+                (tuple): the list of ytlink.Video's on the page and whether the next page should be requested.
+
+        """
+        page = []
+        # Run through the page of responses
+        for video_data in response['items']:
+            video_data = video_data['snippet']
+
+            if video_data['resourceId']['kind'] != 'youtube#video':
+                # This is not a YouTube video
+                continue
+
+            video = Video.from_snippet(
+                video_data, video_data['resourceId']['videoId']
+            )
+            # Save time on the channel computation
+            video._channel = self.channel
+
+            if after_date is not None and video.date < after_date:
+                # This video is too old now, break out.
+                return page, False
+
+            if video.ID == until_ID:
+                # This video and everything after it was already seen
+                return page, False
+
+            page.append(video)
+
+            if num_videos + len(page) >= max_vids:
+                # We have enough videos, break out
+                return page, False
+
+        return page, 'nextPageToken' in response
+
+    def _pages(self, max_vids, after_date, until_ID):
+        """ Generates pages of the playlist's videos newest first, prefetching the next page while the current page is handled. """
+        max_vids, search_keys = self._page_requests(max_vids, after_date, until_ID)
+
+        # Number of videos found so far
+        num_videos = 0
+        # The response will get videos newest first, the first page is
+            # needed right away
+        response = search(**search_keys)
+        next_page = None
+        try:
+            while response is not None:
+                page, cont_search_flag = self._parse_page(
+                    response, max_vids, num_videos, after_date, until_ID
+                )
+                num_videos += len(page)
+
+                # Only spend a request on the next page if it will be used
+                if cont_search_flag:
+                    search_keys['pageToken'] = response['nextPageToken']
+                    next_page = _prefetcher.submit(search, **search_keys)
+
+                yield page
+
+                if next_page is None: break
+                # Take the page over if no worker has started on it yet
+                response = (
+                    search(**search_keys) if next_page.cancel() else next_page.result()
+                )
+                next_page = None
+        finally:
+            # Drop an abandoned prefetch that hasn't started, a running one
+                # finishes on its own
+            if next_page is not None: next_page.cancel()
 
 
 class Channel(YTObj):
+    __slots__ = ('playlists',)
+
     def __init__(self, name, ID, playlists=None):
         super().__init__(name, ID)
 
@@ -261,26 +523,60 @@ class Channel(YTObj):
     @property
     def url(self): return f'https://www.youtube.com/channel/{self.ID}'
 
+    @staticmethod
+    def _from_channels_list(**kwargs):
+        """ Generates the Channel found by a channels.list lookup, with its uploads playlist saved from the same call. Returns None if there is no such channel. """
+        response = search(
+            api='channels', part='snippet,contentDetails',
+            fields=_CHANNEL_FIELDS,
+            maxResults=1, **kwargs
+        )
+        # Lookups by handle or username leave out the items when nothing is found
+        items = response.get('items', [])
+        if not items: return None
+
+        channel = Channel(name=items[0]['snippet']['title'], ID=items[0]['id'])
+        channel._save_uploads(response)
+        return channel
+
     @staticmethod
     def from_ID(ID):
-        response = search(api='channels', part='snippet', id=channelID, maxResults=1)
-        info = response['items'][0]['snippet']
-        return Channel(name=info['title'], ID=ID)
+        """ Generates the Channel from its ID. Returns None if the channel could not be found. """
+        return Channel._from_channels_list(id=ID)
+
+    @staticmethod
+    def from_handle(handle):
+        """ Generates the Channel from its @handle, with or without the @. Returns None if the channel could not be found. """
+        return Channel._from_channels_list(forHandle=f'@{handle.lstrip("@")}')
+
+    @staticmethod
+    def from_username(username):
+        """ Generates the Channel from its legacy username, i.e. youtube.com/user/username. Returns None if the channel could not be found. """
+        return Channel._from_channels_list(forUsername=username)
 
     @staticmethod
     def ID_from_videoID(videoID):
         """ Gets the channel ID from the channel that posted a given video. """
-        response = search(api='videos', part='snippet', id=videoID)
+        response = search(
+            api='videos', part='snippet', fields='items/snippet/channelId', id=videoID
+        )
         return response['items'][0]['snippet']['channelId']
 
     @staticmethod
     def from_videoID(ID):
-        """ Generates Channel information from video ID. """
-        return Channel.from_ID(Channel.ID_from_videoID(videoID))
+        """ Generates Channel information from video ID in a single request. Returns None if the video could not be found. """
+        response = search(
+            api='videos', part='snippet',
+            fields='items/snippet(channelId,channelTitle)', id=ID
+        )
+        if not response.get('items'): return None
+
+        snippet = response['items'][0]['snippet']
+        return Channel(name=snippet['channelTitle'], ID=snippet['channelId'])
 
     @staticmethod
     def from_video_url(url):
-        """ Generates Channel information from video URL. """
+        """ Generates Channel information from video URL. Returns None if the video could not be found. """
         return Channel.from_videoID(Video.ID_from_url(url))
 
     @property
@@ -288,15 +584,25 @@ class Channel(YTObj):
         """ Gets the uploads playlist for this channel if not stored. Saves it otherwise. """
         if 'uploads' not in self.playlists:
             # Uploads has never been found before
-            uploadsID = search(
-                api='channels', part='contentDetails',
-                id=self.ID, maxResults=1
-            )['items'][0]['contentDetails']['relatedPlaylists']['uploads']
-
-            self.playlists['uploads'] = Playlist('Uploads', uploadsID)
+            self._save_uploads(search(**self._uploads_search_keys()))
 
         return self.playlists['uploads']
 
+    def _uploads_search_keys(self):
+        return {
+            'api': 'channels', 'part': 'contentDetails',
+            'fields': _UPLOADS_FIELDS, 'id': self.ID, 'maxResults': 1
+        }
+
+    def _save_uploads(self, response):
+        """ Saves the uploads playlist from a channels response. """
+        uploadsID = response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
+
+        uploads = Playlist('Uploads', uploadsID)
+        # The uploads playlist belongs to this channel, skip the lookup
+        uploads._channel = self
+        self.playlists['uploads'] = uploads
+
     def dict(self):
         """ Converts self to JSON for saving. """
         # Convert dictionary of playlists into a dictionary of JSON
@@ -311,7 +617,10 @@ class Channel(YTObj):
             'playlists': playlists_JSON
         }
 
-    def uploads(self, max_vids=10, after_date=None, chronological=False):
+    def uploads(
+            self, max_vids=10, after_date=None, until_ID=None,
+            chronological=False
+        ):
         """ Gets the channel's uploaded videos.
         
             Kwargs:
@@ -319,29 +628,67 @@ class Channel(YTObj):
 
                 after_date (datetime.datetime): only get the videos after the given date. Ignores the max_vids parameter.
 
+                until_ID (str): only get the videos newer than the video with this ID. Ignores the max_vids parameter.
+
                 chronological (bool): whether to return the videos in chronological order or not.
         
             Returns:
                 (list): list of ytlink.Video's.
         
         """
-        return self.uploads_playlist.videos(max_vids=max_vids, after_date=after_date, chronological=chronological)
+        return self.uploads_playlist.videos(
+            max_vids=max_vids, after_date=after_date, until_ID=until_ID,
+            chronological=chronological
+        )
+
+    def iter_uploads(
+            self, max_vids=10, after_date=None, until_ID=None,
+            chronological=False
+        ):
+        """ Generates the channel's uploaded videos as they are pulled. See ytlink.Playlist.iter_videos. """
+        return self.uploads_playlist.iter_videos(
+            max_vids=max_vids, after_date=after_date, until_ID=until_ID,
+            chronological=chronological
+        )
 
 
 #======================== Helper ========================#
 
 
+def parse_date(date):
+    """ Parses YouTube's ISO 8601 dates (2022-11-13T20:27:36Z) and saved dates (2022-11-13 20:27:36) by position. """
+    return datetime(
+        int(date[0:4]), int(date[5:7]), int(date[8:10]),
+        int(date[11:13]), int(date[14:16]), int(date[17:19])
+    )
+
+
+def _spill_page(f, page):
+    """ Writes a page of videos, newest first, to the file oldest first. Returns the (offset, number of videos) to read it back with. """
+    start = f.tell()
+    f.write(''.join( f'{video.json()}\n' for video in reversed(page) ))
+    return start, len(page)
+
+
+def _read_spilled(f, spans, channel):
+    """ Generates the videos of spilled pages in chronological order. """
+    for start, num_videos in reversed(spans):
+        f.seek(start)
+        for _ in range(num_videos):
+            video = Video(**json.loads(f.readline()))
+            # Save time on the channel computation
+            video._channel = channel
+            yield video
+
+
 def api_key():
-    """ Load the API key once. Save it for future usage once loaded. """
-    # Load the key for the first time
-    with open(Path(__file__).parent / 'config/api_key.txt', 'r') as f:
-        key = f.read()
+    """ Load the API key of the config folder once. Save it for future usage once loaded. """
+    fname = ytlink.CONFIG_DIR / 'api_key.txt'
+    if fname not in _api_keys:
+        # Load the key for the first time
+        with open(fname, 'r') as f: _api_keys[fname] = f.read()
 
-    global api_key
-    # Overwrite this loading function with a simple return of the key
-    api_key = lambda : key
-    # Actually provide the key for this first run
-    return key
+    return _api_keys[fname]
 
 
 #======================== Reading ========================#
@@ -357,25 +704,23 @@ def search(api, **kwargs):
             **kwargs: additional search parameters.
     
         Returns:
-            (None): none
+            (dict): the decoded JSON response.
     
     """
-    # Replace spaces in search phrase if applicable
-    if 'q' in kwargs: kwargs['q'] = kwargs['q'].replace(' ', '%20')
-
-    # Base API URL for making HTTP requests
-    url = 'https://www.googleapis.com/youtube/v3'
-    url = f'{url}/{api}?key={api_key()}' + ''.join([
-        f'&{key}={value}'
-        for key, value in kwargs.items()
-    ])
+    params = { 'key': api_key(), **kwargs }
 
     try:
-        response = urllib.request.urlopen(url)
+        # Keep-alive, gzip compressed request through the shared session
+        response = ytlink.retry.call(
+            f'{api}.list',
+            lambda: ytlink.connection.session.get(
+                f'{ytlink.service_url("api")}/{api}', params=params
+            )
+        )
     except urllib.error.HTTPError as e:
-        ytlink.error.parse(e, url=url)
+        ytlink.error.parse(e, url=e.url)
 
-    return json.load(response)
+    return response.json()
 
 
 def keyphrase_search(keyphrase, kind=None):
@@ -385,7 +730,9 @@ def keyphrase_search(keyphrase, kind=None):
             (list): unformatted list of dictionary results
     
     """
-    items = search(api='search', part='snippet', q=keyphrase)['items']
+    items = search(
+        api='search', part='snippet', fields=_SEARCH_FIELDS, q=keyphrase
+    )['items']
 
     if not kind:
         # No filter, just return all results
@@ -403,31 +750,124 @@ def keyphrase_search(keyphrase, kind=None):
 
 #------------- User reading -------------#
 
-def get_subscriptions(youtube):
-    """ Constructs a dictionary of subscriptions related to the user linked to the YouTube object. """
-    subscriptions = []
+class SubscriptionCache:
+    """ Pages of the subscription list with their ETags, saved between runs so unchanged pages aren't downloaded again.
+
+        Attributes:
+            fname: the path to the JSON file holding the pages
+            pages: the cached pages, each a dict of its page token, ETag, next page token and (name, ID) of its channels
+            added: the ytlink.Channel's subscribed to since the cache was last updated, empty when there was no earlier list
+            removed: the IDs of the channels unsubscribed from since the cache was last updated, empty when there was no earlier list
+    """
+    def __init__(self, fname):
+        self.fname = Path(fname)
+        self.pages = []
+        self.added = []
+        self.removed = []
+
+        if self.fname.exists():
+            with open(self.fname, 'r') as f: self.pages = json.load(f)['pages']
+
+    def channels(self):
+        return [
+            Channel(name=name, ID=ID)
+            for page in self.pages for name, ID in page['channels']
+        ]
+
+    def update(self, pages):
+        """ Replaces the cached pages, working out the deltas, and saves them atomically. """
+        # Without an earlier list every subscription would count as new
+        had_pages = bool(self.pages)
+        old = { ID for page in self.pages for _, ID in page['channels'] }
+        self.pages = pages
+        new = self.channels()
+
+        self.added, self.removed = [], []
+        if had_pages:
+            self.added = [ channel for channel in new if channel.ID not in old ]
+            new_IDs = { channel.ID for channel in new }
+            self.removed = sorted(old - new_IDs)
+
+        self.fname.parent.mkdir(parents=True, exist_ok=True)
+        tmp_fname = self.fname.with_suffix('.tmp')
+        with open(tmp_fname, 'w') as f: json.dump({ 'pages': pages }, f)
+        os.replace(tmp_fname, self.fname)
+
+
+def _unless_not_modified(request):
+    """ Executes a conditional googleapiclient request. Returns None if the resource is unchanged. """
+    try:
+        return request.execute()
+    except Exception as e:
+        # googleapiclient raises for a 304 Not Modified
+        if ytlink.retry.status(e) == 304: return None
+        raise
+
+
+def get_subscriptions(youtube, cache=None, refresh=False):
+    """ Gets the channels subscribed to by the user linked to the YouTube object.
+
+        Args:
+            youtube: the YouTube object from init_youtube.
+
+        Kwargs:
+            cache (ytlink.SubscriptionCache): the pages of the last request. Each page is revalidated with its ETag, and the cached list is used as is when the first page is unchanged. Its added and removed deltas are updated.
+
+            refresh (bool): whether to request every page again, ignoring the cached ETags.
+
+        Returns:
+            (list): list of ytlink.Channel's.
+
+    """
+    cached = cache.pages if cache is not None and not refresh else []
+    pages = []
 
     #--- Get the first page of subscriptions ---#
-    kwargs = { 'part': 'snippet,contentDetails', 'mine': True }
+    # Only the snippet is read, the ETag of contentDetails changes with
+        # every upload of a subscription
+    kwargs = {
+        'part': 'snippet', 'fields': _SUBSCRIPTIONS_FIELDS,
+        'mine': True, 'maxResults': _MAX_RESULTS
+    }
 
     while True:
-        response = youtube.subscriptions().list(**kwargs).execute()
-
-        # Save the subscription information
-        for sub in response['items']:
-            snippet = sub['snippet']
-            subscriptions.append(Channel(
-                name=snippet['title'],
-                ID=snippet['resourceId']['channelId']
-            ))
+        request = youtube.subscriptions().list(**kwargs)
+        page = cached[len(pages)] if len(pages) < len(cached) else None
+        # Page tokens can change once the list does
+        if page is not None and page['token'] != kwargs.get('pageToken'): page = None
+        if page is not None: request.headers['If-None-Match'] = page['etag']
+
+        response = ytlink.retry.call(
+            'subscriptions.list', lambda: _unless_not_modified(request)
+        )
+        if response is None and not pages:
+            # The first page is unchanged, the list is taken as unchanged
+            pages = cached
+            break
+
+        if response is not None:
+            # Save the subscription information
+            page = {
+                'token': kwargs.get('pageToken'), 'etag': response.get('etag'),
+                'next': response.get('nextPageToken'),
+                'channels': [
+                    (sub['snippet']['title'], sub['snippet']['resourceId']['channelId'])
+                    for sub in response['items']
+                ],
+            }
+        pages.append(page)
 
         # There is no other page of subscriptions
-        if 'nextPageToken' not in response: break
+        if not page['next']: break
 
         # Pull next page of subscriptions
-        kwargs['pageToken'] = response['nextPageToken']
-    
-    return subscriptions
+        kwargs['pageToken'] = page['next']
+
+    if cache is None:
+        return [ Channel(name=name, ID=ID) for page in pages for name, ID in page['channels'] ]
+
+    cache.update(pages)
+    return cache.channels()
 
 
 #======================== YouTube Writing ========================#
@@ -435,8 +875,8 @@ def get_subscriptions(youtube):
 
 def create_playlist(youtube, name, description=''):
     """ Creates a new playlist and returns the playlist ID. """
-    response = youtube.playlists().insert(
-        part='snippet,status',
+    request = youtube.playlists().insert(
+        part='snippet,status', fields=_INSERT_FIELDS,
         body={
             'snippet': {
                 'title': name,
@@ -446,24 +886,144 @@ def create_playlist(youtube, name, description=''):
                 'privacyStatus': 'private',
             }
         }
-    ).execute()
+    )
+    response = ytlink.retry.execute(request, 'playlists.insert')
 
     return Playlist(name, response['id'])
 
 
-def add_video_to_playlist(youtube, playlist, video):
-    youtube.playlistItems().insert(
-        part='snippet',
-        body={
-            'snippet': {
-                'playlistId': playlist.ID, 
-                'resourceId': {
-                    'kind': 'youtube#video',
-                    'videoId': video.ID
-                }
-            }
+def _playlist_item_body(playlist, video):
+    """ Request body for inserting a video into a playlist. """
+    snippet = {
+        'playlistId': playlist.ID, 
+        'resourceId': {
+            'kind': 'youtube#video',
+            'videoId': video.ID
         }
-    ).execute()
+    }
+
+    return { 'snippet': snippet }
+
+
+def playlist_contains(youtube, playlist, video):
+    """ Whether a video is in a playlist, including private playlists. Costs one unit however long the playlist is. """
+    response = ytlink.retry.execute(
+        youtube.playlistItems().list(
+            part='id', fields='items/id', playlistId=playlist.ID,
+            videoId=video.ID, maxResults=1
+        ),
+        'playlistItems.list'
+    )
+    return bool(response.get('items'))
+
+
+def add_video_to_playlist(youtube, playlist, video):
+    ytlink.retry.execute(
+        youtube.playlistItems().insert(
+            part='snippet', fields=_INSERT_FIELDS,
+            body=_playlist_item_body(playlist, video)
+        ),
+        'playlistItems.insert'
+    )
+
+
+def add_videos_to_playlist(
+        youtube, playlist, videos, ordered=False, callback=None, on_send=None
+    ):
+    """ Adds videos to a playlist through batched HTTP requests of up to 50 inserts, in any order. Batches stop at the first one the quota runs out in.
+        
+        Args:
+            youtube: the YouTube object from init_youtube.
+
+            playlist (ytlink.Playlist): the playlist to add to.
+
+            videos (list): list of ytlink.Video's to add.
+    
+        Kwargs:
+            ordered (bool): whether the videos should appear in the playlist in the order provided. The inserts are then sent one at a time, each appended after the last, and stop at the first failure that could clear up on a later try. Videos rejected for good are skipped.
+
+            callback (function): called as callback(batch, results) once each batch, or each insert when ordered, is acknowledged.
+
+            on_send (function): called as on_send(batch) before each batch, or each insert when ordered, is first sent.
+    
+        Returns:
+            (list): None for each successful insert or the exception raised for that video, in the order of the videos attempted. Videos after the returned results were never sent.
+    
+    """
+    videos = list(videos)
+    # The order of the inserts in a batch isn't kept, and explicit positions
+        # go wrong after a failure or alongside other inserts
+    if ordered:
+        return _add_videos_in_order(youtube, playlist, videos, callback, on_send)
+
+    results = []
+    for i in range(0, len(videos), _MAX_RESULTS):
+        batch = videos[i:i + _MAX_RESULTS]
+        batch_results = [None] * len(batch)
+        if on_send is not None: on_send(batch)
+
+        def on_response(request_id, response, exception):
+            batch_results[int(request_id)] = exception
+
+        # Indices into the batch still to be sent
+        pending = range(len(batch))
+        for attempt in range(ytlink.retry.api_policy.max_retries + 1):
+            request = youtube.new_batch_http_request(callback=on_response)
+            for j in pending:
+                request.add(
+                    youtube.playlistItems().insert(
+                        part='snippet', fields=_INSERT_FIELDS,
+                        body=_playlist_item_body(playlist, batch[j])
+                    ),
+                    request_id=str(j)
+                )
+            # Every request in the batch is charged individually
+            ytlink.retry.execute(request, 'playlistItems.insert', len(pending))
+
+            failed = [ j for j in pending if batch_results[j] is not None ]
+            # Only throttled and failed inserts are sent again
+            pending = [
+                j for j in failed if ytlink.retry.is_retryable(batch_results[j])
+            ]
+            ytlink.metrics.recorder.count(
+                'playlistItems.insert', errors=len(failed),
+                retries=len(pending) if attempt < ytlink.retry.api_policy.max_retries else 0
+            )
+            if not pending or attempt == ytlink.retry.api_policy.max_retries: break
+            time.sleep(ytlink.retry.api_policy.backoff(attempt, batch_results[pending[0]]))
+
+        results += batch_results
+        if callback is not None: callback(batch, batch_results)
+        # The later batches would only be refused as well
+        if any(ytlink.retry.is_quota_error(error) for error in batch_results if error is not None):
+            break
+
+    return results
+
+
+def _add_videos_in_order(youtube, playlist, videos, callback=None, on_send=None):
+    """ Appends the videos one insert at a time. See add_videos_to_playlist. """
+    results = []
+    for video in videos:
+        if on_send is not None: on_send([video])
+        try:
+            add_video_to_playlist(youtube, playlist, video)
+            error = None
+        except Exception as e:
+            # Only API errors are a result, lost connections are raised
+            if ytlink.retry.status(e) is None: raise
+            error = e
+
+        results.append(error)
+        if callback is not None: callback([video], [error])
+
+        # Later videos would be added ahead of this one when it is retried
+        if error is not None and (
+            ytlink.retry.is_retryable(error) or ytlink.retry.is_quota_error(error)
+        ):
+            break
+
+    return results
 
 
 #======================== Entry ========================#